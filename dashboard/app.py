@@ -1,15 +1,48 @@
 # app.py - VERSION MULTI-PAGES AVEC THÈME NOIR/VERT
+import time
+script_start = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
 import json
-import time
-import matplotlib.pyplot as plt
-import seaborn as sns
+import functools
+import tempfile
+import uuid
+from collections import deque
 from pathlib import Path
 from datetime import datetime
 
+import churn_engine
+from churn_engine import (
+    BATCH_CHUNK_SIZE, FEATURE_LABELS, LOAD_ERRORS, NUM_FEATURES, RISK_LABELS, STARTUP_TIMINGS,
+    count_portfolio_rows, iter_portfolio_chunks, score_chunk
+)
+from attributions import compute_feature_impacts, labeled_impacts, top_drivers
+from prediction_cache import PredictionCache
+from fast_path import CompiledScorer
+from history_store import HISTORY_PAGE_SIZE, HISTORY_RING_SIZE, HistoryStore
+from schema import CATEGORY_VOCABULARIES, apply_schema, format_unknown, merge_unknown
+from latency import LatencyRecorder
+from inference_pool import InferencePool, PoolSaturated
+from client_record import client_record, concat_records, records_to_frame
+from drift_monitor import MIN_REPORT_ROWS, DriftMonitor, reference_path
+from model_registry import ModelRegistry
+from shadow_scoring import ShadowScorer
+from columnar_export import ColumnarExportWriter
+from portfolio_index import PortfolioIndex, RISK_RANGES
+from counterfactual import (
+    BULK_MAX_CANDIDATES, BULK_TIMEOUT_S, TARGET_PREFIX, cached_counterfactual, find_counterfactual,
+    format_actions, search_counterfactuals
+)
+from sensitivity import (
+    DEFAULT_SWEEP_FEATURES, SURFACE_POINTS, SWEEP_POINTS, cached_sweep, interaction_surface, sensitivity_curves
+)
+# matplotlib n'est importé par charts qu'au premier rendu d'un graphique (page Application)
+from charts import CHART_BACKENDS, factor_chart_spec, render_factor_chart, sensitivity_chart_spec, surface_chart_spec
+
+STARTUP_TIMINGS.setdefault("imports", time.perf_counter() - script_start)
+
 # Configuration de la page
 st.set_page_config(
     page_title="BankChurnAI - Haïti", 
@@ -240,67 +273,146 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Chemins
-current_dir = Path(__file__).parent
-model_path = current_dir / 'best_churn_model_pro_20251129_080606.pkl'
-metadata_path = current_dir / 'model_metadata_pro_20251129_080606.json'
-preprocessor_path = current_dir / 'preprocessor_pro_20251129_080606.pkl'
-
 # Initialisation session
 if 'page' not in st.session_state:
     st.session_state.page = 'accueil'
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'analysis_history' not in st.session_state:
-    st.session_state.analysis_history = []
+    st.session_state.analysis_history = deque(maxlen=HISTORY_RING_SIZE)
+if 'batch_results' not in st.session_state:
+    st.session_state.batch_results = None
+if 'retention_plans' not in st.session_state:
+    st.session_state.retention_plans = None
+
+# Résultats batch temporaires: un fichier par session, supprimé au lot suivant ou après 24h
+BATCH_RESULT_PREFIX = "churn_batch_"
+BATCH_RESULT_MAX_AGE_S = 24 * 3600
+
+def cleanup_batch_results(previous=None, max_age_s=BATCH_RESULT_MAX_AGE_S):
+    """Supprime le résultat précédent de la session et les résultats abandonnés trop anciens"""
+    expired_before = time.time() - max_age_s
+    stale = [Path(previous)] if previous else []
+    stale += [path for path in Path(tempfile.gettempdir()).glob(f"{BATCH_RESULT_PREFIX}*")
+              if path.stat().st_mtime < expired_before]
+    for path in stale:
+        path.unlink(missing_ok=True)
+
+# Analyse d'un lot de clients (exécutée par le pool d'inférence)
+def analyze_batch(registry, recorder, key, records):
+    """Score et facteurs d'influence d'un lot de clients coalescés (thread du pool d'inférence)"""
+    version, scorer = key
+    bundle = registry.get(version)
+    with recorder.stage("assemblage"):
+        batch = concat_records(records)
+        df_clients = records_to_frame(batch)
+    if scorer is not None:
+        with recorder.stage("preprocessing"):
+            X = scorer.preprocessor.transform_records(batch)
+        with recorder.stage("inférence"):
+            churn_proba = scorer.trees.predict_proba(X)
+    else:
+        steps, estimator = churn_engine.split_model(bundle.model, bundle.preprocessor)
+        with recorder.stage("preprocessing"):
+            X = churn_engine.transform_features(df_clients, steps, bundle.normalize)
+        with recorder.stage("inférence"):
+            churn_proba = estimator.predict_proba(X)[:, 1]
+    with recorder.stage("attributions"):
+        impacts = compute_feature_impacts(df_clients, bundle.model, bundle.preprocessor, bundle.normalize)
+    return [
+        {"score": churn_engine.score_record(proba), "feature_impacts": labeled_impacts(row)}
+        for proba, (_, row) in zip(churn_proba, impacts.iterrows())
+    ]
 
 # Fonctions de chargement
 @st.cache_resource
-def load_model():
-    try:
-        if model_path.exists():
-            return joblib.load(model_path)
-    except:
-        pass
-    return None
+def get_model_registry():
+    """Versions de modèle chargées une fois par processus, partagées entre sessions"""
+    return ModelRegistry()
 
 @st.cache_resource
-def load_preprocessor():
-    try:
-        if preprocessor_path.exists():
-            return joblib.load(preprocessor_path)
-    except:
-        pass
-    return None
+def get_prediction_cache():
+    return PredictionCache()
 
 @st.cache_resource
-def load_metadata():
+def get_sweep_cache():
+    """Courbes de sensibilité par (client, version, grille), partagées entre sessions"""
+    return PredictionCache(maxsize=256)
+
+@st.cache_resource
+def get_counterfactual_cache():
+    """Plans de rétention par (client, version, seuil), partagés entre sessions"""
+    return PredictionCache(maxsize=256)
+
+@st.cache_resource
+def load_compiled_scorer(version, _bundle):
+    """Chemin rapide sans pandas (une fois par version); None si le modèle n'est pas compilable"""
     try:
-        if metadata_path.exists():
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except:
-        pass
-    return {}
+        return CompiledScorer.from_model(_bundle.model, _bundle.preprocessor, _bundle.normalize)
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+@st.cache_resource
+def get_history_store():
+    return HistoryStore()
+
+@st.cache_resource
+def get_shadow_scorer(_registry):
+    """Scoring fantôme du challenger, partagé entre sessions"""
+    return ShadowScorer(_registry)
 
-# Chargement des ressources
-model = load_model()
-preprocessor = load_preprocessor()
-metadata = load_metadata()
+@st.cache_resource(max_entries=4)
+def load_portfolio_index(path, modified_at):
+    """Index top-K d'un fichier de résultats batch (reconstruit si le fichier change)"""
+    return PortfolioIndex.from_file(path)
 
-# Features
-NUM_FEATURES = [
-    "age", "household_size", "zone_security_level", "distance_to_branch_km",
-    "income_monthly", "account_balance", "credit_score", "loan_balance",
-    "transactions_count_monthly", "transfer_fees_paid", "time_with_bank_months",
-    "last_transaction_days", "diaspora_transfers_received", "mobile_app_logins",
-    "sentiment_score", "access_to_internet"
-]
+@st.cache_resource
+def get_inference_pool(_registry, _latency):
+    """Workers d'inférence bornés, partagés par toutes les sessions"""
+    return InferencePool(functools.partial(analyze_batch, _registry, _latency), recorder=_latency)
+
+@st.cache_resource
+def load_drift_monitor(version, _bundle):
+    """Dérive des entrées de la version (None sans profil de référence), partagée entre sessions"""
+    return DriftMonitor.for_bundle(_bundle)
+
+@st.cache_resource
+def get_latency_recorder():
+    """Latences par étape, agrégées sur toutes les sessions"""
+    return LatencyRecorder()
+
+# Chargement des ressources (version active lue une fois par rerun)
+model_registry = get_model_registry()
+model_bundle = model_registry.active
+model = model_bundle.model if model_bundle is not None else None
+preprocessor = model_bundle.preprocessor if model_bundle is not None else None
+normalize = model_bundle.normalize if model_bundle is not None else False
+metadata = model_bundle.metadata if model_bundle is not None else {}
+prediction_cache = get_prediction_cache()
+sweep_cache = get_sweep_cache()
+counterfactual_cache = get_counterfactual_cache()
+history_store = get_history_store()
+latency = get_latency_recorder()
+shadow_scorer = get_shadow_scorer(model_registry)
+inference_pool = get_inference_pool(model_registry, latency)
+drift_monitor = load_drift_monitor(model_bundle.version, model_bundle) if model_bundle is not None else None
+compiled_scorer = load_compiled_scorer(model_bundle.version, model_bundle) if model is not None else None
+MODEL_VERSION = model_bundle.version if model_bundle is not None else "inconnu"
 
-CAT_FEATURES = [
-    "gender", "marital_status", "education_level", "profession",
-    "region", "mobile_money_usage", "customer_persona_ai"
-]
+def analyze_client(client_data):
+    """Score et facteurs d'influence d'un client (mis en cache entre reruns et sessions).
 
-ALL_FEATURES_ORDERED = NUM_FEATURES + CAT_FEATURES
+    Calcul délégué au pool d'inférence partagé; PoolSaturated ou TimeoutError en pic de charge.
+    """
+    def compute():
+        record = client_record(client_data)
+        analysis = inference_pool.run((MODEL_VERSION, compiled_scorer), record)
+        # Analyses calculées seulement: un rerun servi par le cache n'est pas un nouveau client
+        shadow_scorer.submit(client_data, MODEL_VERSION, analysis["score"]["churn_probability"])
+        if drift_monitor is not None:
+            drift_monitor.update(record)
+        return analysis
+    return prediction_cache.get_or_compute(client_data, MODEL_VERSION, compute)
 
 # Sidebar Navigation
 with st.sidebar:
@@ -314,6 +426,10 @@ with st.sidebar:
         st.session_state.page = 'app'
         st.rerun()
     
+    if st.button("Portefeuille", use_container_width=True, type="primary" if st.session_state.page == 'portefeuille' else "secondary"):
+        st.session_state.page = 'portefeuille'
+        st.rerun()
+    
     if st.button("Équipe", use_container_width=True, type="primary" if st.session_state.page == 'equipe' else "secondary"):
         st.session_state.page = 'equipe'
         st.rerun()
@@ -322,7 +438,7 @@ with st.sidebar:
     st.markdown("**Ayiti AI Hackathon 2025**")
     st.markdown("**Équipe IMPACTIS**")
     
-    if model is not None and metadata:
+    if model is not None:
         with st.expander("Infos Système"):
             if 'model_info' in metadata:
                 st.write(f"Modèle: {metadata['model_info'].get('best_model', 'N/A')}")
@@ -330,6 +446,83 @@ with st.sidebar:
                 perf = metadata['performance']
                 st.write(f"AUC: {perf.get('test_auc', 0):.4f}")
                 st.write(f"F1: {perf.get('test_f1', 0):.4f}")
+            
+            st.write("Démarrage (ms): " + ", ".join(
+                f"{stage} {duration * 1000:.0f}" for stage, duration in STARTUP_TIMINGS.items()
+            ))
+            
+            cache_stats = prediction_cache.stats()
+            st.write(f"Cache prédictions: {cache_stats['hits']} hits / {cache_stats['misses']} miss "
+                     f"({cache_stats['hit_rate']:.0%}, {cache_stats['size']}/{cache_stats['maxsize']})")
+            
+            registry_versions = model_registry.versions()
+            selected_version = st.selectbox("Version du modèle", registry_versions,
+                                            index=registry_versions.index(MODEL_VERSION)
+                                            if MODEL_VERSION in registry_versions else 0)
+            swap_col, refresh_col = st.columns(2)
+            if swap_col.button("Activer", disabled=selected_version == MODEL_VERSION):
+                try:
+                    # Chargement et compilation avant la bascule: pas de démarrage à froid
+                    model_registry.activate(selected_version, warmup=lambda b: load_compiled_scorer(b.version, b))
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
+            if refresh_col.button("Rechercher"):
+                model_registry.discover()
+                st.rerun()
+            registry_stats = model_registry.stats()
+            st.write(f"Versions chargées: {registry_stats['loaded_mb']:.1f} / {registry_stats['budget_mb']:.0f} Mo")
+            
+            challenger_options = ["Aucun"] + [v for v in registry_versions if v != MODEL_VERSION]
+            current_challenger = shadow_scorer.challenger_version
+            st.selectbox(
+                "Challenger (scoring fantôme)", challenger_options, key="shadow_challenger",
+                index=challenger_options.index(current_challenger) if current_challenger in challenger_options else 0,
+                on_change=lambda: shadow_scorer.set_challenger(
+                    None if st.session_state.shadow_challenger == "Aucun" else st.session_state.shadow_challenger
+                )
+            )
+            shadow_stats = shadow_scorer.stats(MODEL_VERSION)
+            if shadow_stats["pairs"]:
+                st.write(f"Champion/challenger: {shadow_stats['pairs']:,} paires, "
+                         f"accord décision {shadow_stats['decision_agreement']:.1%}, "
+                         f"accord risque {shadow_stats['risk_agreement']:.1%}")
+                st.write(f"Écart moyen {shadow_stats['mean_abs_diff']:.3f} | "
+                         f"PSI {shadow_stats['psi']:.3f} | KS {shadow_stats['ks']:.3f}")
+            
+            if drift_monitor is None:
+                st.caption(f"Dérive des entrées: aucun profil de référence ({reference_path(model_bundle).name}). "
+                           f"Créez-le avec `python drift_monitor.py build donnees_entrainement.csv`.")
+            elif drift_monitor.rows >= MIN_REPORT_ROWS:
+                drift_report = drift_monitor.report()
+                drifting = drift_report[drift_report["status"] != "stable"]
+                st.write(f"Dérive des entrées: {drift_monitor.rows:,} clients depuis "
+                         f"{drift_monitor.started_at:%d/%m %H:%M}, {len(drifting)} feature(s) en dérive")
+                st.dataframe(drift_report.set_index("feature")[["psi", "ks", "status"]].round(3),
+                             use_container_width=True)
+                if st.button("Réinitialiser la dérive"):
+                    drift_monitor.reset()
+                    st.rerun()
+            else:
+                st.write(f"Dérive des entrées: {drift_monitor.rows} clients analysés "
+                         f"(minimum {MIN_REPORT_ROWS} pour le calcul)")
+            
+            pool_stats = inference_pool.stats()
+            st.write(f"Pool d'inférence: {pool_stats['workers']} workers, file {pool_stats['queue_depth']}/"
+                     f"{pool_stats['max_queue']}, en cours {pool_stats['in_flight']}")
+            st.write(f"Lots: {pool_stats['batches']:,} (moyenne {pool_stats['mean_batch_size']:.1f}, "
+                     f"max {pool_stats['max_batch_size']}) | refusées {pool_stats['rejected']} | "
+                     f"expirées {pool_stats['expired'] + pool_stats['timeouts']} | erreurs {pool_stats['errors']}")
+            st.write(f"Tâches (plans, courbes): {pool_stats['task_workers']} workers, file "
+                     f"{pool_stats['task_queue_depth']}/{pool_stats['max_tasks']}, {pool_stats['tasks']:,} exécutées")
+            
+            latency_stats = latency.summary()
+            if latency_stats:
+                st.write("Latence (ms, p50 / p95 / p99):")
+                st.dataframe(pd.DataFrame(latency_stats).T[["count", "p50_ms", "p95_ms", "p99_ms"]].round(2),
+                             use_container_width=True)
+                st.download_button("Exporter les latences (JSON)", data=latency.export_json(),
+                                   file_name="latences.json", mime="application/json")
 
 # PAGE 1: ACCUEIL
 if st.session_state.page == 'accueil':
@@ -403,8 +596,12 @@ elif st.session_state.page == 'app':
     
     if model is None:
         st.error("Modèle IA non disponible. Veuillez vérifier les fichiers.")
+        for artifact, error in LOAD_ERRORS.items():
+            st.caption(f"{Path(artifact).name}: {error}")
         st.stop()
     
+    chart_backend = CHART_BACKENDS[st.sidebar.selectbox("Rendu des graphiques", list(CHART_BACKENDS))]
+    
     # Formulaire client
     col1, col2 = st.columns(2)
     
@@ -414,11 +611,11 @@ elif st.session_state.page == 'app':
         demo_col1, demo_col2 = st.columns(2)
         with demo_col1:
             age = st.slider("Âge", 18, 80, 35)
-            gender = st.selectbox("Genre", ["M", "F"])
-            marital_status = st.selectbox("Statut Matrimonial", ["Single", "Married", "Divorced", "Widowed"])
+            gender = st.selectbox("Genre", CATEGORY_VOCABULARIES["gender"])
+            marital_status = st.selectbox("Statut Matrimonial", CATEGORY_VOCABULARIES["marital_status"])
         with demo_col2:
-            education_level = st.selectbox("Niveau Éducation", ["None", "Primary", "Secondary", "University", "Master/PhD"])
-            profession = st.selectbox("Profession", ["Teacher", "Merchant", "Driver", "Civil Servant", "Health Worker", "Student", "Unemployed", "Tech/Office"])
+            education_level = st.selectbox("Niveau Éducation", CATEGORY_VOCABULARIES["education_level"])
+            profession = st.selectbox("Profession", CATEGORY_VOCABULARIES["profession"])
             household_size = st.slider("Taille Ménage", 1, 8, 3)
     
     with col2:
@@ -453,9 +650,9 @@ elif st.session_state.page == 'app':
         access_to_internet = 1 if access_internet_choice == "Oui" else 0
     
     with behavior_col3:
-        mobile_money_usage = st.selectbox("Usage Mobile Money", ["Low", "Medium", "High"])
-        region = st.selectbox("Région", ["Ouest", "Artibonite", "Nord", "Sud", "Centre", "Grand'Anse", "Nord-Ouest", "Nord-Est", "Sud-Est", "Nippes"])
-        customer_persona_ai = st.selectbox("Profil Client", ["Saver", "Trader", "Diaspora Dependent", "Digital Native", "Cash User", "Premium"])
+        mobile_money_usage = st.selectbox("Usage Mobile Money", CATEGORY_VOCABULARIES["mobile_money_usage"])
+        region = st.selectbox("Région", CATEGORY_VOCABULARIES["region"])
+        customer_persona_ai = st.selectbox("Profil Client", CATEGORY_VOCABULARIES["customer_persona_ai"])
     
     # Profils de test
     st.markdown("---")
@@ -517,6 +714,19 @@ elif st.session_state.page == 'app':
     # Analyse
     st.markdown("---")
     
+    client_data = {
+        'age': age, 'household_size': household_size, 'zone_security_level': zone_security_level,
+        'distance_to_branch_km': distance_to_branch_km, 'income_monthly': income_monthly,
+        'account_balance': account_balance, 'credit_score': credit_score, 'loan_balance': loan_balance,
+        'transactions_count_monthly': transactions_count_monthly, 'transfer_fees_paid': transfer_fees_paid,
+        'time_with_bank_months': time_with_bank_months, 'last_transaction_days': last_transaction_days,
+        'diaspora_transfers_received': diaspora_transfers_received, 'mobile_app_logins': mobile_app_logins,
+        'sentiment_score': sentiment_score, 'access_to_internet': access_to_internet,
+        'gender': gender, 'marital_status': marital_status, 'education_level': education_level,
+        'profession': profession, 'region': region, 'mobile_money_usage': mobile_money_usage,
+        'customer_persona_ai': customer_persona_ai
+    }
+    
     col_analyze = st.columns([2, 1, 2])
     with col_analyze[1]:
         analyze_clicked = st.button("Analyser le Risque", type="primary", use_container_width=True)
@@ -526,54 +736,31 @@ elif st.session_state.page == 'app':
             try:
                 start_time = time.time()
                 
-                client_data = {
-                    'age': age, 'household_size': household_size, 'zone_security_level': zone_security_level,
-                    'distance_to_branch_km': distance_to_branch_km, 'income_monthly': income_monthly,
-                    'account_balance': account_balance, 'credit_score': credit_score, 'loan_balance': loan_balance,
-                    'transactions_count_monthly': transactions_count_monthly, 'transfer_fees_paid': transfer_fees_paid,
-                    'time_with_bank_months': time_with_bank_months, 'last_transaction_days': last_transaction_days,
-                    'diaspora_transfers_received': diaspora_transfers_received, 'mobile_app_logins': mobile_app_logins,
-                    'sentiment_score': sentiment_score, 'access_to_internet': access_to_internet,
-                    'gender': gender, 'marital_status': marital_status, 'education_level': education_level,
-                    'profession': profession, 'region': region, 'mobile_money_usage': mobile_money_usage,
-                    'customer_persona_ai': customer_persona_ai
-                }
-                
-                df_client = pd.DataFrame([client_data])[ALL_FEATURES_ORDERED]
-                proba = model.predict_proba(df_client)
-                churn_proba = proba[0, 1]
+                analysis = analyze_client(client_data)
+                client_score = analysis["score"]
+                churn_proba = client_score["churn_probability"]
                 
                 processing_time = time.time() - start_time
                 
                 st.success(f"Analyse terminée en {processing_time:.3f}s")
                 
+                risk_level = client_score["risk_level"]
+                confidence = client_score["confidence"]
+                
                 # Métriques
                 col1, col2, col3, col4 = st.columns(4)
                 
                 with col1:
-                    if churn_proba < 0.3:
-                        delta_color, risk_label = "normal", "FAIBLE"
-                    elif churn_proba < 0.7:
-                        delta_color, risk_label = "off", "MOYEN"
-                    else:
-                        delta_color, risk_label = "inverse", "ÉLEVÉ"
-                    st.metric("Probabilité Churn", f"{churn_proba:.1%}", delta=risk_label, delta_color=delta_color)
+                    delta_color = {"FAIBLE": "normal", "MOYEN": "off", "ÉLEVÉ": "inverse"}[risk_level]
+                    st.metric("Probabilité Churn", f"{churn_proba:.1%}", delta=risk_level, delta_color=delta_color)
                 
                 with col2:
-                    if churn_proba < 0.3:
-                        risque_text = "FAIBLE"
-                    elif churn_proba < 0.7:
-                        risque_text = "MOYEN"
-                    else:
-                        risque_text = "ÉLEVÉ"
-                    st.metric("Niveau Risque", risque_text)
+                    st.metric("Niveau Risque", risk_level)
                 
                 with col3:
-                    prediction = "Restera" if churn_proba < 0.5 else "Partira"
-                    st.metric("Prédiction", prediction)
+                    st.metric("Prédiction", client_score["prediction"])
                 
                 with col4:
-                    confidence = max(churn_proba, 1 - churn_proba)
                     st.metric("Confiance", f"{confidence:.1%}")
                 
                 st.progress(float(churn_proba), text=f"Niveau de risque: {churn_proba:.1%}")
@@ -582,52 +769,15 @@ elif st.session_state.page == 'app':
                 st.markdown("---")
                 st.subheader("Analyse SHAP - Facteurs d'Influence")
                 
-                feature_impacts = {
-                    "Sentiment client": sentiment_score * -0.15,
-                    "Dernière transaction": (last_transaction_days / 90) * 0.12,
-                    "Niveau sécurité": (zone_security_level / 5) * 0.10,
-                    "Usage app mobile": (mobile_app_logins / 50) * -0.08,
-                    "Frais transfert": (transfer_fees_paid / 50000) * 0.07,
-                    "Score crédit": ((credit_score - 300) / 550) * -0.11,
-                    "Solde compte": (account_balance / 10000000) * -0.09,
-                    "Ancienneté": (time_with_bank_months / 240) * -0.06
-                }
+                feature_impacts = analysis["feature_impacts"]
                 
                 sorted_features = sorted(feature_impacts.items(), key=lambda x: abs(x[1]), reverse=True)[:6]
                 
-                fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-                fig.patch.set_facecolor('#0a0a0a')
-                
-                features = [f[0] for f in sorted_features]
-                impacts = [f[1] for f in sorted_features]
-                importances = [abs(i) for i in impacts]
-                
-                y_pos = np.arange(len(features))
-                
-                # Graphique 1
-                ax1.barh(y_pos, importances, color='#00ff00')
-                ax1.set_yticks(y_pos)
-                ax1.set_yticklabels(features)
-                ax1.set_xlabel('Importance Absolue', color='#e0e0e0')
-                ax1.set_title('Importance des Facteurs', color='#00ff00')
-                ax1.invert_yaxis()
-                ax1.set_facecolor('#1a1a1a')
-                ax1.tick_params(colors='#e0e0e0')
-                
-                # Graphique 2
-                colors = ['#ff4444' if x > 0 else '#00ff00' for x in impacts]
-                ax2.barh(y_pos, impacts, color=colors)
-                ax2.set_yticks(y_pos)
-                ax2.set_yticklabels(features)
-                ax2.set_xlabel('Impact sur Churn', color='#e0e0e0')
-                ax2.set_title('Direction de l\'Impact', color='#00ff00')
-                ax2.axvline(x=0, color='#ffffff', linestyle='-', alpha=0.3)
-                ax2.invert_yaxis()
-                ax2.set_facecolor('#1a1a1a')
-                ax2.tick_params(colors='#e0e0e0')
-                
-                plt.tight_layout()
-                st.pyplot(fig)
+                with latency.stage("rendu graphique"):
+                    if chart_backend == "vega":
+                        st.vega_lite_chart(factor_chart_spec(sorted_features), use_container_width=True)
+                    else:
+                        st.image(render_factor_chart(sorted_features), use_container_width=True)
                 
                 st.info("Rouge: Augmente le risque | Vert: Diminue le risque")
                 
@@ -635,8 +785,6 @@ elif st.session_state.page == 'app':
                 st.markdown("---")
                 st.subheader("Recommandations de Rétention")
                 
-                risk_level = "FAIBLE" if churn_proba < 0.3 else "MOYEN" if churn_proba < 0.7 else "ÉLEVÉ"
-                
                 with st.expander("Recommandations en Français", expanded=True):
                     if risk_level == "FAIBLE":
                         st.success("""
@@ -701,6 +849,33 @@ elif st.session_state.page == 'app':
                         **Mesaj:** "Priyorite absoli! Kontakte nou kounye a."
                         """)
                 
+                # Contrefactuel: changement minimal sur les leviers actionnables
+                if risk_level != "FAIBLE":
+                    with st.expander("Plan de Rétention Ciblé", expanded=True):
+                        try:
+                            # Exécuté sur le pool d'inférence partagé (concurrence bornée)
+                            counterfactual = cached_counterfactual(
+                                counterfactual_cache, client_data, MODEL_VERSION,
+                                lambda: inference_pool.call(
+                                    functools.partial(find_counterfactual, client_data, model, preprocessor, normalize)
+                                )
+                            )
+                        except (PoolSaturated, TimeoutError) as e:
+                            counterfactual = None
+                            st.warning(f"Plan de rétention indisponible, service très sollicité ({e})")
+                        
+                        if counterfactual is not None:
+                            actions = "\n".join(f"- {line}" for line in format_actions(counterfactual["changes"]))
+                            if counterfactual["found"]:
+                                st.success(f"**Pour passer sous {churn_engine.RISK_LOW_THRESHOLD:.0%} de risque:**\n"
+                                           f"{actions}\n\n**Risque estimé après actions:** "
+                                           f"{counterfactual['churn_probability']:.1%}")
+                            else:
+                                st.warning(f"Aucune combinaison des leviers actionnables ne passe sous "
+                                           f"{churn_engine.RISK_LOW_THRESHOLD:.0%}. **Meilleur plan trouvé** "
+                                           f"({counterfactual['churn_probability']:.1%}):\n{actions}")
+                            st.caption(f"{counterfactual['evaluated']:,} combinaisons évaluées par lots vectorisés")
+                
                 # Plan d'action
                 st.markdown("---")
                 st.subheader("Plan d'Action Opérationnel")
@@ -762,18 +937,311 @@ elif st.session_state.page == 'app':
                     "processing_time": float(processing_time)
                 }
                 st.session_state.analysis_history.append(analysis_record)
+                history_store.append({
+                    **analysis_record,
+                    "session_id": st.session_state.session_id,
+                    "model_version": MODEL_VERSION
+                })
+                
+            except (PoolSaturated, TimeoutError) as e:
+                st.warning(f"Service d'analyse très sollicité, réessayez dans quelques secondes ({e})")
+            except Exception as e:
+                st.error(f"Erreur: {str(e)}")
+    
+    # Sensibilité (what-if)
+    st.markdown("---")
+    with st.expander("Analyse de Sensibilité (What-if)"):
+        st.caption("Chaque variable parcourt la plage de son curseur, les autres restent celles du client. "
+                   "Toute la grille est scorée en un seul appel au modèle.")
+        sweep_features = st.multiselect(
+            "Variables à faire varier", NUM_FEATURES, default=DEFAULT_SWEEP_FEATURES,
+            format_func=lambda f: FEATURE_LABELS.get(f, f)
+        )
+        sweep_col1, sweep_col2 = st.columns(2)
+        with sweep_col1:
+            sweep_points = st.slider("Points par variable", 5, 50, SWEEP_POINTS)
+        with sweep_col2:
+            surface_features = st.multiselect(
+                "Interaction (2 variables)", NUM_FEATURES, max_selections=2,
+                format_func=lambda f: FEATURE_LABELS.get(f, f)
+            )
+        # Calcul à la demande: pas de balayage à chaque rerun de la page
+        sweep_enabled = st.toggle("Calculer les courbes", value=False)
+        
+        if model is None:
+            st.warning("Modèle non disponible")
+        elif sweep_enabled and sweep_features:
+            try:
+                sweep_start = time.perf_counter()
+                curves = cached_sweep(
+                    sweep_cache, client_data, MODEL_VERSION, ("courbes", tuple(sweep_features), sweep_points),
+                    lambda: inference_pool.call(functools.partial(
+                        sensitivity_curves, client_data, sweep_features, model, preprocessor, normalize, sweep_points
+                    ))
+                )
+                curves = curves.assign(label=curves["feature"].map(lambda f: FEATURE_LABELS.get(f, f)))
+                current_values = {FEATURE_LABELS.get(f, f): client_data[f] for f in sweep_features}
+                st.vega_lite_chart(sensitivity_chart_spec(curves, current_values), use_container_width=True)
                 
+                if len(surface_features) == 2:
+                    feature_x, feature_y = surface_features
+                    surface = cached_sweep(
+                        sweep_cache, client_data, MODEL_VERSION, ("surface", feature_x, feature_y, SURFACE_POINTS),
+                        lambda: inference_pool.call(functools.partial(
+                            interaction_surface, client_data, feature_x, feature_y, model, preprocessor, normalize
+                        ))
+                    )
+                    st.vega_lite_chart(
+                        surface_chart_spec(surface, feature_x, feature_y,
+                                           FEATURE_LABELS.get(feature_x, feature_x), FEATURE_LABELS.get(feature_y, feature_y)),
+                        use_container_width=True
+                    )
+                st.caption(f"{len(curves)} profils scorés en {(time.perf_counter() - sweep_start) * 1000:.1f} ms "
+                           f"(cache: {sweep_cache.stats()['hits']} hits)")
+            except (PoolSaturated, TimeoutError) as e:
+                st.warning(f"Service d'analyse très sollicité, réessayez dans quelques secondes ({e})")
             except Exception as e:
                 st.error(f"Erreur: {str(e)}")
     
     # Historique
-    if st.session_state.analysis_history:
-        st.markdown("---")
-        with st.expander(f"Historique ({len(st.session_state.analysis_history)})"):
-            df_history = pd.DataFrame(st.session_state.analysis_history)
+    st.markdown("---")
+    with st.expander(f"Historique ({len(st.session_state.analysis_history)} récentes)"):
+        if st.session_state.analysis_history:
+            st.write(f"**Dernières analyses de la session** (max {HISTORY_RING_SIZE})")
+            df_history = pd.DataFrame(list(st.session_state.analysis_history))
             st.dataframe(df_history, use_container_width=True)
+        
+        st.write("**Historique persistant**")
+        hist_col1, hist_col2 = st.columns(2)
+        with hist_col1:
+            history_scope = st.radio("Portée", ["Cette session", "Toutes les sessions"], horizontal=True)
+        with hist_col2:
+            history_risk = st.selectbox("Niveau de risque", ["Tous"] + RISK_LABELS)
+        
+        history_filters = {
+            "session_id": st.session_state.session_id if history_scope == "Cette session" else None,
+            "risk_level": None if history_risk == "Tous" else history_risk
+        }
+        history_total = history_store.count(**history_filters)
+        history_pages = max(1, -(-history_total // HISTORY_PAGE_SIZE))
+        history_page = st.number_input("Page", 1, history_pages, 1)
+        
+        st.dataframe(history_store.query(history_page - 1, **history_filters), use_container_width=True)
+        st.caption(f"{history_total} analyses enregistrées (écriture par lots)")
+    
+    # Scoring de portefeuille
+    st.markdown("---")
+    with st.expander("Scoring de Portefeuille (Batch)"):
+        st.write("Scorez un portefeuille complet à partir d'un fichier CSV ou Parquet contenant les 23 variables client.")
+        
+        batch_source_type = st.radio("Source", ["Téléversement", "Chemin local"], horizontal=True)
+        
+        batch_source, batch_format = None, None
+        if batch_source_type == "Téléversement":
+            uploaded_file = st.file_uploader("Fichier portefeuille", type=["csv", "parquet"])
+            if uploaded_file is not None:
+                batch_source = uploaded_file
+                batch_format = "parquet" if uploaded_file.name.endswith(".parquet") else "csv"
+        else:
+            local_path = st.text_input("Chemin du fichier (CSV ou Parquet)")
+            if local_path:
+                if Path(local_path).exists():
+                    batch_source = local_path
+                    batch_format = "parquet" if local_path.endswith(".parquet") else "csv"
+                else:
+                    st.error("Fichier introuvable")
+        
+        batch_chunk_size = st.number_input("Taille des blocs", 1000, 1000000, BATCH_CHUNK_SIZE, 1000)
+        batch_output = st.radio("Format des résultats", ["CSV", "Parquet"], horizontal=True,
+                                help="Parquet: un groupe de lignes par bloc, catégories encodées en dictionnaire")
+        batch_drivers = st.checkbox(
+            "Inclure les facteurs d'influence par client" + (" (toutes les features)" if batch_output == "Parquet" else " (5 principaux)"),
+            value=True
+        )
+        
+        if st.button("Lancer le Scoring Batch", disabled=batch_source is None):
+            output_path = None
+            try:
+                start_time = time.time()
+                estimated_rows = count_portfolio_rows(batch_source, batch_format)
+                progress = st.progress(0.0, text="Scoring en cours...")
+                
+                previous_results = st.session_state.batch_results
+                cleanup_batch_results(previous_results["path"] if previous_results is not None else None)
+                st.session_state.batch_results = None
+                output_path = Path(tempfile.gettempdir()) / (
+                    f"{BATCH_RESULT_PREFIX}{st.session_state.session_id[:8]}_{int(time.time())}.{batch_output.lower()}"
+                )
+                export_writer = ColumnarExportWriter(output_path, MODEL_VERSION) if batch_output == "Parquet" else None
+                risk_counts = pd.Series(0, index=RISK_LABELS)
+                scored_rows = 0
+                unknown_values = {}
+                
+                for i, chunk in enumerate(iter_portfolio_chunks(batch_source, batch_format, int(batch_chunk_size))):
+                    # Catégories converties une fois en codes; valeurs inconnues signalées
+                    chunk, chunk_unknown = apply_schema(chunk)
+                    merge_unknown(unknown_values, chunk_unknown)
+                    results = score_chunk(chunk, model, preprocessor, normalize)
+                    impacts = compute_feature_impacts(chunk, model, preprocessor, normalize) if batch_drivers else None
+                    if export_writer is not None:
+                        export_writer.write(chunk, results, impacts)
+                    else:
+                        if impacts is not None:
+                            results = results.join(top_drivers(impacts, k=5))
+                        results.to_csv(output_path, mode="w" if i == 0 else "a", header=(i == 0), index=False)
+                    
+                    shadow_scorer.submit(chunk, MODEL_VERSION, results["churn_probability"].to_numpy(), source="batch")
+                    if drift_monitor is not None:
+                        drift_monitor.update(chunk)
+                    risk_counts = risk_counts.add(results["risk_level"].value_counts(), fill_value=0)
+                    scored_rows += len(results)
+                    # Total estimé en CSV (fins de ligne): la progression est bornée à [0, 1]
+                    progress.progress(min(max(scored_rows / max(estimated_rows, 1), 0.0), 1.0),
+                                      text=f"{scored_rows:,} / ~{estimated_rows:,} clients scorés")
+                
+                if export_writer is not None:
+                    export_writer.close()
+                st.session_state.batch_results = {
+                    "path": str(output_path),
+                    "rows": scored_rows,
+                    "risk_counts": risk_counts.astype(int).to_dict(),
+                    "processing_time": time.time() - start_time,
+                    "unknown_values": unknown_values
+                }
+            except Exception as e:
+                if output_path is not None:
+                    output_path.unlink(missing_ok=True)
+                st.error(f"Erreur: {str(e)}")
+        
+        batch_results = st.session_state.batch_results
+        if batch_results is not None and Path(batch_results["path"]).exists():
+            st.success(f"{batch_results['rows']:,} clients scorés en {batch_results['processing_time']:.1f}s")
+            
+            risk_col1, risk_col2, risk_col3 = st.columns(3)
+            risk_col1.metric("Risque FAIBLE", f"{batch_results['risk_counts'].get('FAIBLE', 0):,}")
+            risk_col2.metric("Risque MOYEN", f"{batch_results['risk_counts'].get('MOYEN', 0):,}")
+            risk_col3.metric("Risque ÉLEVÉ", f"{batch_results['risk_counts'].get('ÉLEVÉ', 0):,}")
+            
+            if batch_results.get("unknown_values"):
+                st.warning("Valeurs hors vocabulaire (traitées comme manquantes):\n\n" +
+                           "\n".join(f"- {line}" for line in format_unknown(batch_results["unknown_values"])))
+            
+            result_is_parquet = batch_results["path"].endswith(".parquet")
+            # Fichier lu seulement au clic, pas à chaque rerun
+            st.download_button(
+                "Télécharger les Résultats (" + ("Parquet" if result_is_parquet else "CSV") + ")",
+                data=Path(batch_results["path"]).read_bytes,
+                file_name=Path(batch_results["path"]).name,
+                mime="application/vnd.apache.parquet" if result_is_parquet else "text/csv"
+            )
+
+# PAGE 3: PORTEFEUILLE
+elif st.session_state.page == 'portefeuille':
+    st.title("Explorateur de Portefeuille")
+    st.markdown("### Clients les plus à risque d'un scoring batch")
+    
+    last_batch = st.session_state.batch_results
+    default_path = last_batch["path"] if last_batch is not None else ""
+    results_path = st.text_input("Fichier de résultats (CSV ou Parquet)", value=default_path,
+                                 help="Par défaut: résultats du dernier scoring batch de la page Application")
+    
+    if not results_path:
+        st.info("Lancez un scoring batch depuis la page Application, ou indiquez un fichier de résultats.")
+    elif not Path(results_path).exists():
+        st.error("Fichier introuvable")
+    else:
+        try:
+            with st.spinner("Construction de l'index..."):
+                portfolio_index = load_portfolio_index(results_path, Path(results_path).stat().st_mtime)
+        except (KeyError, ValueError) as e:
+            st.error(f"Fichier de résultats invalide: {e}")
+            st.stop()
+        
+        filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+        with filter_col1:
+            explorer_region = st.selectbox("Région", ["Toutes"] + portfolio_index.regions)
+        with filter_col2:
+            explorer_persona = st.selectbox("Profil Client", ["Tous"] + portfolio_index.personas)
+        with filter_col3:
+            explorer_risk = st.selectbox("Niveau de risque", ["Tous"] + list(RISK_RANGES))
+        with filter_col4:
+            explorer_k = st.number_input("Top K", 1, 100000, 500, 50)
+        
+        query = dict(
+            region=None if explorer_region == "Toutes" else explorer_region,
+            persona=None if explorer_persona == "Tous" else explorer_persona,
+            risk_level=None if explorer_risk == "Tous" else explorer_risk
+        )
+        query_start = time.perf_counter()
+        top_clients = portfolio_index.top_k(int(explorer_k), **query)
+        matching = portfolio_index.count(**query)
+        query_ms = (time.perf_counter() - query_start) * 1000
+        
+        metric_col1, metric_col2, metric_col3 = st.columns(3)
+        metric_col1.metric("Clients indexés", f"{len(portfolio_index):,}")
+        metric_col2.metric("Correspondants", f"{matching:,}")
+        metric_col3.metric("Requête", f"{query_ms:.1f} ms")
+        st.caption(f"Index construit en {portfolio_index.build_seconds:.2f}s (une fois par fichier)")
+        
+        st.dataframe(top_clients, use_container_width=True, hide_index=True)
+        st.download_button(
+            "Télécharger la Sélection (CSV)",
+            data=top_clients.to_csv(index=False),
+            file_name=f"top_{len(top_clients)}_clients.csv",
+            mime="text/csv"
+        )
+        
+        with st.expander("Répartition Région x Profil Client"):
+            st.dataframe(portfolio_index.partition_counts(), use_container_width=True)
+        
+        with st.expander("Plans de Rétention (contrefactuels)"):
+            st.caption(f"Changement minimal des leviers actionnables pour passer sous "
+                       f"{churn_engine.RISK_LOW_THRESHOLD:.0%}, pour les premiers clients de la sélection "
+                       f"({BULK_MAX_CANDIDATES:,} combinaisons au plus par client)")
+            plan_col1, plan_col2 = st.columns([1, 1])
+            with plan_col1:
+                plan_count = st.number_input("Clients à traiter", 1, 2000, min(100, max(len(top_clients), 1)), 50)
+            with plan_col2:
+                st.write("")
+                plans_clicked = st.button("Calculer les Plans", use_container_width=True,
+                                          disabled=model is None or top_clients.empty)
+            
+            if plans_clicked:
+                with st.spinner("Recherche des plans de rétention..."):
+                    plan_start = time.perf_counter()
+                    segment = top_clients.head(int(plan_count))
+                    try:
+                        plans = inference_pool.call(
+                            functools.partial(search_counterfactuals, segment, model, preprocessor, normalize,
+                                              max_candidates=BULK_MAX_CANDIDATES),
+                            timeout=BULK_TIMEOUT_S
+                        )
+                        st.session_state.retention_plans = {
+                            "plans": pd.concat([segment.reset_index(drop=True)[["region", "customer_persona_ai"]], plans],
+                                               axis=1),
+                            "seconds": time.perf_counter() - plan_start
+                        }
+                    except (PoolSaturated, TimeoutError) as e:
+                        st.warning(f"Service d'analyse très sollicité, réessayez dans quelques secondes ({e})")
+            
+            retention_plans = st.session_state.retention_plans
+            if retention_plans is not None:
+                plans = retention_plans["plans"]
+                st.write(f"**{int(plans['found'].sum())}/{len(plans)}** clients peuvent passer sous le seuil "
+                         f"({retention_plans['seconds']:.1f}s, {int(plans['evaluated'].sum()):,} candidats scorés)")
+                st.dataframe(
+                    plans.rename(columns=lambda c: FEATURE_LABELS.get(c[len(TARGET_PREFIX):], c) + " (cible)"
+                                 if c.startswith(TARGET_PREFIX) else c),
+                    use_container_width=True, hide_index=True
+                )
+                st.download_button(
+                    "Télécharger les Plans (CSV)",
+                    data=plans.to_csv(index=False),
+                    file_name=f"plans_retention_{len(plans)}_clients.csv",
+                    mime="text/csv"
+                )
 
-# PAGE 3: ÉQUIPE
+# PAGE 4: ÉQUIPE
 elif st.session_state.page == 'equipe':
     st.title("Notre Équipe")
     st.markdown("### Équipe IMPACTIS - Hackathon Ayiti AI 2025")
@@ -884,4 +1352,7 @@ st.markdown("""
     <p style='color: #e0e0e0;'>Ayiti AI Hackathon 2025 • Équipe IMPACTIS</p>
     <p style='color: #00ff00;'><em>Riché FLEURINORD • Micka LOUIS • Vilmarson JULES</em></p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+STARTUP_TIMINGS.setdefault("premier rendu", time.perf_counter() - script_start)
+latency.record("rerun total", time.perf_counter() - script_start)
@@ -5,10 +5,17 @@ import joblib
 import numpy as np
 from pathlib import Path
 import sys
+import time
 
 # Ajouter le chemin parent pour importer les modules
 sys.path.append(str(Path(__file__).parent.parent))
 
+from churn_engine import MONETARY_DIVISORS, model_version, prepare_features, score
+from fast_path import CompiledScorer, FusedPipeline, check_parity
+from client_profiles import TEST_CLIENTS, synthetic_clients
+from model_registry import ModelRegistry
+from client_record import records_from_frame
+
 st.set_page_config(page_title="TEST Nouveau Modèle", layout="centered")
 st.title("🧪 TEST - Nouveau Modèle Hackathon")
 
@@ -28,10 +35,12 @@ st.write(f"📁 Dossier modèles: {models_dir}")
 @st.cache_resource
 def load_components():
     try:
-        model = joblib.load(model_path)
-        st.success("✅ Modèle chargé")
+        # Même registre que l'application: lot versionné du dossier models/
+        bundle = ModelRegistry(search_dirs=[models_dir]).get(model_version(model_path))
+        model = bundle.model
+        st.success(f"✅ Modèle chargé (version {bundle.version})")
         
-        preprocessor = joblib.load(preprocessor_path)
+        preprocessor = bundle.preprocessor
         st.success("✅ Preprocesseur chargé")
         
         feature_names = joblib.load(feature_names_path)
@@ -47,115 +56,66 @@ model, preprocessor, feature_names = load_components()
 if model is None:
     st.stop()
 
+@st.cache_resource
+def load_fused_pipeline():
+    """Pipeline fusionné normalisation + preprocessing + prédiction (None si non compilable)"""
+    try:
+        return FusedPipeline.from_model(model, preprocessor, normalize=True)
+    except (TypeError, ValueError):
+        return None
+
+fused_pipeline = load_fused_pipeline()
+
 # ==================== FONCTION DE NORMALISATION ====================
 def normalize_client_data(client_data):
     """Normalise les données client comme pendant l'entraînement"""
     normalized = client_data.copy()
     
     # Normalisation monétaire (CRITIQUE - même que l'entraînement)
-    monetary_features = {
-        'income_monthly': 1000,
-        'account_balance': 1000, 
-        'loan_balance': 1000,
-        'diaspora_transfers_received': 1000,
-        'transfer_fees_paid': 100
-    }
-    
-    for feature, divisor in monetary_features.items():
+    for feature, divisor in MONETARY_DIVISORS.items():
         if feature in normalized:
             normalized[feature] = normalized[feature] / divisor
     
     return normalized
 
 # ==================== FONCTION DE PRÉDICTION ====================
-def make_prediction(client_data):
-    """Fait une prédiction avec le nouveau modèle"""
+def make_prediction(clients):
+    """Fait les prédictions du nouveau modèle pour une liste de clients, en un seul appel"""
     try:
-        # 1. Normalisation
-        client_normalized = normalize_client_data(client_data)
-        
-        # 2. Création DataFrame
-        df_client = pd.DataFrame([client_normalized])
-        
-        # 3. Preprocessing
-        client_processed = preprocessor.transform(df_client)
+        df_clients = pd.DataFrame(clients)
         
-        # 4. Prédiction
-        proba = model.predict_proba(client_processed)
+        # Normalisation + preprocessing + prédiction en une passe (pipeline fusionné)
+        if fused_pipeline is not None:
+            clients_processed = fused_pipeline.transform(df_clients)
+            scores = fused_pipeline.score(df_clients)
+        else:
+            scores = score(df_clients, model, preprocessor, normalize=True)
+            clients_processed = prepare_features(df_clients, preprocessor, normalize=True)
         
-        return proba, client_normalized, client_processed
+        return scores, clients_processed
         
     except Exception as e:
         st.error(f"❌ Erreur prédiction: {e}")
-        return None, None, None
+        return None, None
 
 # ==================== TESTS AUTOMATIQUES ====================
 st.markdown("---")
 st.subheader("🧪 TESTS AUTOMATIQUES")
 
-test_clients = [
-    {
-        "name": "👑 CLIENT FIDÈLE",
-        "description": "Client stable, bon revenu, utilise les services digitaux",
-        "data": {
-            'age': 45, 'household_size': 3, 'zone_security_level': 1,
-            'distance_to_branch_km': 2.0, 'income_monthly': 80000,
-            'account_balance': 150000, 'credit_score': 750, 'loan_balance': 50000,
-            'transactions_count_monthly': 25, 'transfer_fees_paid': 500,
-            'time_with_bank_months': 60, 'last_transaction_days': 3,
-            'diaspora_transfers_received': 20000, 'mobile_app_logins': 15,
-            'sentiment_score': 0.7, 'access_to_internet': 1,
-            'gender': 'M', 'marital_status': 'Married', 'education_level': 'University',
-            'profession': 'Civil Servant', 'region': 'Ouest',
-            'mobile_money_usage': 'High', 'customer_persona_ai': 'Digital Native'
-        }
-    },
-    {
-        "name": "⚠️ CLIENT RISQUÉ", 
-        "description": "Client jeune, faible revenu, peu d'activité",
-        "data": {
-            'age': 28, 'household_size': 2, 'zone_security_level': 5,
-            'distance_to_branch_km': 25.0, 'income_monthly': 12000,
-            'account_balance': 5000, 'credit_score': 420, 'loan_balance': 0,
-            'transactions_count_monthly': 3, 'transfer_fees_paid': 50,
-            'time_with_bank_months': 8, 'last_transaction_days': 45,
-            'diaspora_transfers_received': 0, 'mobile_app_logins': 0,
-            'sentiment_score': -0.6, 'access_to_internet': 0,
-            'gender': 'F', 'marital_status': 'Single', 'education_level': 'Primary',
-            'profession': 'Unemployed', 'region': 'Nord',
-            'mobile_money_usage': 'Low', 'customer_persona_ai': 'Cash User'
-        }
-    },
-    {
-        "name": "📊 CLIENT MOYEN",
-        "description": "Client avec profil mixte, risque modéré",
-        "data": {
-            'age': 35, 'household_size': 2, 'zone_security_level': 3,
-            'distance_to_branch_km': 10.0, 'income_monthly': 40000,
-            'account_balance': 50000, 'credit_score': 600, 'loan_balance': 20000,
-            'transactions_count_monthly': 12, 'transfer_fees_paid': 200,
-            'time_with_bank_months': 24, 'last_transaction_days': 15,
-            'diaspora_transfers_received': 5000, 'mobile_app_logins': 8,
-            'sentiment_score': 0.1, 'access_to_internet': 1,
-            'gender': 'M', 'marital_status': 'Married', 'education_level': 'Secondary',
-            'profession': 'Merchant', 'region': 'Artibonite',
-            'mobile_money_usage': 'Medium', 'customer_persona_ai': 'Trader'
-        }
-    }
-]
+test_clients = TEST_CLIENTS
 
 results = []
 
+# Prédiction des profils de test en un seul appel
+scores, clients_processed = make_prediction([client['data'] for client in test_clients])
+
 for i, client in enumerate(test_clients, 1):
     st.write(f"### Test {i}: {client['name']}")
     st.write(f"*{client['description']}*")
     
-    # Prédiction
-    proba, client_normalized, client_processed = make_prediction(client['data'])
-    
-    if proba is not None:
-        # Extraction probabilité churn (index 1)
-        churn_proba = proba[0, 1]
+    if scores is not None:
+        # Extraction probabilité churn
+        churn_proba = scores["churn_probability"].iloc[i - 1]
         results.append(churn_proba)
         
         # Debug détaillé
@@ -164,13 +124,13 @@ for i, client in enumerate(test_clients, 1):
             st.json(client['data'])
             
             st.write("**Données normalisées:**")
-            st.json(client_normalized)
+            st.json(normalize_client_data(client['data']))
             
             st.write("**Probabilités brutes:**")
-            st.write(f"Classe 0 (fidèle): {proba[0, 0]:.6f} → {proba[0, 0]:.4%}")
-            st.write(f"Classe 1 (churn): {proba[0, 1]:.6f} → {proba[0, 1]:.4%}")
+            st.write(f"Classe 0 (fidèle): {1 - churn_proba:.6f} → {1 - churn_proba:.4%}")
+            st.write(f"Classe 1 (churn): {churn_proba:.6f} → {churn_proba:.4%}")
             
-            st.write(f"**Shape données transformées:** {client_processed.shape}")
+            st.write(f"**Shape données transformées:** {clients_processed[i - 1:i].shape}")
         
         # Affichage résultat
         col1, col2, col3 = st.columns(3)
@@ -179,11 +139,11 @@ for i, client in enumerate(test_clients, 1):
             st.metric(
                 label="**Probabilité Churn**",
                 value=f"{churn_proba:.2%}",
-                delta="FAIBLE" if churn_proba < 0.3 else "MOYEN" if churn_proba < 0.7 else "ÉLEVÉ"
+                delta=scores["risk_level"].iloc[i - 1]
             )
         
         with col2:
-            decision = "FIDÈLE" if churn_proba < 0.5 else "CHURN"
+            decision = "FIDÈLE" if scores["prediction"].iloc[i - 1] == "Restera" else "CHURN"
             st.metric("**Décision**", decision)
             
         with col3:
@@ -209,6 +169,67 @@ if len(results) == 3:
     else:
         st.error("❌ **Discrimination faible**")
 
+# ==================== PARITÉ CHEMIN RAPIDE ====================
+st.markdown("---")
+st.subheader("⚡ PARITÉ CHEMIN RAPIDE")
+
+if scores is not None:
+    try:
+        compiled_scorer = CompiledScorer.from_model(model, preprocessor, normalize=True)
+        parity = check_parity(compiled_scorer, [client['data'] for client in test_clients], scores["churn_probability"])
+        
+        for client, fast_proba in zip(test_clients, parity["fast_proba"]):
+            st.write(f"**{client['name']}:** {fast_proba:.6f}")
+        
+        st.write(f"**Écart max avec predict_proba:** {parity['max_abs_diff']:.2e}")
+        st.write(f"**Latence chemin rapide:** {parity['latency_us']:.0f} µs / client")
+        
+        if parity["ok"]:
+            st.success("✅ Chemin rapide identique au modèle")
+        else:
+            st.error("❌ Chemin rapide différent du modèle")
+    except (TypeError, ValueError) as e:
+        st.warning(f"⚠️ Chemin rapide non disponible: {e}")
+
+# ==================== PARITÉ PIPELINE FUSIONNÉ ====================
+st.markdown("---")
+st.subheader("🔗 PARITÉ PIPELINE FUSIONNÉ")
+
+if fused_pipeline is None:
+    st.warning("⚠️ Pipeline fusionné non disponible pour ce modèle")
+else:
+    n_clients = st.select_slider("Taille du lot", [1000, 10000, 100000], value=10000)
+    batch = synthetic_clients(n_clients, seed=0)
+    
+    start = time.perf_counter()
+    reference = score(batch, model, preprocessor, normalize=True)
+    three_step_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    fused = fused_pipeline.score(batch)
+    fused_time = time.perf_counter() - start
+    
+    identical = np.array_equal(reference["churn_probability"].to_numpy(), fused["churn_probability"].to_numpy())
+    st.write(f"**Chemin en 3 étapes:** {three_step_time * 1000:.0f} ms")
+    st.write(f"**Pipeline fusionné:** {fused_time * 1000:.0f} ms (x{three_step_time / fused_time:.1f})")
+    
+    if identical:
+        st.success(f"✅ Sorties identiques sur {n_clients:,} clients")
+    else:
+        st.error("❌ Sorties différentes du chemin en 3 étapes")
+    
+    records = records_from_frame(batch)
+    start = time.perf_counter()
+    records_proba = fused_pipeline.predict_proba(records)
+    records_time = time.perf_counter() - start
+    st.write(f"**Lot d'enregistrements compacts:** {records_time * 1000:.0f} ms, "
+             f"{records.nbytes / 2**20:.1f} Mo contre {batch.memory_usage(deep=True).sum() / 2**20:.1f} Mo en DataFrame")
+    
+    if np.array_equal(reference["churn_probability"].to_numpy(), records_proba):
+        st.success("✅ Enregistrements compacts: sorties identiques")
+    else:
+        st.error("❌ Enregistrements compacts: sorties différentes")
+
 # ==================== TEST MANUEL ====================
 st.markdown("---")
 st.subheader("🎯 TEST MANUEL")
@@ -245,9 +266,9 @@ with st.form("manual_test"):
             'mobile_money_usage': 'Medium', 'customer_persona_ai': 'Saver'
         }
         
-        proba, _, _ = make_prediction(client_data)
-        if proba is not None:
-            churn_proba = proba[0, 1]
+        scores, _ = make_prediction([client_data])
+        if scores is not None:
+            churn_proba = scores["churn_probability"].iloc[0]
             
             st.success(f"**Résultat:** {churn_proba:.2%} de risque de churn")
             st.progress(float(churn_proba))
@@ -0,0 +1,126 @@
+# attributions.py - CONTRIBUTIONS PAR FEATURE DES MODÈLES À ARBRES
+"""Contributions réelles de chaque feature au score churn, calculées en batch.
+
+- LightGBM: contributions natives (`pred_contrib=True`, TreeSHAP)
+- GradientBoosting / RandomForest / ExtraTrees (sklearn): attribution par
+  chemin de décision (Saabas), vectorisée via `decision_path` et un produit
+  matriciel creux
+
+Les contributions des colonnes one-hot sont regroupées par feature d'origine:
+le résultat est une matrice N x 23 alignée sur ALL_FEATURES_ORDERED, dans
+l'échelle du score brut du modèle (log-odds pour le boosting, probabilité
+pour les forêts).
+"""
+import weakref
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from churn_engine import ALL_FEATURES_ORDERED, FEATURE_LABELS, get_default_model, split_model, transform_features
+
+# Matrices (noeuds x features) précalculées par estimateur
+_path_weights_cache = weakref.WeakKeyDictionary()
+
+# ==================== ARBRES SKLEARN ====================
+def _tree_path_weights(tree, node_values, n_features):
+    """Matrice creuse (noeuds x features): variation de valeur en entrant dans chaque noeud"""
+    t = tree.tree_
+    parent = np.full(t.node_count, -1)
+    internal = np.flatnonzero(t.children_left >= 0)
+    parent[t.children_left[internal]] = internal
+    parent[t.children_right[internal]] = internal
+
+    nodes = np.flatnonzero(parent >= 0)
+    delta = node_values[nodes] - node_values[parent[nodes]]
+    return sparse.csr_matrix(
+        (delta, (nodes, t.feature[parent[nodes]])),
+        shape=(t.node_count, n_features)
+    )
+
+def _sklearn_trees(estimator):
+    """(arbres, valeurs des noeuds par arbre, facteur d'échelle) d'un ensemble sklearn"""
+    if hasattr(estimator, "learning_rate") and hasattr(estimator, "init_"):
+        if estimator.estimators_.shape[1] != 1:
+            raise TypeError("Seuls les modèles de boosting binaires sont supportés")
+        trees = list(estimator.estimators_[:, 0])
+        values = [tree.tree_.value[:, 0, 0] for tree in trees]
+        return trees, values, estimator.learning_rate
+
+    trees = list(getattr(estimator, "estimators_", [estimator]))
+    values = []
+    for tree in trees:
+        class_values = tree.tree_.value[:, 0, :]
+        values.append(class_values[:, 1] / class_values.sum(axis=1))
+    return trees, values, 1.0 / len(trees)
+
+def _path_weights(estimator, n_features):
+    if estimator not in _path_weights_cache:
+        trees, values, scale = _sklearn_trees(estimator)
+        weights = sparse.vstack([
+            _tree_path_weights(tree, node_values, n_features)
+            for tree, node_values in zip(trees, values)
+        ]).tocsr() * scale
+        _path_weights_cache[estimator] = (trees, weights)
+    return _path_weights_cache[estimator]
+
+def _sklearn_contributions(estimator, X):
+    trees, weights = _path_weights(estimator, X.shape[1])
+    X = np.asarray(X, dtype=np.float32)
+    paths = sparse.hstack([tree.decision_path(X) for tree in trees]).tocsr()
+    return np.asarray((paths @ weights).todense())
+
+# ==================== API ====================
+def _output_feature_map(steps, n_outputs):
+    """Matrice (colonnes transformées x features d'origine) de regroupement"""
+    if steps and hasattr(steps[-1], "get_feature_names_out"):
+        output_names = [name.split("__", 1)[-1] for name in steps[-1].get_feature_names_out()]
+    else:
+        output_names = ALL_FEATURES_ORDERED[:n_outputs]
+
+    mapping = np.zeros((len(output_names), len(ALL_FEATURES_ORDERED)))
+    for i, name in enumerate(output_names):
+        matches = [j for j, f in enumerate(ALL_FEATURES_ORDERED) if name == f or name.startswith(f + "_")]
+        if matches:
+            mapping[i, max(matches, key=lambda j: len(ALL_FEATURES_ORDERED[j]))] = 1.0
+    return mapping
+
+def compute_feature_impacts(df, model=None, preprocessor=None, normalize=False):
+    """Contributions de chaque feature au score de chaque client (N x 23), en une passe"""
+    if model is None:
+        model = get_default_model()
+
+    steps, estimator = split_model(model, preprocessor)
+    X = transform_features(df, steps, normalize)
+
+    if hasattr(estimator, "booster_"):
+        contributions = estimator.booster_.predict(X, pred_contrib=True)[:, :-1]
+    elif hasattr(estimator, "tree_") or hasattr(estimator, "estimators_"):
+        contributions = _sklearn_contributions(estimator, X)
+    else:
+        raise TypeError(f"Attributions non supportées pour {type(estimator).__name__}")
+
+    impacts = contributions @ _output_feature_map(steps, contributions.shape[1])
+    return pd.DataFrame(impacts, columns=ALL_FEATURES_ORDERED, index=df.index)
+
+def top_drivers(impacts, k=5):
+    """Les k facteurs d'influence les plus forts (en valeur absolue) de chaque client"""
+    values = impacts.to_numpy()
+    k = min(k, values.shape[1])
+
+    top = np.argpartition(-np.abs(values), k - 1, axis=1)[:, :k]
+    top_values = np.take_along_axis(values, top, axis=1)
+    order = np.argsort(-np.abs(top_values), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_values = np.take_along_axis(top_values, order, axis=1)
+
+    features = np.asarray(impacts.columns)[top]
+    drivers = {}
+    for i in range(k):
+        drivers[f"driver_{i + 1}"] = features[:, i]
+        drivers[f"impact_{i + 1}"] = top_values[:, i]
+    return pd.DataFrame(drivers, index=impacts.index)
+
+def labeled_impacts(impacts_row):
+    """Impacts d'un client indexés par libellé d'affichage"""
+    return {FEATURE_LABELS[f]: float(v) for f, v in impacts_row.items()}
@@ -0,0 +1,191 @@
+# benchmarks.py - BENCHMARKS DES CHEMINS CRITIQUES DE SCORING
+"""Mesure séparément les étapes du scoring sur des clients synthétiques
+générés autour des TEST_CLIENTS:
+
+- chargement des artefacts
+- latence predict_proba d'un client (DataFrame d'une ligne et chemin rapide)
+- débit batch pour 1, 100, 10k et 1M clients
+- calcul des attributions
+- rendu du graphique des facteurs
+
+Les résultats sont écrits en JSON pour comparer deux versions de modèle:
+
+    python benchmarks.py --output bench_pro.json
+    python benchmarks.py --model ../models/best_churn_model_hackathon.pkl \\
+        --preprocessor ../models/preprocessor.pkl --normalize --output bench_hackathon.json
+    python benchmarks.py --compare bench_pro.json bench_hackathon.json
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+from churn_engine import ALL_FEATURES_ORDERED, MODEL_PATH, score
+from client_profiles import synthetic_clients
+
+DEFAULT_BATCH_SIZES = [1, 100, 10000, 1000000]
+SINGLE_ROW_REPEATS = 200
+ATTRIBUTION_ROWS = 10000
+REGRESSION_THRESHOLD = 0.10
+
+def _percentiles(samples_s):
+    samples_ms = np.asarray(samples_s) * 1000
+    return {
+        "p50_ms": float(np.percentile(samples_ms, 50)),
+        "p95_ms": float(np.percentile(samples_ms, 95)),
+        "p99_ms": float(np.percentile(samples_ms, 99)),
+        "mean_ms": float(samples_ms.mean())
+    }
+
+def _timed(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+# ==================== ÉTAPES ====================
+def bench_artifact_load(model_path, preprocessor_path, repeats=3):
+    results = {"model": _percentiles(_timed(lambda: joblib.load(model_path), repeats))}
+    if preprocessor_path is not None:
+        results["preprocessor"] = _percentiles(_timed(lambda: joblib.load(preprocessor_path), repeats))
+    return results
+
+def bench_single_row(model, preprocessor, normalize, clients):
+    rows = [clients.iloc[[i]] for i in range(SINGLE_ROW_REPEATS)]
+    iterator = iter(rows)
+    results = {"dataframe": _percentiles(_timed(
+        lambda: score(next(iterator), model, preprocessor, normalize), SINGLE_ROW_REPEATS
+    ))}
+
+    from fast_path import CompiledScorer
+    try:
+        compiled = CompiledScorer.from_model(model, preprocessor, normalize)
+    except (TypeError, ValueError) as e:
+        results["fast_path"] = {"error": str(e)}
+    else:
+        records = iter(clients.head(SINGLE_ROW_REPEATS).to_dict(orient="records"))
+        results["fast_path"] = _percentiles(_timed(
+            lambda: compiled.predict_row(next(records)), SINGLE_ROW_REPEATS
+        ))
+    return results
+
+def bench_batch_throughput(model, preprocessor, normalize, clients, batch_sizes):
+    results = {}
+    for batch_size in batch_sizes:
+        batch = clients.head(batch_size)
+        repeats = max(1, min(20, 10000 // batch_size))
+        samples = _timed(lambda: score(batch, model, preprocessor, normalize), repeats)
+        best = min(samples)
+        results[str(batch_size)] = {"seconds": best, "rows_per_s": batch_size / best}
+    return results
+
+def bench_attributions(model, preprocessor, normalize, clients):
+    from attributions import compute_feature_impacts
+    batch = clients.head(ATTRIBUTION_ROWS)
+    try:
+        samples = _timed(lambda: compute_feature_impacts(batch, model, preprocessor, normalize), 3)
+    except TypeError as e:
+        return {"error": str(e)}
+    return {"rows": len(batch), "seconds": min(samples), "rows_per_s": len(batch) / min(samples)}
+
+def bench_figure_render(model, preprocessor, normalize, clients):
+    from attributions import compute_feature_impacts, labeled_impacts
+    from charts import _render_png, chart_key
+
+    try:
+        impacts = labeled_impacts(compute_feature_impacts(clients.head(1), model, preprocessor, normalize).iloc[0])
+    except TypeError as e:
+        return {"error": str(e)}
+    key = chart_key(sorted(impacts.items(), key=lambda x: abs(x[1]), reverse=True)[:6])
+    _render_png(key)  # import matplotlib hors mesure
+    return _percentiles(_timed(lambda: _render_png(key), 10))
+
+# ==================== SUITE ====================
+def run_suite(model_path=MODEL_PATH, preprocessor_path=None, normalize=False,
+              batch_sizes=DEFAULT_BATCH_SIZES, seed=0):
+    model = joblib.load(model_path)
+    preprocessor = joblib.load(preprocessor_path) if preprocessor_path else None
+    clients = synthetic_clients(max(max(batch_sizes), SINGLE_ROW_REPEATS, ATTRIBUTION_ROWS), seed=seed)
+
+    stages = {}
+    stage_functions = [
+        ("artifact_load", lambda: bench_artifact_load(model_path, preprocessor_path)),
+        ("single_row", lambda: bench_single_row(model, preprocessor, normalize, clients)),
+        ("batch_throughput", lambda: bench_batch_throughput(model, preprocessor, normalize, clients, batch_sizes)),
+        ("attributions", lambda: bench_attributions(model, preprocessor, normalize, clients)),
+        ("figure_render", lambda: bench_figure_render(model, preprocessor, normalize, clients))
+    ]
+    for name, run_stage in stage_functions:
+        print(f"- {name}...", flush=True)
+        stages[name] = run_stage()
+
+    return {
+        "model": Path(model_path).name,
+        "preprocessor": Path(preprocessor_path).name if preprocessor_path else None,
+        "normalize": normalize,
+        "features": len(ALL_FEATURES_ORDERED),
+        "timestamp": datetime.now().isoformat(),
+        "platform": {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor()},
+        "stages": stages
+    }
+
+# ==================== COMPARAISON ====================
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare_results(baseline, candidate, threshold=REGRESSION_THRESHOLD):
+    """Métriques dégradées de plus de `threshold` (latences en hausse, débits en baisse)"""
+    base, cand = _flatten(baseline["stages"]), _flatten(candidate["stages"])
+    regressions = []
+    for name in sorted(base.keys() & cand.keys()):
+        if base[name] <= 0:
+            continue
+        change = (cand[name] - base[name]) / base[name]
+        higher_is_better = name.endswith("rows_per_s")
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append({"metric": name, "baseline": base[name], "candidate": cand[name], "change": change})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du scoring BankChurnAI")
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--preprocessor", default=None, help="Preprocesseur séparé (modèle hackathon)")
+    parser.add_argument("--normalize", action="store_true", help="Normalisation monétaire (modèle hackathon)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATE"))
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            candidate = json.load(f)
+        regressions = compare_results(baseline, candidate, args.threshold)
+        print(json.dumps(regressions, indent=2, ensure_ascii=False))
+        raise SystemExit(1 if regressions else 0)
+
+    results = run_suite(args.model, args.preprocessor, args.normalize, args.sizes, args.seed)
+    output = args.output or f"bench_{Path(args.model).stem}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"Résultats: {output}")
+
+if __name__ == "__main__":
+    main()
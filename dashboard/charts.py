@@ -0,0 +1,229 @@
+# charts.py - RENDU DES GRAPHIQUES DE FACTEURS D'INFLUENCE
+"""Rendu du graphique 'Importance / Direction' des facteurs d'influence.
+
+Deux backends:
+- image: figure matplotlib rendue en PNG, mise en cache par `sorted_features`
+  et libérée immédiatement (pas de pyplot, donc aucune figure globale qui
+  s'accumule entre les reruns)
+- vega: spécification Vega-Lite rendue côté navigateur par st.vega_lite_chart
+
+    python charts.py   # comparaison latence/mémoire des deux backends
+"""
+import io
+import json
+import time
+import tracemalloc
+from functools import lru_cache
+
+from churn_engine import STARTUP_TIMINGS, timed_stage
+
+CHART_CACHE_SIZE = 256
+CHART_BACKENDS = {"Image (matplotlib)": "image", "Interactif (Vega-Lite)": "vega"}
+
+def chart_key(sorted_features):
+    """Clé hashable et stable de `sorted_features` [(libellé, impact), ...]"""
+    return tuple((label, round(float(impact), 4)) for label, impact in sorted_features)
+
+# ==================== BACKEND IMAGE ====================
+def _draw_factor_figure(key):
+    if "import matplotlib" not in STARTUP_TIMINGS:
+        with timed_stage("import matplotlib"):
+            import matplotlib.backends.backend_agg  # noqa: F401
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(15, 6))
+    FigureCanvasAgg(fig)
+    fig.patch.set_facecolor('#0a0a0a')
+    ax1, ax2 = fig.subplots(1, 2)
+
+    features = [f[0] for f in key]
+    impacts = [f[1] for f in key]
+    importances = [abs(i) for i in impacts]
+    y_pos = list(range(len(features)))
+
+    # Graphique 1
+    ax1.barh(y_pos, importances, color='#00ff00')
+    ax1.set_yticks(y_pos)
+    ax1.set_yticklabels(features)
+    ax1.set_xlabel('Importance Absolue', color='#e0e0e0')
+    ax1.set_title('Importance des Facteurs', color='#00ff00')
+    ax1.invert_yaxis()
+    ax1.set_facecolor('#1a1a1a')
+    ax1.tick_params(colors='#e0e0e0')
+
+    # Graphique 2
+    colors = ['#ff4444' if x > 0 else '#00ff00' for x in impacts]
+    ax2.barh(y_pos, impacts, color=colors)
+    ax2.set_yticks(y_pos)
+    ax2.set_yticklabels(features)
+    ax2.set_xlabel('Impact sur Churn (score brut du modèle)', color='#e0e0e0')
+    ax2.set_title('Direction de l\'Impact', color='#00ff00')
+    ax2.axvline(x=0, color='#ffffff', linestyle='-', alpha=0.3)
+    ax2.invert_yaxis()
+    ax2.set_facecolor('#1a1a1a')
+    ax2.tick_params(colors='#e0e0e0')
+
+    fig.tight_layout()
+    return fig
+
+def _render_png(key):
+    fig = _draw_factor_figure(key)
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", facecolor=fig.get_facecolor(), dpi=100)
+        return buffer.getvalue()
+    finally:
+        fig.clear()
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _cached_png(key):
+    return _render_png(key)
+
+def render_factor_chart(sorted_features):
+    """PNG du graphique des facteurs (octets), en cache par `sorted_features`"""
+    return _cached_png(chart_key(sorted_features))
+
+def chart_cache_info():
+    return _cached_png.cache_info()
+
+# ==================== BACKEND VEGA-LITE ====================
+def factor_chart_spec(sorted_features):
+    """Spécification Vega-Lite équivalente, rendue côté client"""
+    rows = [
+        {"facteur": label, "importance": abs(impact), "impact": impact}
+        for label, impact in chart_key(sorted_features)
+    ]
+    order = [row["facteur"] for row in rows]
+    axis = {"labelColor": "#e0e0e0", "titleColor": "#e0e0e0", "gridColor": "#333333"}
+    y = {"field": "facteur", "type": "nominal", "sort": order, "title": None, "axis": axis}
+
+    return {
+        "data": {"values": rows},
+        "background": "#0a0a0a",
+        "config": {"view": {"fill": "#1a1a1a", "stroke": None}, "title": {"color": "#00ff00"}},
+        "hconcat": [
+            {
+                "title": "Importance des Facteurs",
+                "mark": "bar",
+                "encoding": {
+                    "y": y,
+                    "x": {"field": "importance", "type": "quantitative", "title": "Importance Absolue", "axis": axis},
+                    "color": {"value": "#00ff00"},
+                    "tooltip": [{"field": "facteur"}, {"field": "importance", "format": ".4f"}]
+                }
+            },
+            {
+                "title": "Direction de l'Impact",
+                "mark": "bar",
+                "encoding": {
+                    "y": y,
+                    "x": {"field": "impact", "type": "quantitative", "title": "Impact sur Churn", "axis": axis},
+                    "color": {
+                        "condition": {"test": "datum.impact > 0", "value": "#ff4444"},
+                        "value": "#00ff00"
+                    },
+                    "tooltip": [{"field": "facteur"}, {"field": "impact", "format": ".4f"}]
+                }
+            }
+        ]
+    }
+
+# ==================== SENSIBILITÉ ====================
+_AXIS = {"labelColor": "#e0e0e0", "titleColor": "#e0e0e0", "gridColor": "#333333"}
+_CONFIG = {"view": {"fill": "#1a1a1a", "stroke": None}, "title": {"color": "#00ff00"}}
+
+def sensitivity_chart_spec(curves, current_values):
+    """Courbes de réponse (une par facteur) avec la valeur actuelle du client en pointillés"""
+    rows = [
+        {"facteur": label, "valeur": value, "probabilité": proba, "actuel": float(current_values[label])}
+        for label, value, proba in curves[["label", "value", "churn_probability"]].itertuples(index=False)
+    ]
+    x = {"field": "valeur", "type": "quantitative", "title": None, "axis": _AXIS}
+    y = {"field": "probabilité", "type": "quantitative", "title": "Probabilité Churn",
+         "scale": {"domain": [0, 1]}, "axis": {**_AXIS, "format": ".0%"}}
+
+    return {
+        "background": "#0a0a0a",
+        "config": _CONFIG,
+        "data": {"values": rows},
+        "facet": {"field": "facteur", "type": "nominal", "title": None,
+                  "header": {"labelColor": "#00ff00", "labelFontSize": 12}},
+        "columns": 3,
+        "resolve": {"scale": {"x": "independent"}},
+        "spec": {
+            "width": 220,
+            "height": 160,
+            "layer": [
+                {
+                    "mark": {"type": "line", "point": True, "color": "#00ff00"},
+                    "encoding": {
+                        "x": x, "y": y,
+                        "tooltip": [{"field": "valeur"}, {"field": "probabilité", "format": ".1%"}]
+                    }
+                },
+                {
+                    "mark": {"type": "rule", "color": "#ff4444", "strokeDash": [4, 4]},
+                    "encoding": {"x": {"aggregate": "max", "field": "actuel", "type": "quantitative"}}
+                }
+            ]
+        }
+    }
+
+def surface_chart_spec(surface, feature_x, feature_y, label_x, label_y):
+    """Carte de chaleur du risque sur la grille de deux features"""
+    rows = [
+        {"x": x, "y": y, "probabilité": proba}
+        for x, y, proba in surface[[feature_x, feature_y, "churn_probability"]].itertuples(index=False)
+    ]
+    return {
+        "background": "#0a0a0a",
+        "config": _CONFIG,
+        "title": f"Interaction {label_x} x {label_y}",
+        "data": {"values": rows},
+        "mark": "rect",
+        "encoding": {
+            "x": {"field": "x", "type": "ordinal", "title": label_x, "axis": {**_AXIS, "format": ".4~g"}},
+            "y": {"field": "y", "type": "ordinal", "title": label_y, "sort": "descending",
+                  "axis": {**_AXIS, "format": ".4~g"}},
+            "color": {"field": "probabilité", "type": "quantitative", "title": "Churn",
+                      "scale": {"scheme": "redyellowgreen", "reverse": True, "domain": [0, 1]}},
+            "tooltip": [{"field": "x", "title": label_x}, {"field": "y", "title": label_y},
+                        {"field": "probabilité", "format": ".1%"}]
+        }
+    }
+
+# ==================== COMPARAISON ====================
+def _measure(render, n_iterations):
+    start = time.perf_counter()
+    for _ in range(n_iterations):
+        output = render()
+    elapsed = time.perf_counter() - start
+
+    # Pic mémoire mesuré à part: tracemalloc ralentit fortement le rendu
+    tracemalloc.start()
+    render()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size = len(output) if isinstance(output, bytes) else len(json.dumps(output))
+    return {"mean_ms": elapsed / n_iterations * 1000, "peak_kib": peak / 1024, "payload_kib": size / 1024}
+
+def compare_backends(sorted_features, n_iterations=20):
+    """Latence moyenne, pic mémoire Python et taille envoyée au navigateur par backend"""
+    key = chart_key(sorted_features)
+    _render_png(key)  # import et initialisation de matplotlib hors mesure
+    render_factor_chart(sorted_features)
+
+    return {
+        "matplotlib_png": _measure(lambda: _render_png(key), n_iterations),
+        "matplotlib_png_cached": _measure(lambda: render_factor_chart(sorted_features), n_iterations),
+        "vega_lite_spec": _measure(lambda: factor_chart_spec(sorted_features), n_iterations)
+    }
+
+if __name__ == "__main__":
+    example = [
+        ("Dernière transaction", 0.52), ("Score crédit", -0.41), ("Sentiment client", 0.33),
+        ("Usage app mobile", -0.21), ("Profil client", 0.12), ("Frais transfert", 0.05)
+    ]
+    print(json.dumps(compare_backends(example), indent=2))
@@ -0,0 +1,318 @@
+# churn_engine.py - MOTEUR DE SCORING SANS INTERFACE
+"""Moteur de prédiction BankChurnAI, importable sans Streamlit ni matplotlib.
+
+Utilisé par app.py, app_test.py et les traitements batch:
+
+    from churn_engine import score
+    resultats = score(df_clients)
+
+    python churn_engine.py mmap   # copies mémoire-mappables des artefacts .pkl
+"""
+import hashlib
+import json
+import logging
+import pickle
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Chemins des artefacts
+current_dir = Path(__file__).parent
+MODEL_PATH = current_dir / 'best_churn_model_pro_20251129_080606.pkl'
+METADATA_PATH = current_dir / 'model_metadata_pro_20251129_080606.json'
+PREPROCESSOR_PATH = current_dir / 'preprocessor_pro_20251129_080606.pkl'
+# Les modèles versionnés se nomment best_churn_model_<version>.pkl
+MODEL_PREFIX = "best_churn_model_"
+
+# Features
+NUM_FEATURES = [
+    "age", "household_size", "zone_security_level", "distance_to_branch_km",
+    "income_monthly", "account_balance", "credit_score", "loan_balance",
+    "transactions_count_monthly", "transfer_fees_paid", "time_with_bank_months",
+    "last_transaction_days", "diaspora_transfers_received", "mobile_app_logins",
+    "sentiment_score", "access_to_internet"
+]
+
+CAT_FEATURES = [
+    "gender", "marital_status", "education_level", "profession",
+    "region", "mobile_money_usage", "customer_persona_ai"
+]
+
+ALL_FEATURES_ORDERED = NUM_FEATURES + CAT_FEATURES
+
+# Seuils de risque
+RISK_LOW_THRESHOLD = 0.3
+RISK_HIGH_THRESHOLD = 0.7
+DECISION_THRESHOLD = 0.5
+RISK_LABELS = ["FAIBLE", "MOYEN", "ÉLEVÉ"]
+
+# Normalisation monétaire du modèle hackathon (même que l'entraînement)
+MONETARY_DIVISORS = {
+    'income_monthly': 1000,
+    'account_balance': 1000,
+    'loan_balance': 1000,
+    'diaspora_transfers_received': 1000,
+    'transfer_fees_paid': 100
+}
+
+# Libellés affichés pour les facteurs d'influence
+FEATURE_LABELS = {
+    "age": "Âge",
+    "household_size": "Taille ménage",
+    "zone_security_level": "Niveau sécurité",
+    "distance_to_branch_km": "Distance agence",
+    "income_monthly": "Revenu mensuel",
+    "account_balance": "Solde compte",
+    "credit_score": "Score crédit",
+    "loan_balance": "Solde prêt",
+    "transactions_count_monthly": "Transactions/mois",
+    "transfer_fees_paid": "Frais transfert",
+    "time_with_bank_months": "Ancienneté",
+    "last_transaction_days": "Dernière transaction",
+    "diaspora_transfers_received": "Transferts diaspora",
+    "mobile_app_logins": "Usage app mobile",
+    "sentiment_score": "Sentiment client",
+    "access_to_internet": "Accès internet",
+    "gender": "Genre",
+    "marital_status": "Statut matrimonial",
+    "education_level": "Niveau éducation",
+    "profession": "Profession",
+    "region": "Région",
+    "mobile_money_usage": "Usage mobile money",
+    "customer_persona_ai": "Profil client"
+}
+
+SCORE_COLUMNS = ["churn_probability", "risk_level", "prediction", "confidence"]
+
+BATCH_CHUNK_SIZE = 50000
+
+# ==================== CHARGEMENT ====================
+logger = logging.getLogger(__name__)
+
+# Durées des étapes de démarrage (secondes), par nom d'étape
+STARTUP_TIMINGS = {}
+
+# Dernière erreur de chargement par chemin d'artefact
+LOAD_ERRORS = {}
+
+LOAD_EXCEPTIONS = (OSError, EOFError, pickle.UnpicklingError, ImportError, AttributeError, ValueError)
+
+@contextmanager
+def timed_stage(name):
+    """Mesure la durée d'une étape de démarrage dans STARTUP_TIMINGS"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = time.perf_counter() - start
+
+def mmap_artifact_path(path):
+    """Copie mémoire-mappable d'un artefact .pkl (même dossier, suffixe .mmap.joblib)"""
+    path = Path(path)
+    return path.with_name(path.stem + ".mmap.joblib")
+
+def export_mmap_artifacts(paths=(MODEL_PATH, PREPROCESSOR_PATH)):
+    """Réécrit les artefacts sans compression pour joblib.load(mmap_mode='r')"""
+    exported = []
+    for path in paths:
+        target = mmap_artifact_path(path)
+        joblib.dump(joblib.load(path), target, compress=0)
+        exported.append(target)
+    return exported
+
+def load_artifact(path):
+    """Charge un artefact joblib, via sa copie mémoire-mappée si elle est à jour.
+
+    Retourne None si le fichier est absent ou illisible; l'erreur est
+    journalisée et conservée dans LOAD_ERRORS.
+    """
+    path = Path(path)
+    mmap_path = mmap_artifact_path(path)
+    try:
+        if mmap_path.exists() and (not path.exists() or mmap_path.stat().st_mtime >= path.stat().st_mtime):
+            return joblib.load(mmap_path, mmap_mode='r')
+        if path.exists():
+            return joblib.load(path)
+        LOAD_ERRORS[str(path)] = "Fichier introuvable"
+    except LOAD_EXCEPTIONS as e:
+        logger.error("Chargement impossible de %s: %s", path, e)
+        LOAD_ERRORS[str(path)] = f"{type(e).__name__}: {e}"
+    return None
+
+def load_model(path=MODEL_PATH):
+    with timed_stage("chargement modèle"):
+        return load_artifact(path)
+
+def load_preprocessor(path=PREPROCESSOR_PATH):
+    with timed_stage("chargement preprocesseur"):
+        return load_artifact(path)
+
+def load_metadata(path=METADATA_PATH):
+    try:
+        if Path(path).exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.error("Métadonnées illisibles %s: %s", path, e)
+        LOAD_ERRORS[str(path)] = f"{type(e).__name__}: {e}"
+    return {}
+
+def model_version(model_path=MODEL_PATH):
+    """Identifiant de version d'un fichier modèle (nommage unique du projet).
+
+    best_churn_model_<version>.pkl -> <version>, comme dans le registre; pour
+    un autre nom, le nom du fichier suivi d'une empreinte de son contenu.
+    """
+    path = Path(model_path)
+    if path.stem.startswith(MODEL_PREFIX):
+        return path.stem[len(MODEL_PREFIX):]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"{path.stem}_{digest.hexdigest()[:12]}"
+
+_default_model = None
+
+def get_default_model():
+    """Modèle par défaut, chargé une seule fois par processus"""
+    global _default_model
+    if _default_model is None:
+        _default_model = load_model()
+        if _default_model is None:
+            raise FileNotFoundError(f"Modèle introuvable: {MODEL_PATH}")
+    return _default_model
+
+# ==================== SCORING ====================
+def risk_levels(churn_proba):
+    """Niveaux de risque FAIBLE/MOYEN/ÉLEVÉ pour un vecteur de probabilités"""
+    churn_proba = np.asarray(churn_proba)
+    return np.select(
+        [churn_proba < RISK_LOW_THRESHOLD, churn_proba < RISK_HIGH_THRESHOLD],
+        RISK_LABELS[:2],
+        default=RISK_LABELS[2]
+    )
+
+def normalize_monetary(df):
+    """Applique les diviseurs monétaires du modèle hackathon sur toutes les lignes"""
+    normalized = df.copy()
+    for feature, divisor in MONETARY_DIVISORS.items():
+        if feature in normalized.columns:
+            normalized[feature] = normalized[feature] / divisor
+    return normalized
+
+def prepare_features(df, preprocessor=None, normalize=False):
+    """Sélectionne les features dans l'ordre du modèle, normalise et transforme"""
+    missing = [f for f in ALL_FEATURES_ORDERED if f not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+
+    X = df[ALL_FEATURES_ORDERED]
+    if normalize:
+        X = normalize_monetary(X)
+    if preprocessor is not None:
+        X = preprocessor.transform(X)
+    return X
+
+def split_model(model, preprocessor=None):
+    """Sépare un modèle en (étapes de transformation, estimateur final).
+
+    Les pipelines sklearn/imblearn sont dépliés; les étapes sans `transform`
+    (rééchantillonneurs comme SMOTE, 'passthrough') sont ignorées.
+    """
+    steps = [] if preprocessor is None else [preprocessor]
+    if hasattr(model, "steps"):
+        steps.extend(step for _, step in model.steps[:-1] if hasattr(step, "transform"))
+        model = model.steps[-1][1]
+    return steps, model
+
+def transform_features(df, steps, normalize=False):
+    """Matrice d'entrée de l'estimateur final (voir split_model)"""
+    X = prepare_features(df, normalize=normalize)
+    for step in steps:
+        X = step.transform(X)
+    return X
+
+def score(df, model=None, preprocessor=None, normalize=False):
+    """Score N clients en un seul appel vectorisé à predict_proba.
+
+    Retourne un DataFrame aligné sur l'index de `df` avec les colonnes
+    churn_probability, risk_level, prediction et confidence.
+    """
+    if model is None:
+        model = get_default_model()
+
+    churn_proba = model.predict_proba(prepare_features(df, preprocessor, normalize))[:, 1]
+    return scores_from_proba(churn_proba, df.index)
+
+def scores_from_proba(churn_proba, index=None):
+    """Colonnes SCORE_COLUMNS à partir d'un vecteur de probabilités de churn"""
+    return pd.DataFrame({
+        "churn_probability": churn_proba,
+        "risk_level": risk_levels(churn_proba),
+        "prediction": np.where(churn_proba < DECISION_THRESHOLD, "Restera", "Partira"),
+        "confidence": np.maximum(churn_proba, 1 - churn_proba)
+    }, index=index)
+
+def score_record(churn_proba):
+    """Score d'un seul client à partir de sa probabilité (même champs que score)"""
+    churn_proba = float(churn_proba)
+    return {
+        "churn_probability": churn_proba,
+        "risk_level": str(risk_levels(churn_proba)),
+        "prediction": "Restera" if churn_proba < DECISION_THRESHOLD else "Partira",
+        "confidence": max(churn_proba, 1 - churn_proba)
+    }
+
+# ==================== PORTEFEUILLE (BATCH) ====================
+def count_portfolio_rows(source, file_format):
+    """Estimation du nombre de clients du portefeuille (pour les barres de progression).
+
+    Exact en Parquet (métadonnées). En CSV, compte les fins de ligne sans
+    analyser le fichier: un champ multiligne ou une dernière ligne sans fin de
+    ligne fausse le total, qui ne doit pas être présenté comme exact.
+    """
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(source).metadata.num_rows
+
+    if hasattr(source, "getvalue"):
+        n_lines = source.getvalue().count(b"\n")
+    else:
+        n_lines = 0
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                n_lines += block.count(b"\n")
+    return max(n_lines - 1, 0)
+
+def iter_portfolio_chunks(source, file_format, chunksize=BATCH_CHUNK_SIZE):
+    """Lit un portefeuille CSV/Parquet par blocs de `chunksize` lignes"""
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize)
+
+def score_chunk(chunk, model=None, preprocessor=None, normalize=False):
+    """Bloc de clients complété par les colonnes de score"""
+    scores = score(chunk, model, preprocessor, normalize)
+    results = chunk.copy()
+    for column in SCORE_COLUMNS:
+        results[column] = scores[column]
+    return results
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["mmap"]:
+        for exported in export_mmap_artifacts():
+            print(f"Artefact exporté: {exported}")
+    else:
+        print("Usage: python churn_engine.py mmap")
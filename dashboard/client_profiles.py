@@ -0,0 +1,95 @@
+# client_profiles.py - PROFILS CLIENTS DE RÉFÉRENCE ET CLIENTS SYNTHÉTIQUES
+"""Profils de test partagés (app_test.py, benchmarks) et générateur de
+portefeuilles synthétiques construits autour de ces profils."""
+import numpy as np
+import pandas as pd
+
+from churn_engine import ALL_FEATURES_ORDERED, NUM_FEATURES
+
+TEST_CLIENTS = [
+    {
+        "name": "👑 CLIENT FIDÈLE",
+        "description": "Client stable, bon revenu, utilise les services digitaux",
+        "data": {
+            'age': 45, 'household_size': 3, 'zone_security_level': 1,
+            'distance_to_branch_km': 2.0, 'income_monthly': 80000,
+            'account_balance': 150000, 'credit_score': 750, 'loan_balance': 50000,
+            'transactions_count_monthly': 25, 'transfer_fees_paid': 500,
+            'time_with_bank_months': 60, 'last_transaction_days': 3,
+            'diaspora_transfers_received': 20000, 'mobile_app_logins': 15,
+            'sentiment_score': 0.7, 'access_to_internet': 1,
+            'gender': 'M', 'marital_status': 'Married', 'education_level': 'University',
+            'profession': 'Civil Servant', 'region': 'Ouest',
+            'mobile_money_usage': 'High', 'customer_persona_ai': 'Digital Native'
+        }
+    },
+    {
+        "name": "⚠️ CLIENT RISQUÉ", 
+        "description": "Client jeune, faible revenu, peu d'activité",
+        "data": {
+            'age': 28, 'household_size': 2, 'zone_security_level': 5,
+            'distance_to_branch_km': 25.0, 'income_monthly': 12000,
+            'account_balance': 5000, 'credit_score': 420, 'loan_balance': 0,
+            'transactions_count_monthly': 3, 'transfer_fees_paid': 50,
+            'time_with_bank_months': 8, 'last_transaction_days': 45,
+            'diaspora_transfers_received': 0, 'mobile_app_logins': 0,
+            'sentiment_score': -0.6, 'access_to_internet': 0,
+            'gender': 'F', 'marital_status': 'Single', 'education_level': 'Primary',
+            'profession': 'Unemployed', 'region': 'Nord',
+            'mobile_money_usage': 'Low', 'customer_persona_ai': 'Cash User'
+        }
+    },
+    {
+        "name": "📊 CLIENT MOYEN",
+        "description": "Client avec profil mixte, risque modéré",
+        "data": {
+            'age': 35, 'household_size': 2, 'zone_security_level': 3,
+            'distance_to_branch_km': 10.0, 'income_monthly': 40000,
+            'account_balance': 50000, 'credit_score': 600, 'loan_balance': 20000,
+            'transactions_count_monthly': 12, 'transfer_fees_paid': 200,
+            'time_with_bank_months': 24, 'last_transaction_days': 15,
+            'diaspora_transfers_received': 5000, 'mobile_app_logins': 8,
+            'sentiment_score': 0.1, 'access_to_internet': 1,
+            'gender': 'M', 'marital_status': 'Married', 'education_level': 'Secondary',
+            'profession': 'Merchant', 'region': 'Artibonite',
+            'mobile_money_usage': 'Medium', 'customer_persona_ai': 'Trader'
+        }
+    }
+]
+
+# Bornes des widgets de app.py (min, max)
+WIDGET_BOUNDS = {
+    'age': (18, 80), 'household_size': (1, 8), 'zone_security_level': (1, 5),
+    'distance_to_branch_km': (0.0, 100.0), 'income_monthly': (5000, 5000000),
+    'account_balance': (0, 10000000), 'credit_score': (300, 850), 'loan_balance': (0, 5000000),
+    'transactions_count_monthly': (0, 200), 'transfer_fees_paid': (0, 50000),
+    'time_with_bank_months': (1, 240), 'last_transaction_days': (0, 90),
+    'diaspora_transfers_received': (0, 1000000), 'mobile_app_logins': (0, 50),
+    'sentiment_score': (-1.0, 1.0), 'access_to_internet': (0, 1)
+}
+
+# Variables entières (arrondies après bruitage)
+INTEGER_FEATURES = [f for f in NUM_FEATURES if f not in ('distance_to_branch_km', 'sentiment_score')]
+
+def synthetic_clients(n, seed=0, noise=0.25):
+    """Portefeuille synthétique de `n` clients tirés autour des TEST_CLIENTS.
+
+    Chaque client reprend un profil au hasard; ses variables numériques sont
+    bruitées (±`noise` relatif) puis ramenées dans les bornes des widgets.
+    """
+    rng = np.random.default_rng(seed)
+    profiles = pd.DataFrame([client['data'] for client in TEST_CLIENTS])[ALL_FEATURES_ORDERED]
+    clients = profiles.iloc[rng.integers(0, len(profiles), n)].reset_index(drop=True)
+
+    for feature in NUM_FEATURES:
+        low, high = WIDGET_BOUNDS[feature]
+        if feature == 'sentiment_score':
+            values = clients[feature] + rng.normal(0, noise, n)
+        elif feature == 'access_to_internet':
+            values = np.where(rng.random(n) < noise / 2, 1 - clients[feature], clients[feature])
+        else:
+            values = clients[feature] * rng.uniform(1 - noise, 1 + noise, n)
+        values = np.clip(values, low, high)
+        clients[feature] = np.round(values).astype(np.int64) if feature in INTEGER_FEATURES else np.round(values, 1)
+
+    return clients
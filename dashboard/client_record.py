@@ -0,0 +1,78 @@
+# client_record.py - ENREGISTREMENT CLIENT COMPACT (DTYPE STRUCTURÉ NUMPY)
+"""Représentation compacte d'un client, dans l'ordre ALL_FEATURES_ORDERED.
+
+Un client est une ligne d'un tableau NumPy structuré de 135 octets: les 16
+NUM_FEATURES en float64 (NaN si manquant), puis les 7 CAT_FEATURES en codes
+int8 des vocabulaires de schema.py (MISSING_CODE si manquant ou inconnu).
+Un lot de clients est un seul bloc mémoire contigu: pas de dict de 23 clés
+ni de DataFrame object par requête.
+
+Les matrices numérique (N x 16) et des codes (N x 7) sont des vues sur le
+lot (aucune copie): fast_path.CompiledPreprocessor.transform_records les
+transforme directement en entrée du modèle.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib import recfunctions
+
+from churn_engine import CAT_FEATURES, NUM_FEATURES
+from schema import CATEGORY_DTYPES, CATEGORY_VOCABULARIES, MISSING_CODE, category_codes
+
+CLIENT_RECORD_DTYPE = np.dtype(
+    [(feature, np.float64) for feature in NUM_FEATURES] + [(feature, np.int8) for feature in CAT_FEATURES]
+)
+
+_CODE_LOOKUPS = {
+    feature: {value: code for code, value in enumerate(CATEGORY_VOCABULARIES[feature])} for feature in CAT_FEATURES
+}
+
+# ==================== CONSTRUCTION ====================
+def client_record(client_data):
+    """Lot d'un client (tableau structuré de longueur 1) à partir d'un dict"""
+    values = tuple(
+        np.nan if client_data.get(feature) is None else float(client_data[feature]) for feature in NUM_FEATURES
+    ) + tuple(
+        _CODE_LOOKUPS[feature].get(client_data.get(feature), MISSING_CODE) for feature in CAT_FEATURES
+    )
+    return np.array([values], dtype=CLIENT_RECORD_DTYPE)
+
+def records_from_frame(df):
+    """Lot de N clients à partir d'un DataFrame (catégorielles encodées via schema.py)"""
+    records = np.empty(len(df), dtype=CLIENT_RECORD_DTYPE)
+    for feature in NUM_FEATURES:
+        records[feature] = pd.to_numeric(df[feature], errors="coerce").to_numpy(dtype=np.float64)
+    codes = category_codes(df)
+    for i, feature in enumerate(CAT_FEATURES):
+        records[feature] = codes[:, i]
+    return records
+
+def concat_records(records):
+    """Un seul lot contigu à partir de plusieurs lots (ex: requêtes coalescées)"""
+    return records[0] if len(records) == 1 else np.concatenate(records)
+
+# ==================== VUES ====================
+def numeric_matrix(records):
+    """Vue N x 16 (float64) des NUM_FEATURES, sans copie"""
+    return recfunctions.structured_to_unstructured(records[NUM_FEATURES], copy=False)
+
+def code_matrix(records):
+    """Vue N x 7 (int8) des codes des CAT_FEATURES, sans copie"""
+    return recfunctions.structured_to_unstructured(records[CAT_FEATURES], copy=False)
+
+# ==================== CONVERSION ====================
+def records_to_frame(records):
+    """DataFrame (Categorical à vocabulaire fixe) pour le chemin pandas/sklearn"""
+    frame = pd.DataFrame(numeric_matrix(records), columns=NUM_FEATURES)
+    codes = code_matrix(records)
+    for i, feature in enumerate(CAT_FEATURES):
+        frame[feature] = pd.Categorical.from_codes(codes[:, i], dtype=CATEGORY_DTYPES[feature])
+    return frame
+
+def record_to_dict(records, i=0):
+    """Client `i` du lot en dict (valeurs Python, None si manquant)"""
+    row = records[i]
+    client_data = {feature: None if np.isnan(row[feature]) else float(row[feature]) for feature in NUM_FEATURES}
+    for feature in CAT_FEATURES:
+        code = int(row[feature])
+        client_data[feature] = None if code == MISSING_CODE else CATEGORY_VOCABULARIES[feature][code]
+    return client_data
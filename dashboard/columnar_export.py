@@ -0,0 +1,68 @@
+# columnar_export.py - EXPORT EN COLONNES (PARQUET) DES ANALYSES
+"""Export massif des clients scorés en Parquet, pour les chargeurs BI/CRM.
+
+Chaque lot scoré devient un groupe de lignes écrit immédiatement: clients,
+probabilité, niveau de risque, prédiction, confiance, impact de chaque
+feature (`impact_<feature>`), version du modèle et horodatage. Les colonnes
+catégorielles (CAT_FEATURES, risque, prédiction, version) sont encodées en
+dictionnaire avec des vocabulaires fixes, identiques d'un lot à l'autre.
+"""
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from churn_engine import RISK_LABELS, SCORE_COLUMNS
+from schema import apply_schema
+
+PREDICTION_LABELS = ["Restera", "Partira"]
+IMPACT_PREFIX = "impact_"
+
+def export_frame(clients, scores, impacts=None, model_version=None, scored_at=None):
+    """DataFrame d'export d'un lot (catégorielles en Categorical à vocabulaire fixe)"""
+    frame, _ = apply_schema(clients)
+    frame = frame.reset_index(drop=True)
+    for column in SCORE_COLUMNS:
+        frame[column] = scores[column].to_numpy()
+    frame["risk_level"] = pd.Categorical(frame["risk_level"], categories=RISK_LABELS)
+    frame["prediction"] = pd.Categorical(frame["prediction"], categories=PREDICTION_LABELS)
+
+    if impacts is not None:
+        frame = pd.concat([frame, impacts.add_prefix(IMPACT_PREFIX).reset_index(drop=True)], axis=1)
+
+    frame["model_version"] = pd.Categorical([model_version or "inconnu"] * len(frame))
+    frame["scored_at"] = pd.Timestamp(scored_at or datetime.now())
+    return frame
+
+class ColumnarExportWriter:
+    """Écrit un Parquet lot par lot (un groupe de lignes par appel à `write`)"""
+
+    def __init__(self, path, model_version=None, compression="snappy"):
+        self.path = path
+        self.model_version = model_version
+        self.compression = compression
+        self.rows = 0
+        self.row_groups = 0
+        self._writer = None
+
+    def write(self, clients, scores, impacts=None):
+        table = pa.Table.from_pandas(
+            export_frame(clients, scores, impacts, self.model_version), preserve_index=False
+        )
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows += table.num_rows
+        self.row_groups += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,230 @@
+# counterfactual.py - RECHERCHE CONTREFACTUELLE DE RÉTENTION
+"""Changement minimal sur les leviers actionnables pour passer sous un seuil.
+
+Chaque levier (frais, usage de l'application, activité, sentiment) se
+déplace par pas réguliers entre la valeur actuelle du client et sa limite
+(bornes des widgets). Les combinaisons de pas sont énumérées une fois,
+triées par effort total (somme des pas), puis scorées par lots vectorisés de
+taille croissante: la recherche s'arrête au premier lot contenant un
+candidat sous le seuil, et retient le moins coûteux de ce lot.
+
+Le mode bulk score ensemble les lots de tous les clients non résolus, ce qui
+permet de traiter un segment à haut risque en quelques appels au modèle:
+
+    python counterfactual.py resultats_batch.csv --min-proba 0.7 -o plans.csv
+"""
+import argparse
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import FEATURE_LABELS, RISK_LOW_THRESHOLD, prepare_features
+from client_profiles import INTEGER_FEATURES, WIDGET_BOUNDS
+
+# Levier -> (sens de l'action, limite réaliste de la variable ou None pour la borne du widget)
+ACTIONABLE_FEATURES = {
+    'transfer_fees_paid': (-1, None),
+    'mobile_app_logins': (+1, 30),
+    'transactions_count_monthly': (+1, 40),
+    'last_transaction_days': (-1, None),
+    'sentiment_score': (+1, None)
+}
+
+ACTION_VERBS = {+1: "Augmenter", -1: "Réduire"}
+
+SEARCH_STEPS = 8
+FIRST_CHUNK = 256
+MAX_BATCH_ROWS = 20000
+BULK_GROUP_SIZE = 64
+# Budget de candidats par client en mode bulk (la recherche complète en compte (SEARCH_STEPS+1)^5)
+BULK_MAX_CANDIDATES = 4096
+# Échéance d'une recherche bulk exécutée sur le pool d'inférence de l'application
+BULK_TIMEOUT_S = 300.0
+TARGET_PREFIX = "cible_"
+
+@lru_cache(maxsize=8)
+def step_combinations(n_features, n_steps=SEARCH_STEPS):
+    """Toutes les combinaisons de pas (0..n_steps par levier), triées par effort total"""
+    combos = np.indices((n_steps + 1,) * n_features, dtype=np.int8).reshape(n_features, -1).T
+    combos = combos[np.argsort(combos.sum(axis=1), kind="stable")]
+    combos.setflags(write=False)
+    return combos
+
+def action_spans(clients, features):
+    """(départ, arrivée) de chaque levier par client: valeur actuelle -> limite réaliste"""
+    start = clients[features].to_numpy(dtype=float)
+    end = np.empty_like(start)
+    for j, feature in enumerate(features):
+        direction, limit = ACTIONABLE_FEATURES[feature]
+        low, high = WIDGET_BOUNDS[feature]
+        bound = high if direction > 0 else low
+        if limit is not None:
+            bound = min(bound, limit) if direction > 0 else max(bound, limit)
+        # Déjà au-delà de la limite: levier inactif
+        end[:, j] = np.where((bound - start[:, j]) * direction > 0, bound, start[:, j])
+    return start, end
+
+def _candidate_values(start, end, steps, n_steps, features):
+    values = start + (end - start) * (steps / n_steps)
+    for j, feature in enumerate(features):
+        if feature in INTEGER_FEATURES:
+            values[:, j] = np.round(values[:, j])
+    return values
+
+def _churn_proba(frame, model, preprocessor, normalize):
+    return model.predict_proba(prepare_features(frame, preprocessor, normalize))[:, 1]
+
+def search_counterfactuals(clients, model, preprocessor=None, normalize=False, target=RISK_LOW_THRESHOLD,
+                           features=None, n_steps=SEARCH_STEPS, max_batch_rows=MAX_BATCH_ROWS,
+                           max_candidates=None):
+    """Contrefactuels de N clients (DataFrame); une ligne de résultat par client.
+
+    Colonnes: found, original_probability, churn_probability (meilleur candidat,
+    ou le plus bas rencontré si le seuil n'est jamais atteint), cost (somme des
+    pas / n_steps), evaluated (candidats scorés) et cible_<levier>. Les clients
+    sont traités par groupes de BULK_GROUP_SIZE pour borner la taille des lots;
+    `max_candidates` limite les combinaisons essayées par client (None: toutes).
+    """
+    features = list(features or ACTIONABLE_FEATURES)
+    clients = clients.reset_index(drop=True)
+    groups = [
+        _search_group(clients.iloc[i:i + BULK_GROUP_SIZE], model, preprocessor, normalize, target,
+                      features, n_steps, max_batch_rows, max_candidates)
+        for i in range(0, len(clients), BULK_GROUP_SIZE)
+    ]
+    if not groups:
+        return _search_group(clients, model, preprocessor, normalize, target, features, n_steps, max_batch_rows,
+                             max_candidates)
+    return pd.concat(groups, ignore_index=True)
+
+def _search_group(clients, model, preprocessor, normalize, target, features, n_steps, max_batch_rows,
+                  max_candidates):
+    clients = clients.reset_index(drop=True)
+    n_clients = len(clients)
+    combos = step_combinations(len(features), n_steps)
+    if max_candidates is not None:
+        combos = combos[:max_candidates + 1]
+    start, end = action_spans(clients, features)
+    # Pas utiles par levier: 0 si le levier est inactif (évite les candidats en double)
+    caps = np.where(start != end, n_steps, 0).astype(np.int8)
+
+    original = _churn_proba(clients, model, preprocessor, normalize) if n_clients else np.empty(0)
+    result = pd.DataFrame({
+        "found": original < target,
+        "original_probability": original,
+        "churn_probability": original,
+        "cost": 0.0,
+        "evaluated": 0
+    })
+    targets = start.copy()
+    active = np.flatnonzero(~result["found"].to_numpy())
+
+    # Combinaison 0 = client inchangé, déjà scoré; lots de ~max_batch_rows lignes au plus
+    position, chunk = 1, min(FIRST_CHUNK, max(1, max_batch_rows // max(len(active), 1)))
+    efforts = combos.sum(axis=1)
+    while len(active) and position < len(combos):
+        # Lot étendu jusqu'à la fin de son niveau d'effort: résultat indépendant du découpage
+        level_end = np.searchsorted(efforts, efforts[min(position + chunk, len(combos)) - 1], side="right")
+        steps = combos[position:level_end]
+        position = level_end
+        valid = (steps[None, :, :] <= caps[active, None, :]).all(axis=2)
+        owners, rows = np.nonzero(valid)
+        if len(rows):
+            owners = active[owners]
+            candidate_steps = steps[rows]
+            values = _candidate_values(start[owners], end[owners], candidate_steps, n_steps, features)
+
+            frame = clients.iloc[owners].reset_index(drop=True)
+            frame[features] = values
+            proba = _churn_proba(frame, model, preprocessor, normalize)
+            cost = candidate_steps.sum(axis=1) / n_steps
+
+            candidates = pd.DataFrame({"owner": owners, "proba": proba, "cost": cost, "row": np.arange(len(rows))})
+            result["evaluated"] += np.bincount(owners, minlength=n_clients)
+
+            # Meilleur candidat par client: sous le seuil à effort minimal, sinon probabilité la plus basse
+            candidates["miss"] = candidates["proba"] >= target
+            candidates["rank"] = np.where(candidates["miss"], candidates["proba"], candidates["cost"])
+            best = candidates.sort_values(["owner", "miss", "rank", "proba", "row"]).drop_duplicates("owner")
+            for owner, proba_best, cost_best, row, miss in best[["owner", "proba", "cost", "row", "miss"]].itertuples(index=False):
+                if not miss:
+                    result.loc[owner, ["found", "churn_probability", "cost"]] = [True, proba_best, cost_best]
+                    targets[owner] = values[row]
+                elif proba_best < result.at[owner, "churn_probability"]:
+                    result.loc[owner, ["churn_probability", "cost"]] = [proba_best, cost_best]
+                    targets[owner] = values[row]
+            active = active[~result["found"].to_numpy()[active]]
+
+        chunk = min(chunk * 2, max(1, max_batch_rows // max(len(active), 1)))
+
+    for j, feature in enumerate(features):
+        result[TARGET_PREFIX + feature] = targets[:, j]
+    return result
+
+def find_counterfactual(client_data, model, preprocessor=None, normalize=False, target=RISK_LOW_THRESHOLD,
+                        features=None, n_steps=SEARCH_STEPS):
+    """Contrefactuel d'un client (dict): résultat + liste des changements (levier, avant, après)"""
+    row = search_counterfactuals(pd.DataFrame([client_data]), model, preprocessor, normalize, target,
+                                 features, n_steps).iloc[0]
+    changes = [
+        (feature, client_data[feature], row[TARGET_PREFIX + feature])
+        for feature in (features or ACTIONABLE_FEATURES)
+        if row[TARGET_PREFIX + feature] != client_data[feature]
+    ]
+    return {
+        "found": bool(row["found"]),
+        "original_probability": float(row["original_probability"]),
+        "churn_probability": float(row["churn_probability"]),
+        "cost": float(row["cost"]),
+        "evaluated": int(row["evaluated"]),
+        "changes": changes
+    }
+
+def cached_counterfactual(cache, client_data, model_version, compute, target=RISK_LOW_THRESHOLD):
+    """Plan de rétention en cache par (client, version du modèle, seuil), sinon `compute()`"""
+    return cache.get_or_compute(client_data, (model_version, target), compute)
+
+def format_actions(changes):
+    """Actions lisibles: 'Réduire Frais de Transfert de 500 à 250'"""
+    lines = []
+    for feature, before, after in changes:
+        direction = ACTIONABLE_FEATURES[feature][0]
+        fmt = "{:,.0f}" if feature in INTEGER_FEATURES else "{:.2f}"
+        lines.append(f"{ACTION_VERBS[direction]} {FEATURE_LABELS.get(feature, feature)} "
+                     f"de {fmt.format(before)} à {fmt.format(after)}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Plans de rétention contrefactuels pour un segment de clients")
+    parser.add_argument("source", help="Fichier de clients ou de résultats batch (CSV ou Parquet)")
+    parser.add_argument("-o", "--output", default="plans_retention.csv")
+    parser.add_argument("--min-proba", type=float, default=0.0, help="Ne traiter que les clients au-dessus (ex: 0.7)")
+    parser.add_argument("--target", type=float, default=RISK_LOW_THRESHOLD)
+    parser.add_argument("--max-candidates", type=int, default=BULK_MAX_CANDIDATES,
+                        help="Combinaisons essayées au plus par client")
+    parser.add_argument("--version", default=None, help="Version du modèle (défaut: version active du registre)")
+    args = parser.parse_args()
+
+    from model_registry import ModelRegistry
+    registry = ModelRegistry()
+    bundle = registry.get(args.version) if args.version else registry.active
+    if bundle is None:
+        parser.error("Aucun modèle disponible")
+
+    clients = pd.read_parquet(args.source) if args.source.endswith(".parquet") else pd.read_csv(args.source)
+    if args.min_proba > 0 and "churn_probability" in clients:
+        clients = clients[clients["churn_probability"] >= args.min_proba]
+
+    start = time.perf_counter()
+    plans = search_counterfactuals(clients, bundle.model, bundle.preprocessor, bundle.normalize, args.target,
+                                   max_candidates=args.max_candidates)
+    elapsed = time.perf_counter() - start
+    plans.insert(0, "client_index", clients.index)
+    plans.to_csv(args.output, index=False)
+    print(f"{plans['found'].sum():,}/{len(plans):,} clients sous {args.target:.0%} "
+          f"({plans['evaluated'].sum():,} candidats scorés en {elapsed:.2f}s) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+# drift_monitor.py - SURVEILLANCE DE LA DÉRIVE DES ENTRÉES
+"""Dérive des variables d'entrée par rapport aux données d'entraînement.
+
+Le profil de référence d'une version de modèle est un fichier JSON rangé à
+côté de ses métadonnées (`drift_reference_<version>.json`): pour chaque
+NUM_FEATURES, les bornes des déciles d'entraînement et les effectifs par
+intervalle; pour chaque CAT_FEATURES, les effectifs par catégorie du
+vocabulaire de schema.py.
+
+En production, chaque client analysé et chaque lot scoré incrémentent des
+histogrammes aux mêmes intervalles: mémoire fixe (une douzaine de compteurs
+par feature), quel que soit le volume. PSI et KS sont calculés à la demande.
+
+    python drift_monitor.py build donnees_entrainement.csv        # profil de la version active
+    python drift_monitor.py check portefeuille.csv                # rapport de dérive d'un fichier
+"""
+import argparse
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import CAT_FEATURES, NUM_FEATURES
+from client_record import CLIENT_RECORD_DTYPE, code_matrix, numeric_matrix, records_from_frame
+from schema import CATEGORY_VOCABULARIES, MISSING_CODE
+from shadow_scoring import ks_from_counts, psi_from_counts
+
+REFERENCE_PREFIX = "drift_reference"
+REFERENCE_BINS = 10
+REFERENCE_CHUNK_SIZE = 100000
+
+# Seuils usuels du PSI: < 0.1 stable, < 0.25 dérive modérée, au-delà dérive forte
+PSI_MODERATE = 0.1
+PSI_STRONG = 0.25
+DRIFT_STATUS = ["stable", "modérée", "forte"]
+# En dessous, les histogrammes de production sont trop peu remplis pour un PSI significatif
+MIN_REPORT_ROWS = 100
+
+UNKNOWN_LABEL = "(inconnu)"
+
+def reference_path(bundle):
+    """Chemin du profil de référence d'une version, à côté de ses métadonnées"""
+    if bundle.metadata_path is not None:
+        metadata_path = bundle.metadata_path
+        return metadata_path.with_name(metadata_path.name.replace("model_metadata", REFERENCE_PREFIX, 1))
+    return bundle.model_path.with_name(f"{REFERENCE_PREFIX}_{bundle.version}.json")
+
+# ==================== HISTOGRAMMES ====================
+def _as_records(clients):
+    if isinstance(clients, np.ndarray) and clients.dtype == CLIENT_RECORD_DTYPE:
+        return clients
+    return records_from_frame(clients)
+
+def numeric_counts(values, edges):
+    """Effectifs par intervalle (]-inf, e1], ..., ]eK, +inf[) + dernier compteur pour les manquants"""
+    buckets = np.searchsorted(edges, values, side="left")
+    buckets[np.isnan(values)] = len(edges) + 1
+    return np.bincount(buckets, minlength=len(edges) + 2)
+
+def category_counts(codes, n_categories):
+    """Effectifs par code du vocabulaire + dernier compteur pour manquant/inconnu"""
+    codes = codes.astype(np.intp)
+    codes[codes == MISSING_CODE] = n_categories
+    return np.bincount(codes, minlength=n_categories + 1)
+
+def build_reference(clients, version=None, n_bins=REFERENCE_BINS):
+    """Profil de référence (dict sérialisable JSON) d'un DataFrame ou lot d'enregistrements"""
+    records = _as_records(clients)
+    numeric, codes = numeric_matrix(records), code_matrix(records)
+
+    reference = {
+        "version": version,
+        "created_at": datetime.now().isoformat(),
+        "rows": len(records),
+        "numeric": {},
+        "categorical": {}
+    }
+    quantiles = np.linspace(0, 1, n_bins + 1)[1:-1]
+    for i, feature in enumerate(NUM_FEATURES):
+        values = numeric[:, i]
+        present = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(present, quantiles)) if len(present) else np.empty(0)
+        reference["numeric"][feature] = {
+            "edges": edges.tolist(),
+            "counts": numeric_counts(values, edges).tolist()
+        }
+    for i, feature in enumerate(CAT_FEATURES):
+        vocabulary = CATEGORY_VOCABULARIES[feature]
+        reference["categorical"][feature] = {
+            "categories": vocabulary + [UNKNOWN_LABEL],
+            "counts": category_counts(codes[:, i], len(vocabulary)).tolist()
+        }
+    return reference
+
+def save_reference(reference, path):
+    Path(path).write_text(json.dumps(reference, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def load_reference(path):
+    """Profil de référence, ou None si absent"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+# ==================== MONITEUR ====================
+class DriftMonitor:
+    """Histogrammes de production aux intervalles de la référence, mis à jour en continu"""
+
+    def __init__(self, reference):
+        self.reference = reference
+        self._edges = [np.array(reference["numeric"][f]["edges"]) for f in NUM_FEATURES]
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def for_bundle(cls, bundle):
+        """Moniteur d'une version de modèle; None sans profil de référence"""
+        reference = load_reference(reference_path(bundle))
+        return cls(reference) if reference is not None else None
+
+    def reset(self):
+        with self._lock:
+            self.rows = 0
+            self._numeric = [np.zeros(len(edges) + 2, dtype=np.int64) for edges in self._edges]
+            self._categorical = [
+                np.zeros(len(CATEGORY_VOCABULARIES[f]) + 1, dtype=np.int64) for f in CAT_FEATURES
+            ]
+            self.started_at = datetime.now()
+
+    def update(self, clients):
+        """Ajoute un lot (DataFrame ou enregistrements CLIENT_RECORD_DTYPE) aux histogrammes"""
+        records = _as_records(clients)
+        numeric, codes = numeric_matrix(records), code_matrix(records)
+        numeric_update = [numeric_counts(numeric[:, i], edges) for i, edges in enumerate(self._edges)]
+        categorical_update = [
+            category_counts(codes[:, i], len(CATEGORY_VOCABULARIES[f])) for i, f in enumerate(CAT_FEATURES)
+        ]
+        with self._lock:
+            self.rows += len(records)
+            for counts, update in zip(self._numeric + self._categorical, numeric_update + categorical_update):
+                counts += update
+
+    def report(self):
+        """PSI (et KS pour les numériques) de chaque feature, triés par PSI décroissant"""
+        with self._lock:
+            numeric = [counts.copy() for counts in self._numeric]
+            categorical = [counts.copy() for counts in self._categorical]
+
+        rows = []
+        for feature, counts in zip(NUM_FEATURES, numeric):
+            expected = np.array(self.reference["numeric"][feature]["counts"])
+            rows.append({
+                "feature": feature,
+                "psi": psi_from_counts(expected, counts),
+                # Manquants exclus de la fonction de répartition
+                "ks": ks_from_counts(expected[:-1], counts[:-1]),
+                "missing_share": counts[-1] / max(counts.sum(), 1)
+            })
+        for feature, counts in zip(CAT_FEATURES, categorical):
+            expected = np.array(self.reference["categorical"][feature]["counts"])
+            rows.append({
+                "feature": feature,
+                "psi": psi_from_counts(expected, counts),
+                "ks": np.nan,
+                "missing_share": counts[-1] / max(counts.sum(), 1)
+            })
+
+        report = pd.DataFrame(rows)
+        report["status"] = [
+            DRIFT_STATUS[int(np.searchsorted([PSI_MODERATE, PSI_STRONG], value, side="right"))]
+            for value in report["psi"]
+        ]
+        return report.sort_values("psi", ascending=False, ignore_index=True)
+
+# ==================== CLI ====================
+def _read_chunks(path, chunksize=REFERENCE_CHUNK_SIZE):
+    if str(path).endswith(".parquet"):
+        yield pd.read_parquet(path)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profil de référence et rapport de dérive des entrées")
+    parser.add_argument("command", choices=["build", "check"])
+    parser.add_argument("source", help="Fichier CSV/Parquet (données d'entraînement pour build)")
+    parser.add_argument("--version", default=None, help="Version du modèle (défaut: version active du registre)")
+    parser.add_argument("-o", "--output", default=None, help="Chemin du profil (défaut: à côté des métadonnées)")
+    parser.add_argument("--bins", type=int, default=REFERENCE_BINS)
+    args = parser.parse_args()
+
+    from model_registry import ModelRegistry
+    registry = ModelRegistry()
+    bundle = registry.get(args.version) if args.version else registry.active
+    if bundle is None:
+        parser.error("Aucun modèle disponible")
+    path = Path(args.output) if args.output else reference_path(bundle)
+
+    if args.command == "build":
+        records = np.concatenate([records_from_frame(chunk) for chunk in _read_chunks(args.source)])
+        save_reference(build_reference(records, bundle.version, args.bins), path)
+        print(f"Profil de référence ({len(records):,} clients, version {bundle.version}) -> {path}")
+        return
+
+    reference = load_reference(path)
+    if reference is None:
+        parser.error(f"Profil de référence introuvable: {path}")
+    monitor = DriftMonitor(reference)
+    for chunk in _read_chunks(args.source):
+        monitor.update(chunk)
+    print(f"{monitor.rows:,} clients comparés à la référence ({reference['rows']:,} clients)")
+    print(monitor.report().to_string(index=False, float_format=lambda x: f"{x:.4f}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+# fast_path.py - CHEMIN DE SCORING RAPIDE (SANS PANDAS)
+"""Compilation du preprocesseur et de l'ensemble d'arbres en tableaux NumPy plats.
+
+Le scoring interactif d'un client passe sinon par un DataFrame d'une ligne,
+le ColumnTransformer et predict_proba. CompiledScorer extrait une fois:
+- médianes d'imputation, moyennes/écarts du StandardScaler, diviseurs monétaires
+- tables de correspondance catégorie -> colonne one-hot
+- pour tous les arbres: features, seuils, enfants gauche/droite, valeurs
+
+puis score une ligne (dict ou tableau) en quelques dizaines de microsecondes.
+
+FusedPipeline réutilise les mêmes tables pour les lots: normalisation,
+preprocessing et predict_proba en une seule passe vectorisée sur N lignes,
+avec des sorties identiques au chemin normalize -> transform -> predict_proba.
+
+Modèles supportés: GradientBoosting / RandomForest / ExtraTrees (sklearn) et
+LightGBM, en classification binaire.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import (
+    ALL_FEATURES_ORDERED, CAT_FEATURES, MONETARY_DIVISORS, NUM_FEATURES, scores_from_proba, split_model
+)
+from client_record import CLIENT_RECORD_DTYPE, code_matrix, numeric_matrix
+from schema import CATEGORY_VOCABULARIES
+
+PARITY_TOLERANCE = 1e-6
+
+# ==================== PREPROCESSING ====================
+def _last_step(transformer, step_type):
+    """Dernière étape de type `step_type` d'un Pipeline (ou le transformeur lui-même)"""
+    steps = [step for _, step in getattr(transformer, "steps", [(None, transformer)])]
+    matches = [step for step in steps if type(step).__name__ == step_type]
+    return matches[-1] if matches else None
+
+class CompiledPreprocessor:
+    """ColumnTransformer (imputer + scaler / imputer + one-hot) en tableaux NumPy"""
+
+    def __init__(self, column_transformer, normalize=False):
+        self.n_outputs = 0
+        self.num_features, self.cat_features = [], []
+        self.num_slots = []
+        self.cat_lookups = []
+        self.cat_tables = []
+
+        for name, transformer, columns in column_transformer.transformers_:
+            if name == "remainder" or transformer == "drop":
+                continue
+
+            encoder = _last_step(transformer, "OneHotEncoder")
+            if encoder is not None:
+                if encoder.drop_idx_ is not None:
+                    raise ValueError("OneHotEncoder avec 'drop' non supporté")
+                imputer = _last_step(transformer, "SimpleImputer")
+                fill_value = imputer.fill_value if imputer is not None else None
+                for feature, categories in zip(columns, encoder.categories_):
+                    lookup = {category: self.n_outputs + i for i, category in enumerate(categories)}
+                    self.cat_features.append(feature)
+                    self.cat_lookups.append((lookup, lookup.get(fill_value)))
+                    self.cat_tables.append((feature, pd.Index(categories), self.n_outputs, fill_value))
+                    self.n_outputs += len(categories)
+                continue
+
+            imputer = _last_step(transformer, "SimpleImputer")
+            scaler = _last_step(transformer, "StandardScaler")
+            for i, feature in enumerate(columns):
+                self.num_features.append(feature)
+                self.num_slots.append((
+                    self.n_outputs + i,
+                    imputer.statistics_[i] if imputer is not None else np.nan,
+                    scaler.mean_[i] if scaler is not None and scaler.mean_ is not None else 0.0,
+                    scaler.scale_[i] if scaler is not None and scaler.scale_ is not None else 1.0
+                ))
+            self.n_outputs += len(columns)
+
+        slots = np.array(self.num_slots, dtype=float).reshape(-1, 4)
+        self.num_index = slots[:, 0].astype(np.intp)
+        self.num_median, self.num_mean, self.num_scale = slots[:, 1], slots[:, 2], slots[:, 3]
+        self.num_divisors = np.array([
+            MONETARY_DIVISORS.get(feature, 1) if normalize else 1 for feature in self.num_features
+        ], dtype=float)
+
+        # Disposition CLIENT_RECORD_DTYPE: colonne de chaque feature, table code schema -> colonne one-hot
+        self.record_num_columns = [NUM_FEATURES.index(f) for f in self.num_features if f in NUM_FEATURES]
+        self.record_cat_tables = [
+            (CAT_FEATURES.index(feature), offset, categories.get_indexer(CATEGORY_VOCABULARIES[feature] + [fill_value]))
+            for feature, categories, offset, fill_value in self.cat_tables if feature in CATEGORY_VOCABULARIES
+        ]
+
+    def transform_row(self, row):
+        """Vecteur transformé d'un client (dict ou séquence dans l'ordre ALL_FEATURES_ORDERED)"""
+        if not isinstance(row, dict):
+            row = dict(zip(NUM_FEATURES + CAT_FEATURES, row))
+
+        numeric = np.array([row[f] for f in self.num_features], dtype=float) / self.num_divisors
+        numeric = np.where(np.isnan(numeric), self.num_median, numeric)
+
+        x = np.zeros(self.n_outputs)
+        x[self.num_index] = (numeric - self.num_mean) / self.num_scale
+        for feature, (lookup, missing_index) in zip(self.cat_features, self.cat_lookups):
+            value = row[feature]
+            index = missing_index if value is None or value != value else lookup.get(value)
+            if index is not None:
+                x[index] = 1.0
+        return x
+
+    def transform_batch(self, df):
+        """Matrice transformée N x n_outputs, identique à normalize_monetary + transform"""
+        n_rows = len(df)
+        numeric = df[self.num_features].to_numpy(dtype=float) / self.num_divisors
+        numeric = np.where(np.isnan(numeric), self.num_median, numeric)
+
+        X = np.zeros((n_rows, self.n_outputs))
+        X[:, self.num_index] = (numeric - self.num_mean) / self.num_scale
+
+        rows = np.arange(n_rows)
+        for feature, categories, offset, fill_value in self.cat_tables:
+            values = df[feature]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Codes entiers (schema.py): table vocabulaire -> colonne, dernier slot = manquant
+                table = categories.get_indexer(list(values.cat.categories) + [fill_value])
+                codes = table[values.cat.codes.to_numpy()]
+            else:
+                if fill_value is not None:
+                    values = values.where(values.notna(), fill_value)
+                codes = categories.get_indexer(values)
+            known = codes >= 0  # catégories inconnues ignorées (handle_unknown='ignore')
+            X[rows[known], offset + codes[known]] = 1.0
+        return X
+
+    def transform_records(self, records):
+        """Matrice transformée N x n_outputs d'un lot CLIENT_RECORD_DTYPE (sans DataFrame)"""
+        if len(self.record_num_columns) != len(self.num_features) or len(self.record_cat_tables) != len(self.cat_tables):
+            raise ValueError("Features du modèle différentes de CLIENT_RECORD_DTYPE")
+        n_rows = len(records)
+        numeric = numeric_matrix(records)[:, self.record_num_columns] / self.num_divisors
+        numeric = np.where(np.isnan(numeric), self.num_median, numeric)
+
+        X = np.zeros((n_rows, self.n_outputs))
+        X[:, self.num_index] = (numeric - self.num_mean) / self.num_scale
+
+        rows = np.arange(n_rows)
+        codes = code_matrix(records)
+        for column, offset, table in self.record_cat_tables:
+            # Code MISSING_CODE (-1) -> dernier slot de la table (valeur d'imputation)
+            indexes = table[codes[:, column]]
+            known = indexes >= 0
+            X[rows[known], offset + indexes[known]] = 1.0
+        return X
+
+# ==================== ARBRES ====================
+class CompiledTrees:
+    """Ensemble d'arbres aplati: tableaux (n_arbres, n_noeuds_max).
+
+    Les feuilles pointent sur elles-mêmes, ce qui permet de descendre tous les
+    arbres en parallèle pendant `depth` itérations vectorisées.
+    """
+
+    def __init__(self, trees, base_score, link, float32_inputs):
+        n_nodes = max(len(tree["feature"]) for tree in trees)
+        shape = (len(trees), n_nodes)
+
+        self.feature = np.zeros(shape, dtype=np.intp)
+        self.threshold = np.full(shape, np.inf)
+        self.left = np.tile(np.arange(n_nodes), (len(trees), 1))
+        self.right = self.left.copy()
+        self.value = np.zeros(shape)
+        self.zero_missing = np.zeros(shape, dtype=bool)
+        self.nan_missing = np.zeros(shape, dtype=bool)
+        self.default_left = np.zeros(shape, dtype=bool)
+
+        for t, tree in enumerate(trees):
+            n = len(tree["feature"])
+            internal = tree["left"] >= 0
+            self.feature[t, :n] = np.where(internal, tree["feature"], 0)
+            self.threshold[t, :n] = np.where(internal, tree["threshold"], np.inf)
+            self.left[t, :n] = np.where(internal, tree["left"], np.arange(n))
+            self.right[t, :n] = np.where(internal, tree["right"], np.arange(n))
+            self.value[t, :n] = tree["value"]
+            for flag in ("zero_missing", "nan_missing", "default_left"):
+                if flag in tree:
+                    getattr(self, flag)[t, :n] = tree[flag]
+
+        self.depth = max(tree["depth"] for tree in trees)
+        self.has_missing_rules = bool(self.zero_missing.any() or self.nan_missing.any())
+        self.base_score = base_score
+        self.link = link
+        self.float32_inputs = float32_inputs
+
+        # Vues aplaties: noeud global = offset de l'arbre + noeud local
+        self.offsets = np.arange(len(trees)) * n_nodes
+        self.flat_left = (self.left + self.offsets[:, None]).ravel()
+        self.flat_right = (self.right + self.offsets[:, None]).ravel()
+        self.flat_feature = self.feature.ravel()
+        self.flat_threshold = self.threshold.ravel()
+        self.flat_value = self.value.ravel()
+        self.flat_zero_missing = self.zero_missing.ravel()
+        self.flat_nan_missing = self.nan_missing.ravel()
+        self.flat_default_left = self.default_left.ravel()
+
+    def predict_raw(self, X):
+        """Score brut (avant lien) pour une matrice N x n_features"""
+        X = np.atleast_2d(X)
+        if self.float32_inputs:
+            X = X.astype(np.float32)
+        n_rows, n_features = X.shape
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        X = X.ravel()
+        node = np.broadcast_to(self.offsets, (n_rows, len(self.offsets)))
+
+        for _ in range(self.depth):
+            x = X[row_offsets + self.flat_feature[node]]
+            go_left = x <= self.flat_threshold[node]
+            if self.has_missing_rules:
+                missing = (self.flat_zero_missing[node] & (x == 0)) | (self.flat_nan_missing[node] & np.isnan(x))
+                go_left = np.where(missing, self.flat_default_left[node], go_left)
+            node = np.where(go_left, self.flat_left[node], self.flat_right[node])
+
+        return self.base_score + self.flat_value[node].sum(axis=1)
+
+    def predict_proba(self, X):
+        raw = self.predict_raw(X)
+        return 1.0 / (1.0 + np.exp(-raw)) if self.link == "logistic" else raw
+
+def _tree_depths(left, right):
+    depth = np.zeros(len(left), dtype=int)
+    for node in range(len(left)):
+        if left[node] >= 0:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+def _sklearn_tree(tree, node_values, scale):
+    t = tree.tree_
+    return {
+        "feature": t.feature, "threshold": t.threshold,
+        "left": t.children_left, "right": t.children_right,
+        "value": node_values * scale,
+        "depth": _tree_depths(t.children_left, t.children_right)
+    }
+
+def _lightgbm_tree(structure):
+    """Aplatit un arbre de booster.dump_model() (parcours en largeur)"""
+    nodes, queue = [], [structure]
+    while queue:
+        node = queue.pop(0)
+        nodes.append(node)
+        if "split_index" in node:
+            queue.extend([node["left_child"], node["right_child"]])
+
+    ids = {id(node): i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    tree = {key: np.zeros(n) for key in ("threshold", "value")}
+    tree.update({key: np.full(n, -1) for key in ("feature", "left", "right")})
+    tree.update({key: np.zeros(n, dtype=bool) for key in ("zero_missing", "nan_missing", "default_left")})
+
+    for i, node in enumerate(nodes):
+        if "split_index" not in node:
+            tree["value"][i] = node["leaf_value"]
+            continue
+        if node["decision_type"] != "<=":
+            raise ValueError("Splits catégoriels LightGBM non supportés")
+        tree["feature"][i] = node["split_feature"]
+        tree["threshold"][i] = node["threshold"]
+        tree["left"][i] = ids[id(node["left_child"])]
+        tree["right"][i] = ids[id(node["right_child"])]
+        tree["zero_missing"][i] = node.get("missing_type") == "Zero"
+        tree["nan_missing"][i] = node.get("missing_type") == "NaN"
+        tree["default_left"][i] = node.get("default_left", True)
+
+    tree["depth"] = _tree_depths(tree["left"], tree["right"]) if n > 1 else 0
+    return tree
+
+def compile_trees(estimator, n_features):
+    """CompiledTrees équivalent à `estimator.predict_proba(X)[:, 1]`"""
+    if hasattr(estimator, "booster_"):
+        dump = estimator.booster_.dump_model()
+        if dump.get("num_class", 1) != 1:
+            raise ValueError("Seuls les modèles LightGBM binaires sont supportés")
+        trees = [_lightgbm_tree(info["tree_structure"]) for info in dump["tree_info"]]
+        return CompiledTrees(trees, 0.0, "logistic", float32_inputs=False)
+
+    if hasattr(estimator, "learning_rate") and hasattr(estimator, "init_"):
+        if estimator.estimators_.shape[1] != 1:
+            raise ValueError("Seuls les modèles de boosting binaires sont supportés")
+        trees = [
+            _sklearn_tree(tree, tree.tree_.value[:, 0, 0], estimator.learning_rate)
+            for tree in estimator.estimators_[:, 0]
+        ]
+        compiled = CompiledTrees(trees, 0.0, "logistic", float32_inputs=True)
+        # Score initial (prior) déduit de la fonction de décision sur une ligne neutre
+        x0 = np.zeros((1, n_features))
+        compiled.base_score = float(estimator.decision_function(x0)[0] - compiled.predict_raw(x0)[0])
+        return compiled
+
+    if hasattr(estimator, "estimators_") and hasattr(estimator, "classes_"):
+        trees = []
+        for tree in estimator.estimators_:
+            class_values = tree.tree_.value[:, 0, :]
+            trees.append(_sklearn_tree(tree, class_values[:, 1] / class_values.sum(axis=1), 1.0 / len(estimator.estimators_)))
+        return CompiledTrees(trees, 0.0, "identity", float32_inputs=True)
+
+    raise TypeError(f"Compilation non supportée pour {type(estimator).__name__}")
+
+# ==================== SCORER ====================
+class CompiledScorer:
+    """Preprocessing + arbres compilés: score d'un client sans pandas"""
+
+    def __init__(self, preprocessor, trees):
+        self.preprocessor = preprocessor
+        self.trees = trees
+
+    @classmethod
+    def from_model(cls, model, preprocessor=None, normalize=False):
+        steps, estimator = split_model(model, preprocessor)
+        if len(steps) != 1 or not hasattr(steps[0], "transformers_"):
+            raise ValueError("Un ColumnTransformer ajusté unique est requis avant l'estimateur")
+
+        compiled_preprocessor = CompiledPreprocessor(steps[0], normalize)
+        return cls(compiled_preprocessor, compile_trees(estimator, compiled_preprocessor.n_outputs))
+
+    def predict_row(self, row):
+        """Probabilité de churn d'un client (dict ou séquence ALL_FEATURES_ORDERED)"""
+        return float(self.trees.predict_proba(self.preprocessor.transform_row(row))[0])
+
+    def predict_rows(self, rows):
+        X = np.vstack([self.preprocessor.transform_row(row) for row in rows])
+        return self.trees.predict_proba(X)
+
+# ==================== PIPELINE FUSIONNÉ (LOTS) ====================
+class FusedPipeline:
+    """Normalisation + preprocessing + prédiction en une passe vectorisée sur N clients.
+
+    Les diviseurs monétaires sont un vecteur NumPy et les encodages
+    catégoriels des tables de correspondance précalculées; la matrice
+    obtenue est passée telle quelle au predict_proba de l'estimateur.
+    """
+
+    def __init__(self, preprocessor, estimator):
+        self.preprocessor = preprocessor
+        self.estimator = estimator
+
+    @classmethod
+    def from_model(cls, model, preprocessor=None, normalize=False):
+        steps, estimator = split_model(model, preprocessor)
+        if len(steps) != 1 or not hasattr(steps[0], "transformers_"):
+            raise ValueError("Un ColumnTransformer ajusté unique est requis avant l'estimateur")
+        return cls(CompiledPreprocessor(steps[0], normalize), estimator)
+
+    def transform(self, clients):
+        """Matrice d'entrée de l'estimateur (DataFrame, liste de dicts ou lot CLIENT_RECORD_DTYPE)"""
+        if isinstance(clients, np.ndarray) and clients.dtype == CLIENT_RECORD_DTYPE:
+            return self.preprocessor.transform_records(clients)
+        df = clients if isinstance(clients, pd.DataFrame) else pd.DataFrame(clients)
+        missing = [f for f in ALL_FEATURES_ORDERED if f not in df.columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+        return self.preprocessor.transform_batch(df)
+
+    def predict_proba(self, clients):
+        return self.estimator.predict_proba(self.transform(clients))[:, 1]
+
+    def score(self, clients):
+        """Même sortie que churn_engine.score (colonnes SCORE_COLUMNS)"""
+        index = clients.index if isinstance(clients, pd.DataFrame) else None
+        return scores_from_proba(self.predict_proba(clients), index)
+
+# ==================== PARITÉ ====================
+def check_parity(scorer, clients, reference_proba, tolerance=PARITY_TOLERANCE):
+    """Compare le chemin rapide à predict_proba sur une liste de clients (dicts)"""
+    fast_proba = scorer.predict_rows(clients)
+
+    start = time.perf_counter()
+    for client in clients:
+        scorer.predict_row(client)
+    latency_us = (time.perf_counter() - start) / len(clients) * 1e6
+
+    differences = np.abs(fast_proba - np.asarray(reference_proba))
+    return {
+        "max_abs_diff": float(differences.max()),
+        "ok": bool((differences <= tolerance).all()),
+        "latency_us": latency_us,
+        "fast_proba": fast_proba
+    }
@@ -0,0 +1,138 @@
+# history_store.py - HISTORIQUE PERSISTANT DES ANALYSES
+"""Historique des analyses en SQLite (append-only, écritures groupées).
+
+Les enregistrements sont mis en tampon et écrits par lots de `batch_size`
+dans une seule transaction; un thread d'arrière-plan écrit le tampon toutes
+les `flush_interval_s` secondes même sans nouvel ajout. Les lectures ajoutent
+les analyses encore en tampon à celles de la base, sans forcer d'écriture. Les lectures sont
+paginées et s'appuient sur des index (session, niveau de risque), pour que
+l'historique survive aux redémarrages sans ralentir les reruns Streamlit.
+"""
+import atexit
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+current_dir = Path(__file__).parent
+HISTORY_DB_PATH = current_dir / 'analysis_history.db'
+
+# Taille du tampon circulaire en mémoire pour la session courante
+HISTORY_RING_SIZE = 50
+HISTORY_PAGE_SIZE = 25
+
+HISTORY_COLUMNS = ["timestamp", "session_id", "churn_probability", "risk_level", "processing_time", "model_version"]
+_SESSION_INDEX = HISTORY_COLUMNS.index("session_id")
+_RISK_INDEX = HISTORY_COLUMNS.index("risk_level")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    session_id TEXT,
+    churn_probability REAL NOT NULL,
+    risk_level TEXT NOT NULL,
+    processing_time REAL,
+    model_version TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_session ON analyses (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_analyses_risk ON analyses (risk_level, id);
+"""
+
+class HistoryStore:
+    """Stockage append-only des analyses, partagé entre sessions"""
+
+    def __init__(self, path=HISTORY_DB_PATH, batch_size=20, flush_interval_s=5.0):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        atexit.register(self.close)
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="history-flush", daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval_s):
+            if time.monotonic() - self._last_flush >= self.flush_interval_s:
+                self.flush()
+
+    def append(self, record):
+        """Ajoute une analyse au tampon; écrit le lot s'il est plein"""
+        with self._lock:
+            self._pending.append(tuple(record.get(column) for column in HISTORY_COLUMNS))
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO analyses ({', '.join(HISTORY_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(HISTORY_COLUMNS))})",
+                    pending
+                )
+
+    @staticmethod
+    def _where(session_id, risk_level):
+        clauses, params = [], []
+        if session_id is not None:
+            clauses.append("session_id = ?")
+            params.append(session_id)
+        if risk_level is not None:
+            clauses.append("risk_level = ?")
+            params.append(risk_level)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _pending_matches(self, session_id, risk_level):
+        """Analyses du tampon (verrou tenu) correspondant aux filtres, des plus récentes aux plus anciennes"""
+        return [
+            row for row in reversed(self._pending)
+            if (session_id is None or row[_SESSION_INDEX] == session_id)
+            and (risk_level is None or row[_RISK_INDEX] == risk_level)
+        ]
+
+    def count(self, session_id=None, risk_level=None):
+        """Analyses écrites + analyses encore en tampon"""
+        where, params = self._where(session_id, risk_level)
+        with self._lock:
+            written = self._conn.execute(f"SELECT COUNT(*) FROM analyses{where}", params).fetchone()[0]
+            return written + len(self._pending_matches(session_id, risk_level))
+
+    def query(self, page=0, page_size=HISTORY_PAGE_SIZE, session_id=None, risk_level=None):
+        """Une page d'analyses, des plus récentes (tampon, id vide) aux plus anciennes"""
+        where, params = self._where(session_id, risk_level)
+        offset = page * page_size
+        with self._lock:
+            pending = self._pending_matches(session_id, risk_level)
+            rows = [(None, *row) for row in pending[offset:offset + page_size]]
+            if len(rows) < page_size:
+                rows += self._conn.execute(
+                    f"SELECT id, {', '.join(HISTORY_COLUMNS)} FROM analyses{where} "
+                    f"ORDER BY id DESC LIMIT ? OFFSET ?",
+                    params + [page_size - len(rows), max(offset - len(pending), 0)]
+                ).fetchall()
+        return pd.DataFrame(rows, columns=["id"] + HISTORY_COLUMNS)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        with self._lock:
+            self._conn.close()
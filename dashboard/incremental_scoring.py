@@ -0,0 +1,187 @@
+# incremental_scoring.py - RE-SCORING INCRÉMENTAL DU PORTEFEUILLE
+"""Re-scoring nocturne limité aux clients nouveaux ou modifiés.
+
+Un fichier d'état (Parquet) conserve pour chaque client: l'empreinte de sa
+ligne ALL_FEATURES_ORDERED, la version du modèle et son dernier score. Au
+passage suivant, seules les lignes nouvelles, modifiées ou scorées par une
+autre version du modèle sont envoyées au modèle; les autres réutilisent le
+score en cache. La durée du traitement suit donc le volume de changements,
+pas la taille du portefeuille.
+
+    python incremental_scoring.py portefeuille.parquet scores.parquet --id-col client_id
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from churn_engine import (
+    ALL_FEATURES_ORDERED, BATCH_CHUNK_SIZE, CAT_FEATURES, NUM_FEATURES, SCORE_COLUMNS,
+    LOAD_ERRORS, MODEL_PATH, iter_portfolio_chunks, load_artifact, load_model, model_version, score
+)
+
+current_dir = Path(__file__).parent
+STATE_PATH = current_dir / 'churn_scores_state.parquet'
+
+STATE_COLUMNS = ["row_hash", "model_version", *SCORE_COLUMNS, "scored_at"]
+
+def row_hashes(df):
+    """Empreinte 64 bits du contenu ALL_FEATURES_ORDERED de chaque ligne.
+
+    Les numériques sont ramenés en float64 et les catégories en texte pour
+    qu'un même client lu en CSV ou en Parquet ait la même empreinte.
+    """
+    canonical = pd.concat([
+        df[NUM_FEATURES].astype("float64"),
+        df[CAT_FEATURES].astype("string")
+    ], axis=1)[ALL_FEATURES_ORDERED]
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy().view(np.int64)
+
+def load_state(state_path, id_col):
+    """État précédent indexé par identifiant client (vide si absent)"""
+    if not Path(state_path).exists():
+        empty = pd.DataFrame(columns=STATE_COLUMNS)
+        empty.index.name = id_col
+        return empty.astype({"row_hash": "Int64"})
+
+    state = pd.read_parquet(state_path).set_index(id_col)
+    return state.astype({"row_hash": "Int64"})
+
+def _write_state(state_tables, state_path):
+    """Remplace l'état de façon atomique (fichier temporaire puis rename)"""
+    tmp_path = Path(str(state_path) + ".tmp")
+    schema = state_tables[0].schema
+    pq.write_table(pa.concat_tables([table.cast(schema) for table in state_tables]), tmp_path)
+    os.replace(tmp_path, state_path)
+
+def _check_ids(source, file_format, id_col):
+    """Lit la seule colonne identifiant et refuse les doublons, avant tout scoring"""
+    if file_format == "parquet":
+        if id_col not in pq.ParquetFile(source).schema_arrow.names:
+            raise ValueError(f"Colonne identifiant manquante: {id_col}")
+        ids = pd.Index(pq.read_table(source, columns=[id_col]).column(id_col).to_pandas())
+    else:
+        if id_col not in pd.read_csv(source, nrows=0).columns:
+            raise ValueError(f"Colonne identifiant manquante: {id_col}")
+        ids = pd.Index(pd.read_csv(source, usecols=[id_col])[id_col])
+
+    # Un identifiant en double écraserait l'état d'un autre client: rien n'est scoré ni écrit
+    if ids.has_duplicates:
+        duplicated = ids[ids.duplicated()].unique()
+        raise ValueError(f"Identifiants dupliqués dans le portefeuille ({len(duplicated):,}): "
+                         f"{', '.join(map(str, duplicated[:5]))}")
+
+def score_incremental(source, output_path, id_col, state_path=STATE_PATH, model=None, preprocessor=None,
+                      normalize=False, version=None, chunksize=BATCH_CHUNK_SIZE):
+    """Score `source` en réutilisant les scores à jour de l'état; écrit `output_path` (Parquet).
+
+    Avec un `model` explicite, `version` est obligatoire: c'est elle qui
+    décide si les scores de l'état sont encore valides.
+    """
+    if model is None:
+        model = load_model()
+        if model is None:
+            raise FileNotFoundError("Modèle IA non disponible")
+        version = version or model_version()
+    elif version is None:
+        raise ValueError("Version obligatoire pour un modèle fourni explicitement")
+    file_format = "parquet" if str(source).endswith(".parquet") else "csv"
+
+    state = load_state(state_path, id_col)
+    if state.index.has_duplicates:
+        raise ValueError(f"Identifiants dupliqués dans l'état: {id_col}")
+    _check_ids(source, file_format, id_col)
+
+    started = time.perf_counter()
+    stats = {"rows": 0, "new": 0, "changed": 0, "model_changed": 0, "reused": 0}
+    writer, state_tables = None, []
+    scored_at = datetime.now().isoformat()
+
+    try:
+        for chunk in iter_portfolio_chunks(source, file_format, chunksize):
+            hashes = row_hashes(chunk)
+            previous = state.reindex(chunk[id_col])
+
+            is_new = previous["row_hash"].isna().to_numpy()
+            is_changed = ~is_new & (previous["row_hash"].to_numpy(dtype="int64", na_value=0) != hashes)
+            is_old_model = ~is_new & ~is_changed & (previous["model_version"].to_numpy() != version)
+            stale = is_new | is_changed | is_old_model
+
+            results = previous[SCORE_COLUMNS].reset_index(drop=True)
+            results["scored_at"] = previous["scored_at"].to_numpy()
+            if stale.any():
+                fresh = score(chunk.iloc[np.flatnonzero(stale)], model, preprocessor, normalize)
+                for column in SCORE_COLUMNS:
+                    results.loc[stale, column] = fresh[column].to_numpy()
+                results.loc[stale, "scored_at"] = scored_at
+            results = results.astype({"churn_probability": "float64", "confidence": "float64"})
+
+            output = pd.DataFrame({id_col: chunk[id_col].to_numpy()})
+            output[SCORE_COLUMNS] = results[SCORE_COLUMNS]
+            output["rescored"] = stale
+            table = pa.Table.from_pandas(output, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, table.schema)
+            writer.write_table(table.cast(writer.schema))
+
+            chunk_state = results.assign(**{id_col: chunk[id_col].to_numpy(), "row_hash": hashes, "model_version": version})
+            state_tables.append(pa.Table.from_pandas(chunk_state[[id_col, *STATE_COLUMNS]], preserve_index=False))
+
+            stats["rows"] += len(chunk)
+            stats["new"] += int(is_new.sum())
+            stats["changed"] += int(is_changed.sum())
+            stats["model_changed"] += int(is_old_model.sum())
+            stats["reused"] += int((~stale).sum())
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if state_tables:
+        _write_state(state_tables, state_path)
+
+    stats["rescored"] = stats["rows"] - stats["reused"]
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-scoring incrémental du portefeuille BankChurnAI")
+    parser.add_argument("source", help="Portefeuille CSV ou Parquet")
+    parser.add_argument("output", help="Fichier Parquet de résultats")
+    parser.add_argument("--id-col", required=True, help="Colonne identifiant client")
+    parser.add_argument("--state", default=str(STATE_PATH), help="Fichier d'état (empreintes + derniers scores)")
+    parser.add_argument("--chunksize", type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--preprocessor", default=None)
+    parser.add_argument("--normalize", action="store_true")
+    parser.add_argument("--model-version", default=None,
+                        help="Version du modèle (défaut: déduite du fichier --model, cf. model_version)")
+    args = parser.parse_args()
+
+    model = load_artifact(args.model)
+    if model is None:
+        parser.error(f"Modèle illisible: {args.model} ({LOAD_ERRORS.get(str(Path(args.model)), 'erreur inconnue')})")
+    preprocessor = None
+    if args.preprocessor:
+        preprocessor = load_artifact(args.preprocessor)
+        if preprocessor is None:
+            parser.error(f"Preprocesseur illisible: {args.preprocessor}")
+
+    try:
+        stats = score_incremental(
+            args.source, args.output, args.id_col, args.state, model=model, preprocessor=preprocessor,
+            normalize=args.normalize, version=args.model_version or model_version(args.model),
+            chunksize=args.chunksize
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# inference_pool.py - POOL D'INFÉRENCE BORNÉ AVEC CONTRE-PRESSION
+"""Exécuteur d'inférence partagé entre toutes les sessions Streamlit.
+
+Au lieu d'appeler predict_proba sur le thread de chaque session, les
+analyses sont déposées dans une file bornée servie par un petit nombre de
+threads dédiés:
+- la taille du pool borne la concurrence sur le modèle (pas de
+  sur-souscription des coeurs lors d'un pic),
+- une file pleine refuse immédiatement la requête (PoolSaturated) plutôt
+  que de laisser la latence croître sans limite,
+- chaque requête a une échéance: expirée en file, elle n'est pas calculée,
+- un worker regroupe toutes les requêtes déjà en file (jusqu'à max_batch)
+  et les score en un seul appel par version de modèle: au repos un client
+  part seul, sous charge les requêtes sont coalescées automatiquement.
+
+Les calculs plus lourds (contrefactuels, balayages de sensibilité) passent
+par `call`: ils ont leur propre file bornée et leurs propres workers, avec
+les mêmes refus et échéances, pour ne jamais retarder les analyses.
+"""
+import functools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_MAX_BATCH = 16
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_TASK_WORKERS = 2
+DEFAULT_MAX_TASKS = 8
+BATCH_SIZE_WINDOW = 1000
+
+QUEUE_STAGE = "file d'attente"
+
+class PoolSaturated(RuntimeError):
+    """File d'inférence pleine: requête refusée sans attente"""
+
+class _Request:
+    __slots__ = ("key", "record", "future", "submitted", "deadline")
+
+    def __init__(self, key, record, timeout):
+        self.key = key
+        self.record = record
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.deadline = self.submitted + timeout
+
+class InferencePool:
+    """Workers dédiés servant une file bornée de requêtes coalescées par clé.
+
+    `batch_fn(key, records)` calcule une liste de résultats (un par record)
+    pour des requêtes de même clé (ex: version du modèle). Les tâches de
+    `call` sont servies par `task_workers` threads séparés.
+    """
+
+    def __init__(self, batch_fn, max_workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE,
+                 max_batch=DEFAULT_MAX_BATCH, max_wait_ms=0.0, timeout=DEFAULT_TIMEOUT, recorder=None,
+                 task_workers=DEFAULT_TASK_WORKERS, max_tasks=DEFAULT_MAX_TASKS):
+        self.batch_fn = batch_fn
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self.recorder = recorder
+        self.task_workers = task_workers
+        self.max_tasks = max_tasks
+
+        self._queue = queue.Queue(max_queue)
+        self._task_queue = queue.Queue(max_tasks)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ["submitted", "completed", "rejected", "expired", "timeouts", "errors", "batches", "tasks"], 0
+        )
+        self._in_flight = 0
+        self._batch_sizes = deque(maxlen=BATCH_SIZE_WINDOW)
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"inference-{i}", daemon=True) for i in range(max_workers)
+        ]
+        self._task_threads = [
+            threading.Thread(target=self._task_worker, name=f"inference-task-{i}", daemon=True)
+            for i in range(task_workers)
+        ]
+        for thread in self._threads + self._task_threads:
+            thread.start()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counts[name] += n
+
+    # ==================== SOUMISSION ====================
+    def _enqueue(self, target, request, label):
+        try:
+            target.put_nowait(request)
+        except queue.Full:
+            self._count("rejected")
+            raise PoolSaturated(f"{label} pleine ({target.maxsize} requêtes en attente)") from None
+        self._count("submitted")
+        return request.future
+
+    def _wait(self, future, timeout):
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            future.cancel()
+            self._count("timeouts")
+            raise TimeoutError(f"Inférence non servie en {timeout:.1f}s") from None
+
+    def submit(self, key, record, timeout=None):
+        """Dépose une requête; Future du résultat. PoolSaturated si la file est pleine"""
+        request = _Request(key, record, self.timeout if timeout is None else timeout)
+        return self._enqueue(self._queue, request, "File d'inférence")
+
+    def run(self, key, record, timeout=None):
+        """Soumet et attend le résultat; TimeoutError au-delà de `timeout` secondes"""
+        timeout = self.timeout if timeout is None else timeout
+        return self._wait(self.submit(key, record, timeout), timeout)
+
+    def call(self, fn, timeout=None):
+        """Exécute `fn()` sur un worker de tâches et attend son résultat (mêmes bornes que `run`)"""
+        timeout = self.timeout if timeout is None else timeout
+        future = self._enqueue(self._task_queue, _Request(None, fn, timeout), "File de tâches")
+        return self._wait(future, timeout)
+
+    # ==================== WORKERS ====================
+    def _next_batch(self, first):
+        """`first` + requêtes déjà en file (attente max_wait au plus), jusqu'à max_batch"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Arrêt: remis en file pour ce worker après le lot courant
+                self._queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _claim(self, request, record_wait=True):
+        """Démarre la requête juste avant son calcul; False si annulée ou expirée entre-temps"""
+        if not request.future.set_running_or_notify_cancel():
+            return False
+        now = time.perf_counter()
+        if now > request.deadline:
+            request.future.set_exception(TimeoutError("Requête expirée en file d'attente"))
+            self._count("expired")
+            return False
+        if record_wait and self.recorder is not None:
+            self.recorder.record(QUEUE_STAGE, now - request.submitted)
+        return True
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            groups = {}
+            for request in self._next_batch(first):
+                groups.setdefault(request.key, []).append(request)
+
+            for key, requests in groups.items():
+                # Échéances revérifiées avant chaque groupe: le précédent a pu durer
+                requests = [request for request in requests if self._claim(request)]
+                if requests:
+                    with self._lock:
+                        self._counts["batches"] += 1
+                        self._batch_sizes.append(len(requests))
+                    self._execute(requests, functools.partial(self.batch_fn, key))
+
+    def _task_worker(self):
+        while True:
+            request = self._task_queue.get()
+            if request is None:
+                return
+            if self._claim(request, record_wait=False):
+                self._count("tasks")
+                self._execute([request], lambda records: [records[0]()])
+
+    def _execute(self, requests, compute):
+        """Calcule `compute(records)` et résout les futures des requêtes"""
+        with self._lock:
+            self._in_flight += len(requests)
+        try:
+            results = compute([request.record for request in requests])
+            for request, result in zip(requests, results):
+                request.future.set_result(result)
+            self._count("completed", len(requests))
+        except Exception as e:
+            for request in requests:
+                request.future.set_exception(e)
+            self._count("errors", len(requests))
+        finally:
+            with self._lock:
+                self._in_flight -= len(requests)
+
+    # ==================== MÉTRIQUES ====================
+    def stats(self):
+        """Compteurs cumulés; moyenne et max des tailles de lot sur les BATCH_SIZE_WINDOW derniers lots"""
+        with self._lock:
+            sizes = np.array(self._batch_sizes) if self._batch_sizes else np.zeros(1)
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "task_workers": self.task_workers,
+                "task_queue_depth": self._task_queue.qsize(),
+                "max_tasks": self.max_tasks,
+                "in_flight": self._in_flight,
+                **self._counts,
+                "mean_batch_size": float(sizes.mean()),
+                "max_batch_size": int(sizes.max())
+            }
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for _ in self._task_threads:
+            self._task_queue.put(None)
+        for thread in self._threads + self._task_threads:
+            thread.join()
@@ -0,0 +1,93 @@
+# latency.py - MESURE DE LATENCE PAR ÉTAPE
+"""Chronomètres par étape (attente dans la file d'inférence, assemblage des
+entrées, preprocessing, inférence, attributions, rendu du graphique, rerun
+complet) agrégés entre sessions.
+
+Chaque étape garde une fenêtre glissante des dernières mesures; les
+percentiles p50/p95/p99 et l'histogramme (intervalles fixes en ms) sont
+calculés à la demande. L'enregistrement coûte un perf_counter et un append.
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+LATENCY_WINDOW = 1000
+
+# Ordre d'affichage des étapes de l'analyse d'un client
+LATENCY_STAGES = ["file d'attente", "assemblage", "preprocessing", "inférence", "attributions", "rendu graphique", "rerun total"]
+
+# Bornes supérieures des intervalles de l'histogramme (ms)
+HISTOGRAM_BOUNDS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+class LatencyRecorder:
+    """Fenêtres glissantes de durées par étape, partagées entre sessions"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._totals[stage] = 0
+            self._samples[stage].append(seconds)
+            self._totals[stage] += 1
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def _snapshot(self):
+        with self._lock:
+            return {stage: (np.array(samples) * 1000, self._totals[stage]) for stage, samples in self._samples.items()}
+
+    def summary(self):
+        """Par étape: nombre de mesures, p50/p95/p99 et moyenne (ms) sur la fenêtre"""
+        stats = {}
+        for stage, (samples_ms, total) in self._snapshot().items():
+            p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+            stats[stage] = {
+                "count": total,
+                "window": len(samples_ms),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "mean_ms": float(samples_ms.mean())
+            }
+        ordered = [s for s in LATENCY_STAGES if s in stats] + sorted(s for s in stats if s not in LATENCY_STAGES)
+        return {stage: stats[stage] for stage in ordered}
+
+    def histograms(self):
+        """Par étape: effectifs de la fenêtre dans les intervalles HISTOGRAM_BOUNDS_MS (+ dépassement)"""
+        return {
+            stage: np.bincount(np.searchsorted(HISTOGRAM_BOUNDS_MS, samples_ms),
+                               minlength=len(HISTOGRAM_BOUNDS_MS) + 1).tolist()
+            for stage, (samples_ms, _) in self._snapshot().items()
+        }
+
+    def export_json(self):
+        """Export lisible par machine: percentiles et histogrammes de toutes les étapes"""
+        return json.dumps({
+            "timestamp": datetime.now().isoformat(),
+            "window": self.window,
+            "histogram_bounds_ms": HISTOGRAM_BOUNDS_MS,
+            "stages": self.summary(),
+            "histograms": self.histograms()
+        }, indent=2, ensure_ascii=False)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
@@ -0,0 +1,236 @@
+# model_registry.py - REGISTRE DES VERSIONS DE MODÈLE
+"""Registre des lots d'artefacts versionnés (modèle + preprocesseur + métadonnées).
+
+Un lot est découvert à partir de son fichier `best_churn_model_<version>.pkl`;
+le preprocesseur et les métadonnées sont cherchés dans le même dossier
+(`preprocessor_<version>.pkl` / `model_metadata_<version>.json`, sinon les
+noms sans suffixe du dossier models/). Chaque version est chargée une seule
+fois par processus et partagée entre sessions; les versions inactives les
+moins récemment utilisées sont libérées au-delà d'un budget mémoire.
+
+La version active est remplacée de façon atomique: la nouvelle version est
+chargée (et préchauffée) avant la bascule, les requêtes en cours gardent
+l'ancienne, et aucun utilisateur ne subit le démarrage à froid.
+
+    python model_registry.py            # liste les versions découvertes
+"""
+import argparse
+import logging
+import threading
+import time
+from pathlib import Path
+
+import churn_engine
+from churn_engine import MODEL_PATH, MODEL_PREFIX, model_version, score
+
+logger = logging.getLogger(__name__)
+
+current_dir = Path(__file__).parent
+REGISTRY_DIRS = [current_dir, current_dir.parent / "models"]
+
+# Budget mémoire des versions chargées (estimé par la taille des artefacts)
+MEMORY_BUDGET_MB = 2048
+
+def _first_existing(*paths):
+    return next((path for path in paths if path.exists()), None)
+
+class ModelBundle:
+    """Une version de modèle avec son preprocesseur et son mode de normalisation.
+
+    Un modèle Pipeline (pro) embarque son preprocessing; un estimateur seul
+    (hackathon) utilise le preprocesseur séparé et la normalisation monétaire.
+    """
+
+    def __init__(self, version, model_path, preprocessor_path=None, metadata_path=None):
+        self.version = version
+        self.model_path = Path(model_path)
+        self.preprocessor_path = Path(preprocessor_path) if preprocessor_path else None
+        self.metadata_path = Path(metadata_path) if metadata_path else None
+        self.model = None
+        self.preprocessor = None
+        self.normalize = False
+        self.metadata = {}
+        self.size_bytes = 0
+        self.loaded_at = None
+        self.last_used = 0.0
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def load(self):
+        """Charge les artefacts; False si le modèle est absent ou illisible"""
+        model = churn_engine.load_model(self.model_path)
+        if model is None:
+            return False
+
+        preprocessor, sizes = None, [self.model_path.stat().st_size]
+        if not hasattr(model, "steps") and self.preprocessor_path is not None:
+            preprocessor = churn_engine.load_preprocessor(self.preprocessor_path)
+            if preprocessor is None:
+                return False
+            sizes.append(self.preprocessor_path.stat().st_size)
+
+        self.metadata = churn_engine.load_metadata(self.metadata_path) if self.metadata_path else {}
+        self.preprocessor = preprocessor
+        self.normalize = preprocessor is not None
+        self.size_bytes = sum(sizes)
+        self.loaded_at = time.time()
+        self.model = model
+        return True
+
+    def unloaded_copy(self):
+        """Même version, artefacts non chargés (les détenteurs actuels gardent les leurs)"""
+        return ModelBundle(self.version, self.model_path, self.preprocessor_path, self.metadata_path)
+
+    def score(self, df):
+        """churn_engine.score avec le preprocessing propre à cette version"""
+        return score(df, self.model, self.preprocessor, self.normalize)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "model": self.model_path.name,
+            "preprocessor": self.preprocessor_path.name if self.preprocessor_path else None,
+            "loaded": self.loaded,
+            "size_mb": self.size_bytes / 1e6,
+            "normalize": self.normalize
+        }
+
+class ModelRegistry:
+    """Versions découvertes sur disque, chargées à la demande et partagées"""
+
+    def __init__(self, search_dirs=REGISTRY_DIRS, memory_budget_mb=MEMORY_BUDGET_MB, default_model_path=MODEL_PATH):
+        self.search_dirs = [Path(d) for d in search_dirs]
+        self.memory_budget_bytes = memory_budget_mb * 1e6
+        self._bundles = {}
+        self._active = None
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+        self.discover()
+        default = next((b.version for b in self._bundles.values() if b.model_path == Path(default_model_path)), None)
+        default = default or self.latest_version()
+        if default is not None:
+            try:
+                self.activate(default)
+            except ValueError as e:
+                logger.error("Version par défaut non chargée: %s", e)
+
+    # ---------- Découverte ----------
+    def discover(self):
+        """Rescanne les dossiers; les versions déjà connues (et chargées) sont conservées"""
+        found = {}
+        for directory in self.search_dirs:
+            for model_path in sorted(directory.glob(f"{MODEL_PREFIX}*.pkl")):
+                version = model_version(model_path)
+                found[version] = (
+                    model_path,
+                    _first_existing(directory / f"preprocessor_{version}.pkl", directory / "preprocessor.pkl"),
+                    _first_existing(directory / f"model_metadata_{version}.json", directory / "model_metadata.json")
+                )
+
+        with self._lock:
+            for version, paths in found.items():
+                if version not in self._bundles:
+                    self._bundles[version] = ModelBundle(version, *paths)
+                    self._load_locks[version] = threading.Lock()
+        return sorted(found)
+
+    def versions(self):
+        with self._lock:
+            return sorted(self._bundles)
+
+    def latest_version(self):
+        """Version dont le fichier modèle est le plus récent"""
+        with self._lock:
+            bundles = list(self._bundles.values())
+        return max(bundles, key=lambda b: b.model_path.stat().st_mtime).version if bundles else None
+
+    # ---------- Chargement ----------
+    def get(self, version):
+        """Lot chargé de `version` (chargé une seule fois, même en accès concurrent)"""
+        with self._lock:
+            bundle = self._bundles.get(version)
+            load_lock = self._load_locks.get(version)
+        if bundle is None:
+            raise ValueError(f"Version inconnue: {version}")
+
+        with load_lock:
+            with self._lock:
+                bundle = self._bundles[version]  # peut avoir été libéré entre-temps
+            if not bundle.loaded and not bundle.load():
+                raise ValueError(f"Chargement impossible: {bundle.model_path}")
+        bundle.last_used = time.monotonic()
+        self._evict(keep=bundle)
+        return bundle
+
+    @property
+    def active(self):
+        """Version active (None si aucun modèle n'a pu être chargé)"""
+        bundle = self._active
+        if bundle is not None:
+            bundle.last_used = time.monotonic()
+        return bundle
+
+    def activate(self, version, warmup=None):
+        """Charge `version`, appelle `warmup(bundle)` puis la rend active d'un seul coup"""
+        bundle = self.get(version)
+        if warmup is not None:
+            warmup(bundle)
+        with self._lock:
+            previous, self._active = self._active, bundle
+        if previous is not bundle:
+            logger.info("Version active: %s -> %s", previous.version if previous else None, version)
+            self._evict()
+        return bundle
+
+    def _evict(self, keep=None):
+        """Libère les versions inactives les moins récemment utilisées au-delà du budget.
+
+        Le registre oublie le lot; la mémoire est rendue quand la dernière
+        requête qui l'utilise encore se termine.
+        """
+        with self._lock:
+            loaded = [b for b in self._bundles.values() if b.loaded]
+            total = sum(b.size_bytes for b in loaded)
+            for bundle in sorted(loaded, key=lambda b: b.last_used):
+                if total <= self.memory_budget_bytes:
+                    break
+                if bundle is self._active or bundle is keep:
+                    continue
+                total -= bundle.size_bytes
+                self._bundles[bundle.version] = bundle.unloaded_copy()
+                logger.info("Version libérée (budget mémoire): %s", bundle.version)
+
+    def stats(self):
+        with self._lock:
+            bundles = [b.describe() for b in sorted(self._bundles.values(), key=lambda b: b.version)]
+            active = self._active.version if self._active else None
+        return {
+            "active": active,
+            "loaded_mb": sum(b["size_mb"] for b in bundles if b["loaded"]),
+            "budget_mb": self.memory_budget_bytes / 1e6,
+            "bundles": bundles
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description="Versions de modèle BankChurnAI disponibles")
+    parser.add_argument("--load", action="store_true", help="Charge chaque version pour vérifier les artefacts")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    for version in registry.versions():
+        if args.load:
+            try:
+                registry.get(version)
+            except ValueError as e:
+                print(f"! {e}")
+    stats = registry.stats()
+    for bundle in stats["bundles"]:
+        marker = "*" if bundle["version"] == stats["active"] else " "
+        print(f"{marker} {bundle['version']:<30} {bundle['model']:<45} "
+              f"{'chargé' if bundle['loaded'] else '-':<7} {bundle['size_mb']:.1f} Mo")
+
+if __name__ == "__main__":
+    main()
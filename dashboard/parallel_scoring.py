@@ -0,0 +1,260 @@
+# parallel_scoring.py - SCORING PARALLÈLE DE GROS PORTEFEUILLES
+"""Scoring multi-coeurs d'un portefeuille CSV/Parquet de plusieurs millions de clients.
+
+Le fichier est découpé en plages de lignes contiguës (plages de lignes
+Parquet, indépendantes des groupes de lignes, ou plages d'octets alignées
+sur les fins d'enregistrement en CSV). Chaque processus du pool charge le
+modèle une seule fois, lit sa plage par blocs, la score et écrit un Parquet
+par shard; les shards sont fusionnés à la fin.
+
+En CSV, une fin de ligne à l'intérieur d'un champ entre guillemets n'est pas
+une fin d'enregistrement: le découpage compte les guillemets depuis l'en-tête
+(parité, guillemets doublés compris) et recule la frontière à la fin
+d'enregistrement suivante. Cela ajoute une lecture séquentielle du fichier.
+
+Les types ne sont pas inférés bloc par bloc: en CSV, les NUM_FEATURES sont lues
+en float64 et les autres colonnes en texte; les shards sont écrits avec un même
+schéma (features typées, autres colonnes au type du Parquet source).
+
+    python parallel_scoring.py portefeuille.parquet scores.parquet --workers 8
+    python parallel_scoring.py portefeuille.csv scores.parquet --scaling
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from churn_engine import BATCH_CHUNK_SIZE, CAT_FEATURES, MODEL_PATH, NUM_FEATURES, load_artifact, score_chunk
+
+# État de chaque processus du pool (chargé une fois par l'initialiseur)
+_worker_state = {}
+
+QUOTE_SCAN_BLOCK = 1 << 24
+
+# Types fixes des features: l'inférence par bloc (entier sans NaN, colonne
+# vide) donnerait des schémas différents d'un bloc ou d'un shard à l'autre
+FEATURE_TYPES = {**{f: pa.float64() for f in NUM_FEATURES}, **{f: pa.string() for f in CAT_FEATURES}}
+
+# ==================== DÉCOUPAGE ====================
+def _file_format(path):
+    return "parquet" if str(path).endswith(".parquet") else "csv"
+
+def _count_quotes(f, n_bytes):
+    """Guillemets dans les `n_bytes` octets suivants de `f` (avance la position)"""
+    quotes = 0
+    while n_bytes > 0:
+        block = f.read(min(n_bytes, QUOTE_SCAN_BLOCK))
+        if not block:
+            break
+        quotes += block.count(b'"')
+        n_bytes -= len(block)
+    return quotes
+
+def _csv_bounds(source, n_shards):
+    with open(source, "rb") as f:
+        header_end = len(f.readline())
+        size = os.fstat(f.fileno()).st_size
+        bounds, quotes = [header_end], 0
+        for i in range(1, n_shards):
+            target = header_end + i * (size - header_end) // n_shards
+            if target <= f.tell():
+                continue  # frontière précédente déjà au-delà (champ multiligne long)
+            quotes += _count_quotes(f, target - f.tell())
+            line = f.readline()  # aligne sur le début de la ligne suivante
+            quotes += line.count(b'"')
+            # Nombre impair de guillemets: la fin de ligne est dans un champ, pas une fin d'enregistrement
+            while quotes % 2 and line:
+                line = f.readline()
+                quotes += line.count(b'"')
+            bounds.append(f.tell())
+        bounds.append(size)
+    return bounds
+
+def plan_shards(source, n_shards):
+    """Plages contiguës du fichier: [(début, fin)] en lignes (Parquet) ou en octets (CSV)"""
+    if _file_format(source) == "parquet":
+        n_rows = pq.ParquetFile(source).metadata.num_rows
+        bounds = [round(i * n_rows / n_shards) for i in range(n_shards + 1)]
+    else:
+        bounds = _csv_bounds(source, n_shards)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+class _ByteRangeReader(io.RawIOBase):
+    """Lecture d'un fichier ouvert limitée à la position `end` (plage d'un shard CSV)"""
+
+    def __init__(self, f, end):
+        self.f = f
+        self.end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.f.read(max(0, min(len(buffer), self.end - self.f.tell())))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _iter_parquet_rows(source, start, end, chunksize):
+    """Lignes [start, end) d'un Parquet: seuls les groupes de lignes qui les contiennent sont lus"""
+    parquet_file = pq.ParquetFile(source)
+    metadata = parquet_file.metadata
+    group_starts = np.cumsum([0] + [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])
+    first = int(np.searchsorted(group_starts, start, side="right")) - 1
+    last = int(np.searchsorted(group_starts, end, side="left"))
+
+    position = int(group_starts[first])
+    for batch in parquet_file.iter_batches(batch_size=chunksize, row_groups=range(first, last)):
+        batch_start, position = position, position + batch.num_rows
+        low, high = max(start, batch_start), min(end, position)
+        if high > low:
+            yield batch.slice(low - batch_start, high - low).to_pandas()
+        if position >= end:
+            break
+
+def _iter_shard(source, start, end, chunksize):
+    if _file_format(source) == "parquet":
+        yield from _iter_parquet_rows(source, start, end, chunksize)
+        return
+
+    with open(source, "rb") as f:
+        columns = pd.read_csv(io.BytesIO(f.readline()), nrows=0).columns
+        f.seek(start)
+        shard = io.BufferedReader(_ByteRangeReader(f, end))
+        # float64 pour les numériques, texte pour tout le reste (pas d'inférence par bloc)
+        dtype = {column: "float64" if column in NUM_FEATURES else "object" for column in columns}
+        yield from pd.read_csv(shard, header=None, names=columns, dtype=dtype, chunksize=chunksize)
+
+def _output_schema(source, results):
+    """Schéma Parquet des résultats, identique pour tous les blocs et tous les shards"""
+    source_types = {}
+    if _file_format(source) == "parquet":
+        arrow_schema = pq.ParquetFile(source).schema_arrow
+        source_types = {name: arrow_schema.field(name).type for name in arrow_schema.names}
+    fields = []
+    for field in pa.Schema.from_pandas(results, preserve_index=False):
+        field_type = FEATURE_TYPES.get(field.name, source_types.get(field.name, field.type))
+        fields.append(pa.field(field.name, pa.string() if pa.types.is_null(field_type) else field_type))
+    return pa.schema(fields)
+
+# ==================== WORKERS ====================
+def _init_worker(model_path, preprocessor_path, normalize):
+    from threadpoolctl import threadpool_limits
+    # Un processus par coeur: pas de parallélisme interne en plus
+    _worker_state["thread_limits"] = threadpool_limits(1)
+    _worker_state["model"] = load_artifact(model_path)
+    _worker_state["preprocessor"] = load_artifact(preprocessor_path) if preprocessor_path else None
+    _worker_state["normalize"] = normalize
+    if _worker_state["model"] is None:
+        raise RuntimeError(f"Modèle introuvable: {model_path}")
+
+def _score_shard(shard_id, source, start, end, shard_dir, chunksize):
+    started = time.perf_counter()
+    shard_path = Path(shard_dir) / f"shard_{shard_id:05d}.parquet"
+    writer, rows = None, 0
+    try:
+        for chunk in _iter_shard(source, start, end, chunksize):
+            results = score_chunk(chunk, _worker_state["model"], _worker_state["preprocessor"], _worker_state["normalize"])
+            if writer is None:
+                writer = pq.ParquetWriter(shard_path, _output_schema(source, results))
+            writer.write_table(pa.Table.from_pandas(results, schema=writer.schema, preserve_index=False))
+            rows += len(results)
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"shard": shard_id, "path": str(shard_path) if rows else None, "rows": rows,
+            "seconds": time.perf_counter() - started}
+
+# ==================== DRIVER ====================
+def merge_shards(shard_paths, output_path):
+    """Fusionne les Parquet de shards (dans l'ordre) en un seul fichier, groupe par groupe"""
+    writer = None
+    try:
+        for shard_path in shard_paths:
+            parquet_file = pq.ParquetFile(shard_path)
+            for i in range(parquet_file.num_row_groups):
+                table = parquet_file.read_row_group(i)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def score_parallel(source, output_path, workers=None, model_path=MODEL_PATH, preprocessor_path=None,
+                   normalize=False, chunksize=BATCH_CHUNK_SIZE, shards_per_worker=4):
+    """Score `source` sur `workers` processus et écrit `output_path` (Parquet)"""
+    workers = workers or os.cpu_count()
+    shards = plan_shards(source, workers * shards_per_worker)
+    shard_dir = Path(tempfile.mkdtemp(prefix="churn_shards_"))
+
+    started = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(str(model_path), preprocessor_path, normalize)) as pool:
+            futures = [
+                pool.submit(_score_shard, shard_id, str(source), start, end, str(shard_dir), chunksize)
+                for shard_id, (start, end) in enumerate(shards)
+            ]
+            shard_results = [future.result() for future in futures]
+        scoring_seconds = time.perf_counter() - started
+
+        merge_shards([r["path"] for r in shard_results if r["path"]], output_path)
+    finally:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    rows = sum(r["rows"] for r in shard_results)
+    total_seconds = time.perf_counter() - started
+    return {
+        "workers": workers,
+        "shards": len(shards),
+        "rows": rows,
+        "scoring_seconds": scoring_seconds,
+        "total_seconds": total_seconds,
+        "rows_per_s": rows / total_seconds if total_seconds else 0.0
+    }
+
+def scaling_report(source, output_path, max_workers=None, **kwargs):
+    """Débit (lignes/s) de 1 à `max_workers` processus, en doublant à chaque palier"""
+    max_workers = max_workers or os.cpu_count()
+    levels = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+
+    report = []
+    for workers in levels:
+        result = score_parallel(source, output_path, workers=workers, **kwargs)
+        result["speedup"] = result["rows_per_s"] / report[0]["rows_per_s"] if report else 1.0
+        report.append(result)
+        print(f"{workers:>3} processus: {result['rows_per_s']:>12,.0f} lignes/s (x{result['speedup']:.2f})", flush=True)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring parallèle d'un portefeuille BankChurnAI")
+    parser.add_argument("source", help="Portefeuille CSV ou Parquet")
+    parser.add_argument("output", help="Fichier Parquet de résultats")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus (défaut: nombre de coeurs)")
+    parser.add_argument("--chunksize", type=int, default=BATCH_CHUNK_SIZE)
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--preprocessor", default=None)
+    parser.add_argument("--normalize", action="store_true")
+    parser.add_argument("--scaling", action="store_true", help="Mesure le débit de 1 à N processus")
+    args = parser.parse_args()
+
+    options = dict(model_path=args.model, preprocessor_path=args.preprocessor,
+                   normalize=args.normalize, chunksize=args.chunksize)
+    if args.scaling:
+        report = scaling_report(args.source, args.output, args.workers, **options)
+    else:
+        report = score_parallel(args.source, args.output, args.workers, **options)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# portfolio_index.py - INDEX DU PORTEFEUILLE SCORÉ (TOP-K)
+"""Index précalculé sur les résultats d'un scoring batch.
+
+Les clients sont triés une fois par (région, persona, churn_probability
+décroissante): chaque couple région x persona devient une partition
+contiguë dont les bornes sont connues. Une requête top-K:
+- lit directement les K premières lignes d'une partition,
+- borne le niveau de risque par recherche dichotomique (les niveaux sont
+  des plages de probabilité),
+- fusionne les K meilleurs candidats de chaque partition quand la région
+  ou la persona n'est pas filtrée.
+
+Aucun rescan ni rescoring: quelques millisecondes sur des millions de lignes.
+"""
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import RISK_HIGH_THRESHOLD, RISK_LOW_THRESHOLD
+from schema import CATEGORY_VOCABULARIES, apply_schema
+
+PARTITION_FEATURES = ["region", "customer_persona_ai"]
+
+# Plage de probabilité [min, max) de chaque niveau de risque
+RISK_RANGES = {
+    "FAIBLE": (0.0, RISK_LOW_THRESHOLD),
+    "MOYEN": (RISK_LOW_THRESHOLD, RISK_HIGH_THRESHOLD),
+    "ÉLEVÉ": (RISK_HIGH_THRESHOLD, np.inf)
+}
+
+UNKNOWN_LABEL = "(inconnu)"
+
+class PortfolioIndex:
+    """Résultats triés et partitionnés par région x persona"""
+
+    def __init__(self, results):
+        start = time.perf_counter()
+        encoded, _ = apply_schema(results)
+        region_codes = encoded["region"].cat.codes.to_numpy().astype(np.int64)
+        persona_codes = encoded["customer_persona_ai"].cat.codes.to_numpy().astype(np.int64)
+        churn_proba = encoded["churn_probability"].to_numpy(dtype=float)
+
+        # Code -1 (manquant/inconnu) rangé après le vocabulaire
+        self.regions = CATEGORY_VOCABULARIES["region"] + [UNKNOWN_LABEL]
+        self.personas = CATEGORY_VOCABULARIES["customer_persona_ai"] + [UNKNOWN_LABEL]
+        region_codes[region_codes < 0] = len(self.regions) - 1
+        persona_codes[persona_codes < 0] = len(self.personas) - 1
+        partition = region_codes * len(self.personas) + persona_codes
+
+        order = np.lexsort((-churn_proba, partition))
+        self.frame = encoded.iloc[order].reset_index(drop=True)
+        # Probabilités négées: croissantes dans chaque partition (recherche dichotomique)
+        self._neg_proba = -churn_proba[order]
+        n_partitions = len(self.regions) * len(self.personas)
+        self._bounds = np.searchsorted(partition[order], np.arange(n_partitions + 1))
+        self.build_seconds = time.perf_counter() - start
+
+    @classmethod
+    def from_file(cls, path):
+        """Index sur un fichier de résultats batch (CSV ou Parquet)"""
+        path = Path(path)
+        results = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+        return cls(results)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _partitions(self, region=None, persona=None):
+        regions = range(len(self.regions)) if region is None else [self.regions.index(region)]
+        personas = range(len(self.personas)) if persona is None else [self.personas.index(persona)]
+        return [r * len(self.personas) + p for r in regions for p in personas]
+
+    def _range(self, partition, min_proba, max_proba):
+        """Plage de lignes de la partition avec min_proba <= proba < max_proba"""
+        start, end = self._bounds[partition], self._bounds[partition + 1]
+        neg = self._neg_proba[start:end]
+        lo = start + np.searchsorted(neg, -max_proba, side="right")
+        hi = start + np.searchsorted(neg, -min_proba, side="right")
+        return lo, hi
+
+    def top_k(self, k=500, region=None, persona=None, risk_level=None, min_proba=None):
+        """K clients les plus risqués selon les filtres (triés par probabilité décroissante)"""
+        low, high = RISK_RANGES[risk_level] if risk_level else (0.0, np.inf)
+        if min_proba is not None:
+            low = max(low, min_proba)
+
+        candidates = []
+        for partition in self._partitions(region, persona):
+            lo, hi = self._range(partition, low, high)
+            if hi > lo:
+                candidates.append(np.arange(lo, min(hi, lo + k)))
+        if not candidates:
+            return self.frame.iloc[:0]
+
+        rows = np.concatenate(candidates)
+        if len(candidates) > 1:
+            # Fusion: les K meilleurs parmi les têtes de partition
+            if len(rows) > k:
+                rows = rows[np.argpartition(self._neg_proba[rows], k - 1)[:k]]
+            rows = rows[np.argsort(self._neg_proba[rows], kind="stable")]
+        return self.frame.iloc[rows]
+
+    def count(self, region=None, persona=None, risk_level=None):
+        low, high = RISK_RANGES[risk_level] if risk_level else (0.0, np.inf)
+        return int(sum(np.subtract(*self._range(p, low, high)[::-1]) for p in self._partitions(region, persona)))
+
+    def partition_counts(self):
+        """Effectifs par région x persona (tableau croisé)"""
+        sizes = np.diff(self._bounds).reshape(len(self.regions), len(self.personas))
+        return pd.DataFrame(sizes, index=self.regions, columns=self.personas)
@@ -0,0 +1,74 @@
+# prediction_cache.py - CACHE LRU DES PRÉDICTIONS
+"""Cache LRU borné des prédictions et explications, partagé entre sessions.
+
+La clé est le vecteur `client_data` normalisé (ordre ALL_FEATURES_ORDERED,
+numériques en float arrondis) plus la version du modèle: une même saisie
+scorée par un autre modèle n'est jamais servie depuis le cache.
+"""
+import threading
+from collections import OrderedDict
+from numbers import Number
+
+from churn_engine import ALL_FEATURES_ORDERED
+
+DEFAULT_CACHE_SIZE = 2048
+
+def make_cache_key(client_data, model_version):
+    """Clé hashable d'un client pour une version de modèle"""
+    values = []
+    for feature in ALL_FEATURES_ORDERED:
+        value = client_data[feature]
+        values.append(round(float(value), 6) if isinstance(value, Number) else str(value))
+    return (model_version, *values)
+
+class PredictionCache:
+    """Cache LRU thread-safe avec compteurs de hits/miss"""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, client_data, model_version, compute):
+        """Résultat en cache pour ce client, sinon `compute()` puis mise en cache"""
+        key = make_cache_key(client_data, model_version)
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
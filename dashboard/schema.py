@@ -0,0 +1,121 @@
+# schema.py - SCHÉMA DES VARIABLES CATÉGORIELLES (VOCABULAIRES FIXES)
+"""Vocabulaires fermés des CAT_FEATURES (ceux des listes de l'interface),
+sous forme de dtypes pandas Categorical à catégories fixes.
+
+Un portefeuille est converti une fois en codes entiers compacts (int8): le
+preprocessing compare des entiers au lieu de hacher des chaînes à chaque
+appel. Les valeurs hors vocabulaire ne font pas échouer le scoring: elles
+sont remplacées par une valeur manquante et listées dans un rapport.
+
+    python schema.py portefeuille.csv
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import CAT_FEATURES
+
+# ==================== VOCABULAIRES ====================
+CATEGORY_VOCABULARIES = {
+    "gender": ["M", "F"],
+    "marital_status": ["Single", "Married", "Divorced", "Widowed"],
+    "education_level": ["None", "Primary", "Secondary", "University", "Master/PhD"],
+    "profession": ["Teacher", "Merchant", "Driver", "Civil Servant", "Health Worker", "Student", "Unemployed", "Tech/Office"],
+    "region": ["Ouest", "Artibonite", "Nord", "Sud", "Centre", "Grand'Anse", "Nord-Ouest", "Nord-Est", "Sud-Est", "Nippes"],
+    "mobile_money_usage": ["Low", "Medium", "High"],
+    "customer_persona_ai": ["Saver", "Trader", "Diaspora Dependent", "Digital Native", "Cash User", "Premium"]
+}
+
+CATEGORY_DTYPES = {feature: pd.CategoricalDtype(CATEGORY_VOCABULARIES[feature]) for feature in CAT_FEATURES}
+
+# Code des valeurs manquantes ou inconnues (convention pandas)
+MISSING_CODE = -1
+
+# ==================== CONVERSION ====================
+def apply_schema(df):
+    """Convertit les CAT_FEATURES de `df` en Categorical à vocabulaire fixe.
+
+    Retourne (df converti, rapport) où le rapport donne, par feature, le
+    nombre d'occurrences de chaque valeur inconnue (devenue manquante).
+    """
+    converted = df.copy()
+    unknown = {}
+    for feature in CAT_FEATURES:
+        if feature not in converted.columns:
+            continue
+        values = converted[feature]
+        if values.dtype == CATEGORY_DTYPES[feature]:
+            continue
+
+        # masquer les inconnues avant le cast (un Categorical ne les accepte plus)
+        lost = ~values.isin(CATEGORY_VOCABULARIES[feature]) & values.notna()
+        if lost.any():
+            unknown[feature] = values[lost].astype(str).value_counts().to_dict()
+            values = values.where(~lost)
+        converted[feature] = values.astype(CATEGORY_DTYPES[feature])
+    return converted, unknown
+
+def merge_unknown(total, unknown):
+    """Cumule un rapport de valeurs inconnues (traitement par blocs)"""
+    for feature, counts in unknown.items():
+        feature_total = total.setdefault(feature, {})
+        for value, count in counts.items():
+            feature_total[value] = feature_total.get(value, 0) + count
+    return total
+
+def category_codes(df):
+    """Matrice N x 7 des codes int8 des CAT_FEATURES (MISSING_CODE si manquant/inconnu)"""
+    converted, _ = apply_schema(df[CAT_FEATURES])
+    return np.column_stack([
+        converted[feature].cat.codes.to_numpy(dtype=np.int8) for feature in CAT_FEATURES
+    ])
+
+def decode_codes(codes):
+    """DataFrame Categorical à partir d'une matrice de codes (inverse de category_codes)"""
+    return pd.DataFrame({
+        feature: pd.Categorical.from_codes(codes[:, i], dtype=CATEGORY_DTYPES[feature])
+        for i, feature in enumerate(CAT_FEATURES)
+    })
+
+def format_unknown(unknown, max_values=5):
+    """Résumé lisible d'un rapport de valeurs inconnues"""
+    lines = []
+    for feature, counts in unknown.items():
+        top = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:max_values]
+        values = ", ".join(f"'{value}' ({count:,})" for value, count in top)
+        lines.append(f"{feature}: {values}")
+    return lines
+
+# ==================== RAPPORT MÉMOIRE ====================
+def schema_report(df):
+    """Mémoire et temps de conversion des CAT_FEATURES (objet vs Categorical)"""
+    before = df[CAT_FEATURES].memory_usage(deep=True, index=False).sum()
+    start = time.perf_counter()
+    converted, unknown = apply_schema(df[CAT_FEATURES])
+    convert_seconds = time.perf_counter() - start
+    after = converted.memory_usage(deep=True, index=False).sum()
+    return {
+        "rows": len(df),
+        "object_mb": before / 1e6,
+        "categorical_mb": after / 1e6,
+        "reduction": before / after if after else 0.0,
+        "convert_seconds": convert_seconds,
+        "unknown": unknown
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversion des variables catégorielles d'un portefeuille")
+    parser.add_argument("source", help="Portefeuille CSV ou Parquet")
+    args = parser.parse_args()
+
+    df = pd.read_parquet(args.source) if args.source.endswith(".parquet") else pd.read_csv(args.source)
+    report = schema_report(df)
+    print(f"{report['rows']:,} lignes: {report['object_mb']:.1f} Mo -> {report['categorical_mb']:.1f} Mo "
+          f"(x{report['reduction']:.0f}) en {report['convert_seconds']:.2f}s")
+    for line in format_unknown(report["unknown"]):
+        print(f"Valeurs inconnues - {line}")
+
+if __name__ == "__main__":
+    main()
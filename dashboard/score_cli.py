@@ -0,0 +1,217 @@
+# score_cli.py - SCORING EN FLUX (CSV / NDJSON -> NDJSON / PARQUET)
+"""Scoring en ligne de commande, en flux et à mémoire constante.
+
+Les clients sont lus par micro-lots de taille fixe (CSV, NDJSON ou entrée
+standard), scorés, puis écrits en NDJSON au format de l'export
+"Exporter l'Analyse (JSON)" de l'application: client_data, prediction,
+feature_impacts, timestamp. Rien n'est accumulé entre les lots, ce qui
+permet de placer le scorer dans un pipeline Unix sur de très gros extraits.
+Les enregistrements invalides (JSON illisible, colonne manquante, valeur
+numérique illisible) sont signalés sur la sortie d'erreur et ignorés:
+
+    python score_cli.py portefeuille.csv > scores.ndjson
+    zcat extrait.ndjson.gz | python score_cli.py - --format ndjson | jq .prediction
+    python score_cli.py portefeuille.csv --parquet -o scores.parquet   # export en colonnes
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from attributions import compute_feature_impacts
+from churn_engine import ALL_FEATURES_ORDERED, FEATURE_LABELS, NUM_FEATURES
+from columnar_export import ColumnarExportWriter
+from model_registry import ModelRegistry
+from schema import apply_schema, format_unknown, merge_unknown
+
+DEFAULT_BATCH_SIZE = 1000
+# Au-delà, les enregistrements invalides sont seulement comptés
+MAX_INVALID_REPORTS = 20
+
+# ==================== LECTURE ====================
+def _sniff_format(stream):
+    """'ndjson' si le premier caractère non blanc est '{', sinon 'csv'"""
+    head = stream.peek(64).lstrip() if hasattr(stream, "peek") else b""
+    return "ndjson" if head[:1] == b"{" else "csv"
+
+def report_invalid(invalid, line, reason):
+    """Compte un enregistrement ignoré; détail sur stderr pour les MAX_INVALID_REPORTS premiers"""
+    invalid["count"] = invalid.get("count", 0) + 1
+    if invalid["count"] <= MAX_INVALID_REPORTS:
+        print(f"Ligne {line} ignorée: {reason}", file=sys.stderr)
+
+def iter_batches(stream, file_format, batch_size=DEFAULT_BATCH_SIZE, invalid=None):
+    """Micro-lots (DataFrame indexé par numéro de ligne) de `batch_size` clients lus depuis un flux binaire"""
+    invalid = {} if invalid is None else invalid
+    if file_format == "csv":
+        for chunk in pd.read_csv(stream, chunksize=batch_size):
+            chunk.index += 2  # en-tête en ligne 1
+            yield chunk
+        return
+
+    lines = ((n, line) for n, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8"), 1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(lines, batch_size))
+        if not chunk:
+            return
+        records, positions = [], []
+        for n, line in chunk:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                report_invalid(invalid, n, f"JSON illisible ({e.msg})")
+                continue
+            if not isinstance(record, dict):
+                report_invalid(invalid, n, "objet JSON attendu")
+                continue
+            records.append(record)
+            positions.append(n)
+        if records:
+            yield pd.DataFrame.from_records(records, index=positions)
+
+def valid_rows(batch, invalid=None):
+    """Lignes scorables du lot (numériques convertis); les autres sont signalées puis ignorées"""
+    invalid = {} if invalid is None else invalid
+    missing = [f for f in ALL_FEATURES_ORDERED if f not in batch.columns]
+    if missing:
+        for line in batch.index:
+            report_invalid(invalid, line, f"colonnes manquantes: {', '.join(missing)}")
+        return batch.iloc[:0]
+
+    batch = batch.copy()
+    reasons = {}
+    for feature in NUM_FEATURES:
+        values = pd.to_numeric(batch[feature], errors="coerce")
+        for line in batch.index[values.isna() & batch[feature].notna()]:
+            reasons.setdefault(line, f"{feature}={batch.at[line, feature]!r} n'est pas numérique")
+        batch[feature] = values
+    for line in sorted(reasons):
+        report_invalid(invalid, line, reasons[line])
+    return batch.drop(index=list(reasons)) if reasons else batch
+
+# ==================== SCORING ====================
+def _json_records(df):
+    """Lignes en dicts sérialisables (NaN -> null, types NumPy -> Python)"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def iter_scored(batches, bundle, with_impacts=True, unknown_values=None, invalid=None):
+    """(lot validé, lot encodé, scores, impacts ou None) pour chaque micro-lot non vide"""
+    for batch in batches:
+        batch = valid_rows(batch, invalid)
+        if batch.empty:
+            continue
+        encoded, unknown = apply_schema(batch)
+        if unknown_values is not None:
+            merge_unknown(unknown_values, unknown)
+
+        scores = bundle.score(encoded)
+        impacts = compute_feature_impacts(encoded, bundle.model, bundle.preprocessor, bundle.normalize) \
+            if with_impacts else None
+        yield batch, encoded, scores, impacts
+
+def score_batches(batches, bundle, with_impacts=True, unknown_values=None, invalid=None):
+    """Génère les enregistrements d'export, lot par lot"""
+    for batch, _, scores, impacts in iter_scored(batches, bundle, with_impacts, unknown_values, invalid):
+        if impacts is not None:
+            impact_records = impacts.rename(columns=FEATURE_LABELS).to_dict(orient="records")
+        else:
+            impact_records = itertools.repeat({})
+
+        timestamp = datetime.now().isoformat()
+        for client_data, churn_proba, risk_level, confidence, feature_impacts in zip(
+            _json_records(batch), scores["churn_probability"].tolist(), scores["risk_level"].tolist(),
+            scores["confidence"].tolist(), impact_records
+        ):
+            yield {
+                "client_data": client_data,
+                "prediction": {
+                    "churn_probability": churn_proba,
+                    "risk_level": risk_level,
+                    "confidence": confidence
+                },
+                "feature_impacts": feature_impacts,
+                "timestamp": timestamp
+            }
+
+def write_ndjson(records, output, batch_size=DEFAULT_BATCH_SIZE):
+    """Écrit les enregistrements en NDJSON, par paquets; retourne le nombre de lignes"""
+    written = 0
+    while True:
+        lines = [json.dumps(record, ensure_ascii=False) + "\n" for record in itertools.islice(records, batch_size)]
+        if not lines:
+            return written
+        output.write("".join(lines))
+        output.flush()
+        written += len(lines)
+
+def write_parquet(scored, path, model_version):
+    """Écrit les lots scorés en Parquet (un groupe de lignes par lot); retourne le nombre de lignes"""
+    with ColumnarExportWriter(path, model_version) as writer:
+        for _, encoded, scores, impacts in scored:
+            writer.write(encoded, scores, impacts)
+    return writer.rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring en flux de clients BankChurnAI (sortie NDJSON ou Parquet)")
+    parser.add_argument("source", nargs="?", default="-", help="Fichier CSV/NDJSON, ou '-' pour l'entrée standard")
+    parser.add_argument("-o", "--output", default="-", help="Fichier NDJSON de sortie ('-' pour la sortie standard)")
+    parser.add_argument("--format", choices=["auto", "csv", "ndjson"], default="auto")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--version", default=None, help="Version du modèle (défaut: version active du registre)")
+    parser.add_argument("--no-impacts", action="store_true", help="Sans facteurs d'influence (plus rapide)")
+    parser.add_argument("--parquet", action="store_true", help="Sortie Parquet en colonnes (nécessite -o)")
+    args = parser.parse_args()
+    if args.parquet and args.output == "-":
+        parser.error("--parquet nécessite un fichier de sortie (-o)")
+
+    registry = ModelRegistry()
+    bundle = registry.get(args.version) if args.version else registry.active
+    if bundle is None:
+        parser.error("Aucun modèle disponible")
+
+    source = sys.stdin.buffer if args.source == "-" else open(args.source, "rb")
+    source = source if hasattr(source, "peek") else io.BufferedReader(source)
+    file_format = args.format
+    if file_format == "auto":
+        file_format = _sniff_format(source) if args.source == "-" else (
+            "ndjson" if args.source.endswith((".ndjson", ".jsonl")) else "csv"
+        )
+    unknown_values, invalid = {}, {}
+    batches = iter_batches(source, file_format, args.batch_size, invalid)
+
+    if args.parquet:
+        try:
+            written = write_parquet(iter_scored(batches, bundle, not args.no_impacts, unknown_values, invalid),
+                                    args.output, bundle.version)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+    else:
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            records = score_batches(batches, bundle, not args.no_impacts, unknown_values, invalid)
+            written = write_ndjson(records, output, args.batch_size)
+            output.flush()
+        except BrokenPipeError:
+            # Lecteur fermé en aval (ex: `| head`): arrêt silencieux, y compris au flush final de sys.stdout
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+        finally:
+            if output is not sys.stdout:
+                output.close()
+            if source is not sys.stdin.buffer:
+                source.close()
+
+    for line in format_unknown(unknown_values):
+        print(f"Valeurs inconnues - {line}", file=sys.stderr)
+    if invalid:
+        print(f"{invalid['count']:,} enregistrements invalides ignorés", file=sys.stderr)
+    print(f"{written:,} clients scorés (version {bundle.version})", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
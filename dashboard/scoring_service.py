@@ -0,0 +1,326 @@
+# scoring_service.py - SERVICE HTTP LOCAL DE SCORING (MICRO-BATCHING)
+"""Service HTTP de scoring churn pour les systèmes internes, sans Streamlit.
+
+Les requêtes concurrentes sont regroupées par une file asyncio en
+micro-batches: un seul appel predict_proba par batch.
+
+    python scoring_service.py serve --port 8765 --max-batch-size 64 --max-wait-ms 5
+    python scoring_service.py loadgen --port 8765 --requests 5000 --concurrency 64
+
+Endpoints:
+    POST /score   corps JSON au format `client_data` de app.py
+    GET  /health
+    GET  /stats   compteurs du micro-batcher
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import ALL_FEATURES_ORDERED, CAT_FEATURES, NUM_FEATURES, load_model, score
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+
+# Client de démonstration (valeurs par défaut du formulaire de app.py)
+SAMPLE_CLIENT = {
+    'age': 35, 'household_size': 3, 'zone_security_level': 2,
+    'distance_to_branch_km': 5.0, 'income_monthly': 25000,
+    'account_balance': 50000, 'credit_score': 650, 'loan_balance': 0,
+    'transactions_count_monthly': 15, 'transfer_fees_paid': 500,
+    'time_with_bank_months': 24, 'last_transaction_days': 7,
+    'diaspora_transfers_received': 0, 'mobile_app_logins': 5,
+    'sentiment_score': 0.0, 'access_to_internet': 1,
+    'gender': 'M', 'marital_status': 'Single', 'education_level': 'None',
+    'profession': 'Teacher', 'region': 'Ouest',
+    'mobile_money_usage': 'Low', 'customer_persona_ai': 'Saver'
+}
+
+# ==================== MICRO-BATCHING ====================
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes en batches pour un seul predict_proba.
+
+    Un batch part dès qu'il atteint `max_batch_size` clients ou que le plus
+    ancien attend depuis `max_wait_ms` millisecondes.
+    """
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.rows = 0
+        self.fallbacks = 0
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, client_data):
+        """Score un client; attend la fin de son batch"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((client_data, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            try:
+                await self._score_batch(loop, batch)
+            except Exception:
+                # Un client invalide ne doit pas faire échouer tout le lot: reprise client par client
+                self.fallbacks += 1
+                for item in batch:
+                    try:
+                        await self._score_batch(loop, [item])
+                    except Exception as e:
+                        if not item[1].done():
+                            item[1].set_exception(e)
+
+            self.batches += 1
+            self.rows += len(batch)
+
+    async def _score_batch(self, loop, batch):
+        df_batch = pd.DataFrame.from_records([client for client, _ in batch], columns=ALL_FEATURES_ORDERED)
+        scores = await loop.run_in_executor(None, score, df_batch, self.model)
+        for (_, future), result in zip(batch, scores.to_dict(orient="records")):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "fallbacks": self.fallbacks,
+            "mean_batch_size": self.rows / self.batches if self.batches else 0.0,
+            "queue_depth": self.queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+# ==================== HTTP ====================
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+def _as_number(feature, value):
+    # bool est un int en Python, mais true/false n'est pas une valeur numérique valide
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{feature}: valeur numérique attendue, reçu {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{feature}: valeur numérique attendue, reçu {value!r}") from None
+    if not np.isfinite(number):
+        raise ValueError(f"{feature}: valeur numérique finie attendue, reçu {value!r}")
+    return number
+
+def validate_client(payload):
+    """Vérifie et convertit les 23 features de `client_data` (ValueError -> 400 avant mise en file)"""
+    if not isinstance(payload, dict):
+        raise ValueError("Le corps doit être un objet JSON")
+    missing = [f for f in ALL_FEATURES_ORDERED if f not in payload]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+
+    client_data = {f: _as_number(f, payload[f]) for f in NUM_FEATURES}
+    for f in CAT_FEATURES:
+        if not isinstance(payload[f], str):
+            raise ValueError(f"{f}: chaîne de caractères attendue, reçu {payload[f]!r}")
+        client_data[f] = payload[f]
+    return client_data
+
+async def read_request(reader):
+    """Lit une requête HTTP/1.1; retourne None si la connexion est fermée"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    body = b""
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    return method, path, headers, body
+
+def write_response(writer, status, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+
+class ScoringService:
+    """Serveur HTTP asyncio (keep-alive) branché sur un MicroBatcher"""
+
+    def __init__(self, model, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.batcher = MicroBatcher(model, max_batch_size, max_wait_ms)
+
+    async def handle(self, method, path, body):
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/stats":
+            return 200, self.batcher.stats()
+        if method == "POST" and path == "/score":
+            try:
+                client_data = validate_client(json.loads(body or b"null"))
+            except (ValueError, json.JSONDecodeError) as e:
+                return 400, {"error": str(e)}
+            return 200, await self.batcher.submit(client_data)
+        return 404, {"error": f"Route inconnue: {method} {path}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                try:
+                    status, payload = await self.handle(method, path, body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                write_response(writer, status, payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.batcher.start()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Service de scoring sur http://{host}:{port} "
+              f"(batch max {self.batcher.max_batch_size}, attente max {self.batcher.max_wait * 1000:.1f} ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+# ==================== GÉNÉRATEUR DE CHARGE ====================
+async def _post_score(reader, writer, body):
+    writer.write(
+        f"POST /score HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    content_length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if line.lower().startswith(b"content-length:"):
+            content_length = int(line.split(b":", 1)[1])
+    await reader.readexactly(content_length)
+    return int(status_line.split()[1])
+
+async def run_load(host=DEFAULT_HOST, port=DEFAULT_PORT, n_requests=5000, concurrency=64, client_data=None):
+    """Envoie `n_requests` requêtes /score depuis `concurrency` connexions keep-alive"""
+    body = json.dumps(client_data or SAMPLE_CLIENT).encode("utf-8")
+    latencies = []
+    errors = 0
+    remaining = iter(range(n_requests))
+
+    async def worker():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for _ in remaining:
+                start = time.perf_counter()
+                status = await _post_score(reader, writer, body)
+                latencies.append(time.perf_counter() - start)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99))
+    }
+
+# ==================== CLI ====================
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP de scoring BankChurnAI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Démarre le service de scoring")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST)
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    serve_parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+
+    load_parser = subparsers.add_parser("loadgen", help="Génère une charge locale sur le service")
+    load_parser.add_argument("--host", default=DEFAULT_HOST)
+    load_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load_parser.add_argument("--requests", type=int, default=5000)
+    load_parser.add_argument("--concurrency", type=int, default=64)
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        model = load_model()
+        if model is None:
+            parser.error("Modèle IA non disponible. Veuillez vérifier les fichiers.")
+        service = ScoringService(model, args.max_batch_size, args.max_wait_ms)
+        try:
+            asyncio.run(service.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        report = asyncio.run(run_load(args.host, args.port, args.requests, args.concurrency))
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# sensitivity.py - ANALYSE DE SENSIBILITÉ (WHAT-IF) PAR LOTS
+"""Courbes de réponse du risque autour d'un client.
+
+Une ou deux variables parcourent la plage de leur widget (WIDGET_BOUNDS)
+pendant que les autres restent celles du client. Toutes les grilles sont
+assemblées dans un seul DataFrame et scorées en un seul appel vectorisé à
+predict_proba; le résultat est mis en cache par client, version du modèle
+et grille, pour qu'explorer un profil coûte un appel batch au lieu de
+dizaines de reruns.
+"""
+import numpy as np
+import pandas as pd
+
+from churn_engine import score
+from client_profiles import INTEGER_FEATURES, WIDGET_BOUNDS
+from prediction_cache import make_cache_key
+
+SWEEP_POINTS = 25
+SURFACE_POINTS = 15
+
+# Variables proposées par défaut (curseurs les plus manipulés en agence)
+DEFAULT_SWEEP_FEATURES = ["credit_score", "last_transaction_days", "mobile_app_logins"]
+
+def feature_grid(feature, n_points=SWEEP_POINTS):
+    """Valeurs parcourues pour `feature` dans les bornes de son widget"""
+    low, high = WIDGET_BOUNDS[feature]
+    values = np.linspace(low, high, n_points)
+    if feature in INTEGER_FEATURES:
+        values = np.unique(np.round(values)).astype(np.int64)
+    return values
+
+def _score_frame(frame, model, preprocessor, normalize):
+    return score(frame, model, preprocessor, normalize)["churn_probability"].to_numpy()
+
+def sensitivity_curves(client_data, features, model, preprocessor=None, normalize=False, n_points=SWEEP_POINTS):
+    """Courbe de dépendance de chaque feature (un seul predict_proba pour toutes).
+
+    Retourne un DataFrame long: feature, value, churn_probability.
+    """
+    grids = [feature_grid(feature, n_points) for feature in features]
+    frame = pd.DataFrame([client_data] * sum(len(grid) for grid in grids))
+
+    offset = 0
+    for feature, grid in zip(features, grids):
+        column = frame[feature].to_numpy(copy=True).astype(grid.dtype)
+        column[offset:offset + len(grid)] = grid
+        frame[feature] = column
+        offset += len(grid)
+
+    return pd.DataFrame({
+        "feature": np.repeat(features, [len(grid) for grid in grids]),
+        "value": np.concatenate(grids).astype(float),
+        "churn_probability": _score_frame(frame, model, preprocessor, normalize)
+    })
+
+def interaction_surface(client_data, feature_x, feature_y, model, preprocessor=None, normalize=False,
+                        n_points=SURFACE_POINTS):
+    """Risque sur la grille feature_x x feature_y (un seul predict_proba)"""
+    grid_x, grid_y = feature_grid(feature_x, n_points), feature_grid(feature_y, n_points)
+    mesh_x, mesh_y = np.meshgrid(grid_x, grid_y, indexing="ij")
+
+    frame = pd.DataFrame([client_data] * mesh_x.size)
+    frame[feature_x] = mesh_x.ravel()
+    frame[feature_y] = mesh_y.ravel()
+
+    return pd.DataFrame({
+        feature_x: mesh_x.ravel().astype(float),
+        feature_y: mesh_y.ravel().astype(float),
+        "churn_probability": _score_frame(frame, model, preprocessor, normalize)
+    })
+
+def cached_sweep(cache, client_data, model_version, grid_key, compute):
+    """Résultat d'un balayage en cache (client, version, grille), sinon `compute()`"""
+    key = (*make_cache_key(client_data, model_version), "sweep", *grid_key)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+    return value
@@ -0,0 +1,272 @@
+# shadow_scoring.py - SCORING FANTÔME CHAMPION / CHALLENGER
+"""Scoring fantôme: le modèle actif (champion) répond à l'utilisateur, un
+second modèle (challenger) est scoré en parallèle sur un pool de threads.
+
+L'appel à `submit` ne fait que déposer le travail: aucune latence visible.
+Les paires de scores sont mises en tampon et écrites par lots en SQLite,
+puis agrégées en statistiques d'accord (décision, niveau de risque) et de
+décalage de distribution (PSI, Kolmogorov-Smirnov).
+
+Les statistiques sont tenues à jour au fil de l'eau (compteurs et
+histogrammes à intervalles fixes par couple de versions): les lire ne
+relit pas la base et ne force pas l'écriture du tampon.
+"""
+import atexit
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from churn_engine import DECISION_THRESHOLD, risk_levels
+
+logger = logging.getLogger(__name__)
+
+current_dir = Path(__file__).parent
+SHADOW_DB_PATH = current_dir / 'shadow_scores.db'
+
+# Au-delà, les nouveaux travaux fantômes sont abandonnés (jamais de blocage)
+MAX_PENDING_ROWS = 200000
+PSI_BINS = np.linspace(0, 1, 11)
+# Histogrammes cumulés: KS à 0.01 près, regroupés par 10 pour le PSI (mêmes bornes que PSI_BINS)
+HIST_BINS = np.linspace(0, 1, 101)
+STATS_MAX_ROWS = 500000
+
+SHADOW_COLUMNS = ["timestamp", "source", "champion_version", "challenger_version", "champion_proba", "challenger_proba"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    source TEXT,
+    champion_version TEXT NOT NULL,
+    challenger_version TEXT NOT NULL,
+    champion_proba REAL NOT NULL,
+    challenger_proba REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shadow_pair ON shadow_scores (champion_version, challenger_version, id);
+"""
+
+# ==================== STATISTIQUES ====================
+def psi_from_counts(expected_counts, actual_counts):
+    """Population Stability Index entre deux histogrammes aux mêmes intervalles"""
+    expected_counts = np.asarray(expected_counts, dtype=float)
+    actual_counts = np.asarray(actual_counts, dtype=float)
+    expected_share = np.clip(expected_counts / max(expected_counts.sum(), 1), 1e-6, None)
+    actual_share = np.clip(actual_counts / max(actual_counts.sum(), 1), 1e-6, None)
+    return float(np.sum((actual_share - expected_share) * np.log(actual_share / expected_share)))
+
+def psi(expected, actual, bins=PSI_BINS):
+    """Population Stability Index entre deux échantillons (intervalles fixes)"""
+    return psi_from_counts(np.histogram(expected, bins)[0], np.histogram(actual, bins)[0])
+
+def ks_from_counts(expected_counts, actual_counts):
+    """Distance de Kolmogorov-Smirnov aux bornes des intervalles de deux histogrammes"""
+    expected_cdf = np.cumsum(expected_counts) / max(np.sum(expected_counts), 1)
+    actual_cdf = np.cumsum(actual_counts) / max(np.sum(actual_counts), 1)
+    return float(np.abs(expected_cdf - actual_cdf).max()) if len(expected_cdf) else 0.0
+
+def ks_statistic(a, b):
+    """Distance de Kolmogorov-Smirnov (écart max entre fonctions de répartition)"""
+    a, b = np.sort(a), np.sort(b)
+    if len(a) == 0 or len(b) == 0:
+        return 0.0
+    grid = np.concatenate([a, b])
+    cdf_a = np.searchsorted(a, grid, side="right") / len(a)
+    cdf_b = np.searchsorted(b, grid, side="right") / len(b)
+    return float(np.abs(cdf_a - cdf_b).max())
+
+def compare_scores(champion_proba, challenger_proba):
+    """Accord et décalage entre deux vecteurs de probabilités appariés"""
+    champion_proba = np.asarray(champion_proba, dtype=float)
+    challenger_proba = np.asarray(challenger_proba, dtype=float)
+    if len(champion_proba) == 0:
+        return {"pairs": 0}
+    return {
+        "pairs": len(champion_proba),
+        "decision_agreement": float(np.mean(
+            (champion_proba >= DECISION_THRESHOLD) == (challenger_proba >= DECISION_THRESHOLD)
+        )),
+        "risk_agreement": float(np.mean(risk_levels(champion_proba) == risk_levels(challenger_proba))),
+        "mean_abs_diff": float(np.abs(champion_proba - challenger_proba).mean()),
+        "champion_mean": float(champion_proba.mean()),
+        "challenger_mean": float(challenger_proba.mean()),
+        "psi": psi(champion_proba, challenger_proba),
+        "ks": ks_statistic(champion_proba, challenger_proba)
+    }
+
+class PairAggregate:
+    """Statistiques cumulées d'un couple champion/challenger, en mémoire fixe"""
+
+    def __init__(self):
+        self.pairs = 0
+        self.decision_agree = 0
+        self.risk_agree = 0
+        self.abs_diff_sum = 0.0
+        self.champion_sum = 0.0
+        self.challenger_sum = 0.0
+        self.champion_hist = np.zeros(len(HIST_BINS) - 1, dtype=np.int64)
+        self.challenger_hist = np.zeros(len(HIST_BINS) - 1, dtype=np.int64)
+
+    def update(self, champion_proba, challenger_proba):
+        champion_proba = np.asarray(champion_proba, dtype=float)
+        challenger_proba = np.asarray(challenger_proba, dtype=float)
+        self.pairs += len(champion_proba)
+        self.decision_agree += int(np.sum(
+            (champion_proba >= DECISION_THRESHOLD) == (challenger_proba >= DECISION_THRESHOLD)
+        ))
+        self.risk_agree += int(np.sum(risk_levels(champion_proba) == risk_levels(challenger_proba)))
+        self.abs_diff_sum += float(np.abs(champion_proba - challenger_proba).sum())
+        self.champion_sum += float(champion_proba.sum())
+        self.challenger_sum += float(challenger_proba.sum())
+        self.champion_hist += np.histogram(champion_proba, HIST_BINS)[0]
+        self.challenger_hist += np.histogram(challenger_proba, HIST_BINS)[0]
+
+    def summary(self):
+        """Mêmes clés que compare_scores"""
+        if self.pairs == 0:
+            return {"pairs": 0}
+        n_groups = len(PSI_BINS) - 1
+        return {
+            "pairs": self.pairs,
+            "decision_agreement": self.decision_agree / self.pairs,
+            "risk_agreement": self.risk_agree / self.pairs,
+            "mean_abs_diff": self.abs_diff_sum / self.pairs,
+            "champion_mean": self.champion_sum / self.pairs,
+            "challenger_mean": self.challenger_sum / self.pairs,
+            "psi": psi_from_counts(self.champion_hist.reshape(n_groups, -1).sum(axis=1),
+                                   self.challenger_hist.reshape(n_groups, -1).sum(axis=1)),
+            "ks": ks_from_counts(self.champion_hist, self.challenger_hist)
+        }
+
+# ==================== SCORING FANTÔME ====================
+class ShadowScorer:
+    """Score le challenger en arrière-plan et journalise les paires par lots"""
+
+    def __init__(self, registry, path=SHADOW_DB_PATH, max_workers=2, batch_size=200):
+        self.registry = registry
+        self.challenger_version = None
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="shadow")
+        self._pending_rows = 0
+        self._dropped_rows = 0
+        self._errors = 0
+        self._buffer = []
+        self._aggregates = {}
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(Path(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        atexit.register(self.flush)
+
+    def set_challenger(self, version):
+        """Version challenger (None pour désactiver); chargée hors du chemin utilisateur"""
+        self.challenger_version = version
+        if version is not None:
+            self._executor.submit(self._load_challenger, version)
+
+    def _load_challenger(self, version):
+        try:
+            self.registry.get(version)
+        except ValueError as e:
+            logger.error("Challenger non chargé: %s", e)
+
+    def submit(self, clients, champion_version, champion_proba, source="analyse"):
+        """Dépose le scoring challenger de `clients` (dict ou DataFrame); retour immédiat"""
+        challenger_version = self.challenger_version
+        if challenger_version is None or challenger_version == champion_version:
+            return False
+
+        n_rows = len(clients) if isinstance(clients, pd.DataFrame) else 1
+        with self._lock:
+            if self._pending_rows + n_rows > MAX_PENDING_ROWS:
+                self._dropped_rows += n_rows
+                return False
+            self._pending_rows += n_rows
+
+        self._executor.submit(self._score, clients, n_rows, champion_proba, champion_version, challenger_version, source)
+        return True
+
+    def _score(self, clients, n_rows, champion_proba, champion_version, challenger_version, source):
+        try:
+            df = clients if isinstance(clients, pd.DataFrame) else pd.DataFrame([clients])
+            champion_proba = np.atleast_1d(np.asarray(champion_proba, dtype=float))
+            challenger_proba = self.registry.get(challenger_version).score(df)["churn_probability"].to_numpy()
+        except Exception as e:
+            logger.error("Scoring challenger %s: %s", challenger_version, e)
+            with self._lock:
+                self._errors += 1
+            return
+        finally:
+            with self._lock:
+                self._pending_rows -= n_rows
+
+        timestamp = datetime.now().isoformat()
+        rows = [
+            (timestamp, source, champion_version, challenger_version, float(champion), float(challenger))
+            for champion, challenger in zip(champion_proba, challenger_proba)
+        ]
+        with self._lock:
+            self._aggregate(champion_version, challenger_version).update(champion_proba, challenger_proba)
+            self._buffer.extend(rows)
+            due = len(self._buffer) >= self.batch_size
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT INTO shadow_scores ({', '.join(SHADOW_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(SHADOW_COLUMNS))})",
+                    rows
+                )
+
+    def _read_pairs(self, champion_version, challenger_version, max_rows):
+        return self._conn.execute(
+            "SELECT champion_proba, challenger_proba FROM shadow_scores "
+            "WHERE champion_version = ? AND challenger_version = ? ORDER BY id DESC LIMIT ?",
+            (champion_version, challenger_version, max_rows)
+        ).fetchall()
+
+    def _aggregate(self, champion_version, challenger_version):
+        """Agrégats d'un couple (verrou tenu); amorcés une fois depuis la base au premier accès"""
+        key = (champion_version, challenger_version)
+        aggregate = self._aggregates.get(key)
+        if aggregate is None:
+            aggregate = self._aggregates[key] = PairAggregate()
+            rows = self._read_pairs(champion_version, challenger_version, STATS_MAX_ROWS)
+            if rows:
+                history = np.array(rows, dtype=float)
+                aggregate.update(history[:, 0], history[:, 1])
+        return aggregate
+
+    def pairs(self, champion_version, challenger_version, max_rows=STATS_MAX_ROWS):
+        """Dernières paires écrites en base pour un couple de versions (hors tampon)"""
+        with self._lock:
+            rows = self._read_pairs(champion_version, challenger_version, max_rows)
+        return pd.DataFrame(rows, columns=["champion_proba", "challenger_proba"])
+
+    def stats(self, champion_version, challenger_version=None):
+        """Accord et décalage champion/challenger (agrégats cumulés, sans accès disque)"""
+        challenger_version = challenger_version or self.challenger_version
+        if challenger_version is None:
+            return {"pairs": 0}
+        with self._lock:
+            result = self._aggregate(champion_version, challenger_version).summary()
+            result.update(pending_rows=self._pending_rows, dropped_rows=self._dropped_rows, errors=self._errors)
+        return result
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,67 @@
+# test_fast_path.py - TESTS DE PARITÉ DU CHEMIN RAPIDE
+"""Le chemin rapide (CompiledScorer, FusedPipeline) doit reproduire
+predict_proba à PARITY_TOLERANCE près, pour les deux modèles du registre,
+y compris sur des valeurs manquantes et des catégories inconnues.
+
+    python -m pytest -q test_fast_path.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from churn_engine import prepare_features
+from client_profiles import TEST_CLIENTS
+from client_record import records_from_frame
+from fast_path import PARITY_TOLERANCE, CompiledScorer, FusedPipeline
+from model_registry import ModelRegistry
+
+MODEL_VERSIONS = ["pro_20251129_080606", "hackathon"]
+
+def _edge_clients():
+    """TEST_CLIENTS + variantes avec numériques manquants et catégories inconnues ou absentes"""
+    clients = [dict(client["data"]) for client in TEST_CLIENTS]
+    base = clients[0]
+    clients.append({**base, "credit_score": None, "income_monthly": np.nan})
+    clients.append({**base, "region": "Mars", "profession": "Astronaute"})
+    clients.append({**base, "gender": None, "mobile_money_usage": None})
+    clients.append({**clients[-1], "age": np.nan, "customer_persona_ai": "Inconnu"})
+    return clients
+
+@pytest.fixture(scope="module")
+def registry():
+    return ModelRegistry()
+
+@pytest.fixture(scope="module", params=MODEL_VERSIONS)
+def bundle(request, registry):
+    try:
+        return registry.get(request.param)
+    except ValueError as e:
+        pytest.skip(f"Modèle {request.param} indisponible: {e}")
+
+@pytest.fixture(scope="module")
+def clients():
+    return _edge_clients()
+
+@pytest.fixture(scope="module")
+def reference_proba(bundle, clients):
+    X = prepare_features(pd.DataFrame(clients), bundle.preprocessor, bundle.normalize)
+    return bundle.model.predict_proba(X)[:, 1]
+
+def test_compiled_scorer_matches_predict_proba(bundle, clients, reference_proba):
+    scorer = CompiledScorer.from_model(bundle.model, bundle.preprocessor, bundle.normalize)
+    np.testing.assert_allclose(scorer.predict_rows(clients), reference_proba, rtol=0, atol=PARITY_TOLERANCE)
+
+def test_compiled_scorer_single_row(bundle, clients, reference_proba):
+    scorer = CompiledScorer.from_model(bundle.model, bundle.preprocessor, bundle.normalize)
+    fast_proba = [scorer.predict_row(client) for client in clients]
+    np.testing.assert_allclose(fast_proba, reference_proba, rtol=0, atol=PARITY_TOLERANCE)
+
+def test_fused_pipeline_matches_predict_proba(bundle, clients, reference_proba):
+    pipeline = FusedPipeline.from_model(bundle.model, bundle.preprocessor, bundle.normalize)
+    np.testing.assert_allclose(pipeline.predict_proba(pd.DataFrame(clients)), reference_proba,
+                               rtol=0, atol=PARITY_TOLERANCE)
+
+def test_fused_pipeline_on_records(bundle, clients, reference_proba):
+    pipeline = FusedPipeline.from_model(bundle.model, bundle.preprocessor, bundle.normalize)
+    records = records_from_frame(pd.DataFrame(clients))
+    np.testing.assert_allclose(pipeline.predict_proba(records), reference_proba, rtol=0, atol=PARITY_TOLERANCE)